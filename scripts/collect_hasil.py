@@ -5,40 +5,182 @@ di root repo.
 
 Contoh (PowerShell):
   python .\scripts\collect_hasil.py -p "social-media-sentiment-analysis\results\**\*" -o files\social-media-sentiment-analysis
+  python .\scripts\collect_hasil.py -p "social-media-sentiment-analysis\results\**\*" --sync --workers 8 --link auto
+
+Mode --sync: hanya file baru/berubah yang disalin.
+- Manifest (<out>/.collect_manifest.json) menyimpan size/mtime (dan hash dengan --hash) tiap
+  file; file yang sama dengan manifest dan masih ada di tujuan dilewati.
+- Penyalinan berjalan paralel (--workers). --link hardlink/reflink/auto memakai hardlink atau
+  reflink (copy-on-write) bila sumber dan tujuan ada di filesystem yang sama, selain itu copy biasa.
+- --delete menghapus file tujuan yang sumbernya sudah tidak ada.
 
 Jalankan dari root repo (direktori yang berisi .git).
 """
 import argparse
+import hashlib
+import json
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
-def gather(patterns, out_dir):
-    out_dir = Path(out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-    copied = []
-    repo_root = Path.cwd()
+MANIFEST = ".collect_manifest.json"
+FICLONE = 0x40049409  # Linux ioctl: clone the source extents into the destination file
+
+def iter_matches(patterns, repo_root):
+    """Yield (relative path, path) of every matched file once, without listing a pattern first."""
+    seen = set()
     for pat in patterns:
-        matches = list(repo_root.glob(pat))
-        for m in matches:
+        for m in repo_root.glob(pat):
             if m.is_file():
                 try:
                     rel = m.relative_to(repo_root)
                 except Exception:
                     rel = Path(m.name)
-                dest = out_dir / rel
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(m, dest)
-                copied.append(str(rel))
+                if rel not in seen:
+                    seen.add(rel)
+                    yield rel, m
+
+def gather(patterns, out_dir):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    copied = []
+    for rel, m in iter_matches(patterns, Path.cwd()):
+        dest = out_dir / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(m, dest)
+        copied.append(str(rel))
     return copied
 
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dst)
+
+class Syncer:
+    def __init__(self, out_dir, link="copy", use_hash=False):
+        self.out_dir = Path(out_dir)
+        self.link = link
+        self.use_hash = use_hash
+        self.manifest_path = self.out_dir / MANIFEST
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.manifest = {}
+        self._can_reflink = link in ("reflink", "auto")
+        self._out_dev = None
+
+    def _place(self, src, dest):
+        """Copy/link src to dest through a temporary name; returns the method used."""
+        if self.link == "hardlink" and dest.exists() and os.path.samefile(src, dest):
+            # src was edited in place and dest is already a link to it: replacing dest by
+            # another link to the same inode would be a no-op that leaves the temporary behind
+            return "hardlink"
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        if tmp.exists():
+            tmp.unlink()
+        if self._out_dev is None:
+            self._out_dev = os.stat(self.out_dir).st_dev
+        # per file: the matched sources may live on different filesystems
+        same_fs = os.stat(src).st_dev == self._out_dev
+        method = "copy"
+        if same_fs and self.link == "hardlink":
+            os.link(src, tmp)
+            method = "hardlink"
+        elif same_fs and self._can_reflink:
+            try:
+                _reflink(src, tmp)
+                method = "reflink"
+            except (OSError, ImportError):
+                self._can_reflink = False  # not supported here: copy from now on
+                if tmp.exists():
+                    tmp.unlink()
+        if method == "copy":
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+        return method
+
+    def _sync_one(self, rel, src):
+        """Returns (rel, manifest entry, action)."""
+        key = rel.as_posix()
+        st = os.stat(src)
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        old = self.manifest.get(key)
+        dest = self.out_dir / rel
+        present = dest.exists() and dest.stat().st_size == st.st_size
+        if old and present and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+            return key, old, "unchanged"
+        if self.use_hash:
+            entry["hash"] = file_hash(src)
+            if old and present and old.get("hash") == entry["hash"]:
+                return key, entry, "unchanged"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        return key, entry, self._place(src, dest)
+
+    def sync(self, patterns, workers=8, delete=False):
+        """Bring out_dir up to date with the matched files; returns {action: [relative paths]}."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        done = {}
+        actions = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._sync_one, rel, src) for rel, src in iter_matches(patterns, Path.cwd())]
+            for fut in futures:
+                key, entry, action = fut.result()
+                done[key] = entry
+                actions.setdefault(action, []).append(key)
+        if delete:
+            for key in sorted(set(self.manifest) - set(done)):
+                dest = self.out_dir / key
+                if dest.exists():
+                    dest.unlink()
+                actions.setdefault("deleted", []).append(key)
+        else:
+            # keep entries of files that are no longer matched, so their copies stay tracked
+            done = {**{k: v for k, v in self.manifest.items() if k not in done}, **done}
+        self.manifest = done
+        tmp = self.manifest_path.with_name(MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(done, indent=0, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+        return actions
+
 def main():
     parser = argparse.ArgumentParser(description="Collect result files into a folder")
     parser.add_argument("--patterns", "-p", nargs="+", required=True,
                         help="Glob patterns to collect, e.g. \"social-media-sentiment-analysis\\results\\**\\*\"")
     parser.add_argument("--out", "-o", default="files\\social-media-sentiment-analysis", help="Output folder name")
+    parser.add_argument("--sync", action="store_true",
+                        help="only copy new/changed files, tracked in a manifest in the output folder")
+    parser.add_argument("--workers", type=int, default=8, help="parallel copies in --sync mode")
+    parser.add_argument("--link", choices=["copy", "hardlink", "reflink", "auto"], default="copy",
+                        help="--sync: hardlink or reflink on the same filesystem (auto = reflink if supported)")
+    parser.add_argument("--hash", action="store_true",
+                        help="--sync: also compare content hashes, so touched but unchanged files are skipped")
+    parser.add_argument("--delete", action="store_true",
+                        help="--sync: remove collected files whose source no longer matches")
     args = parser.parse_args()
 
+    if args.sync:
+        actions = Syncer(args.out, args.link, args.hash).sync(args.patterns, args.workers, args.delete)
+        if not any(k != "deleted" for k in actions):
+            print("No files matched the given patterns.", file=sys.stderr)
+            sys.exit(2)
+        summary = ", ".join(f"{len(v)} {k}" for k, v in sorted(actions.items()))
+        print(f"Synced {args.out}: {summary}")
+        for action, keys in sorted(actions.items()):
+            if action != "unchanged":
+                for k in keys:
+                    print(f" - [{action}] {k}")
+        return
+
     copied = gather(args.patterns, args.out)
     if not copied:
         print("No files matched the given patterns.", file=sys.stderr)
@@ -48,4 +190,4 @@ def main():
         print(" -", c)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_cleaning.py
+- Throughput benchmark for cleaning.py against the original six-pass re.sub cleaner.
+- Also checks that the outputs are byte-identical on the generated corpus.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/bench_cleaning.py --rows 200000
+"""
+import argparse
+import random
+import re
+import time
+
+from cleaning import clean_text, clean_batch
+
+
+def legacy_clean_text(s: str) -> str:
+    # the cleaner preprocess.py used before cleaning.py, kept here as the reference
+    if not isinstance(s, str):
+        return ""
+    s = s.lower()
+    s = re.sub(r"http\S+", "", s)
+    s = re.sub(r"@\w+", "", s)
+    s = re.sub(r"#", "", s)
+    s = re.sub(r"[^a-z0-9\s']", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+WORDS = ("love hate great product service awful okay fine the a is it not very really "
+         "would buy again never recommend price quality support shipping fast slow").split()
+
+
+def make_corpus(rows: int, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(rows):
+        parts = [rnd.choice(WORDS) for _ in range(rnd.randint(5, 25))]
+        if rnd.random() < 0.4:
+            parts.insert(rnd.randrange(len(parts)), f"https://t.co/{rnd.getrandbits(32):x}")
+        if rnd.random() < 0.5:
+            parts.insert(rnd.randrange(len(parts)), f"@user_{rnd.randint(1, 9999)}")
+        if rnd.random() < 0.3:
+            parts.append(f"#{rnd.choice(WORDS).title()}")
+        if rnd.random() < 0.3:
+            parts.append(rnd.choice(["!!!", ":)", "...", "❤️", "it's"]))
+        out.append(" ".join(parts))
+    return out
+
+
+def timed(fn, data):
+    t0 = time.perf_counter()
+    res = fn(data)
+    return res, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.rows, args.seed)
+    legacy, t_legacy = timed(lambda d: [legacy_clean_text(s) for s in d], corpus)
+    fused, t_fused = timed(lambda d: [clean_text(s) for s in d], corpus)
+    batch, t_batch = timed(clean_batch, corpus)
+
+    if legacy != fused or legacy != batch:
+        bad = next(i for i, (a, b) in enumerate(zip(legacy, batch)) if a != b)
+        raise SystemExit(f"Output mismatch at row {bad}: {corpus[bad]!r}")
+
+    print(f"rows: {args.rows}")
+    for name, t in (("legacy re.sub x6", t_legacy), ("clean_text", t_fused), ("clean_batch", t_batch)):
+        print(f"{name:18s} {t:8.3f}s  {args.rows / t:12,.0f} rows/s  x{t_legacy / t:.2f}")
+    print("outputs identical: yes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+bench_featurizer.py
+- Featurization time and peak memory of featurizer.FusedTfidfVectorizer against the current
+  path (clean_batch + TfidfVectorizer), on synthetic_data.py raw text:
+    tfidf          clean_batch, then TfidfVectorizer.fit_transform / transform
+    fused          FusedTfidfVectorizer on the raw text (vocabulary)
+    fused-hashing  FusedTfidfVectorizer(n_features=--n-features) on the raw text
+- Each method runs in a fresh process, so peak RSS and RSS growth are its own and not
+  what an earlier method left allocated. Matrix MB is the size of the CSR arrays.
+- Also checks on --check-rows rows, without max_features (so there are no ties at the cutoff),
+  that both vocabularies are identical and how far the values differ.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/bench_featurizer.py --rows 100000 1000000
+  python social-media-sentiment-analysis/bench_featurizer.py --rows 200000 --ngram-max 1 --output results/bench_featurizer.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import measure
+
+METHODS = ["tfidf", "fused", "fused-hashing"]
+
+
+def make_vectorizer(method: str, params: dict, n_features: int):
+    from featurizer import FusedTfidfVectorizer
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    if method == "tfidf":
+        return TfidfVectorizer(**params)
+    if method == "fused-hashing":
+        return FusedTfidfVectorizer(**{**params, "max_features": None}, n_features=n_features)
+    return FusedTfidfVectorizer(**params)
+
+
+def _matrix_mb(X) -> float:
+    return round((X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6, 1)
+
+
+def run_method(method: str, rows: int, seed: int, params: dict, n_features: int) -> dict:
+    """One method in this (fresh) process: fit_transform on every row, then transform."""
+    from cleaning import clean_batch
+    from synthetic_data import synthetic_frame
+    texts = synthetic_frame(rows, seed)["text"].tolist()
+    vec = make_vectorizer(method, params, n_features)
+    out = {}
+    with measure("fit_transform", rows) as record:
+        X = vec.fit_transform(clean_batch(texts) if method == "tfidf" else texts)
+    out["fit_transform"] = {**record, "matrix_mb": _matrix_mb(X), "dtype": f"{X.dtype}/{X.indices.dtype}"}
+    del X
+    with measure("transform", rows) as record:
+        X = vec.transform(clean_batch(texts) if method == "tfidf" else texts)
+    out["transform"] = {**record, "matrix_mb": _matrix_mb(X), "dtype": f"{X.dtype}/{X.indices.dtype}"}
+    out["features"] = X.shape[1]
+    return out
+
+
+def check(rows: int, seed: int, params: dict) -> dict:
+    import numpy as np
+    from cleaning import clean_batch
+    from synthetic_data import synthetic_frame
+    texts = synthetic_frame(rows, seed)["text"].tolist()
+    params = {**params, "max_features": None}
+    ref, fused = make_vectorizer("tfidf", params, 0), make_vectorizer("fused", params, 0)
+    A, B = ref.fit_transform(clean_batch(texts)), fused.fit_transform(texts)
+    same = ref.vocabulary_ == fused.vocabulary_
+    diff = float(abs(A - B).max()) if same else None
+    return {"rows": rows, "features": len(ref.vocabulary_), "same_vocabulary": same, "max_abs_diff": diff,
+            "idf_max_abs_diff": float(np.abs(ref.idf_ - fused.idf_).max()) if same else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fused featurizer vs clean_batch + TfidfVectorizer")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--ngram-max", type=int, default=2)
+    parser.add_argument("--max-features", type=int, default=20000)
+    parser.add_argument("--n-features", type=int, default=2**20, help="hashing space of fused-hashing")
+    parser.add_argument("--check-rows", type=int, default=20000, help="0 skips the equivalence check")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    params = {"ngram_range": (1, args.ngram_max), "max_features": args.max_features}
+    results = {"params": {**params, "n_features": args.n_features}, "runs": {}}
+    if args.check_rows:
+        results["check"] = c = check(args.check_rows, args.seed, params)
+        if not c["same_vocabulary"]:
+            raise SystemExit(f"Vocabulary mismatch on {c['rows']:,} rows")
+        print(f"check on {c['rows']:,} rows: same {c['features']:,} features, "
+              f"max |diff| {c['max_abs_diff']:.2e} (float32), idf max |diff| {c['idf_max_abs_diff']:.2e}")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'rows':>10s} {'method':14s} {'step':13s} {'seconds':>8s} {'rows/s':>10s} "
+          f"{'peak MB':>8s} {'growth MB':>9s} {'matrix MB':>9s}  dtype")
+    for rows in args.rows:
+        for method in args.methods:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                out = pool.submit(run_method, method, rows, args.seed, params, args.n_features).result()
+            results["runs"].setdefault(str(rows), {})[method] = out
+            for step in ("fit_transform", "transform"):
+                r = out[step]
+                print(f"{rows:>10,} {method:14s} {step:13s} {r['seconds']:8.2f} {r['rows_per_s']:>10,.0f} "
+                      f"{r['peak_rss_mb']:8.0f} {r['rss_growth_mb']:9.0f} {r['matrix_mb']:9.1f}  {r['dtype']}")
+        base = results["runs"][str(rows)].get("tfidf")
+        if base:
+            for method, out in results["runs"][str(rows)].items():
+                if method != "tfidf":
+                    ratio = base["fit_transform"]["seconds"] / out["fit_transform"]["seconds"]
+                    growth = out["fit_transform"]["rss_growth_mb"] / max(base["fit_transform"]["rss_growth_mb"], 0.1)
+                    print(f"{'':>10s} {method}: fit_transform x{ratio:.2f} faster, {growth:.0%} of tfidf's RSS growth")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print("Saved", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+bench_pipeline.py
+- End-to-end benchmark of the pipeline stages on synthetic_data.py corpora of growing size:
+    generate (raw dataset written chunk by chunk) -> clean (streamed, processed dataset written)
+    -> vectorize (TF-IDF fit) -> train (LogisticRegression)
+    -> predict (predict.score_texts on raw text) -> evaluate (report + confusion matrix png)
+    -> snapshot (show_tables CSV/HTML snapshots of the processed dataset's head)
+- Generation and cleaning stream --chunksize rows at a time through ChunkWriter, so at 10^7
+  rows the corpus is never one frame in memory; vectorize/train only load text_clean and
+  label, and predict collects the raw text of the test rows chunk by chunk.
+- Every stage is measured with instrumentation.measure: wall and CPU seconds, rows/s, peak RSS
+  and RSS growth and, with --tracemalloc, the peak of Python allocations (much slower).
+- Results go to a JSON file (--output); --compare OLD.json prints the time ratio per stage
+  against an earlier run so regressions show up run to run.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/bench_pipeline.py --rows 10000 100000 1000000
+  python social-media-sentiment-analysis/bench_pipeline.py --rows 100000 --compare social-media-sentiment-analysis/results/bench_pipeline_prev.json
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import classification_report, confusion_matrix
+import sklearn
+
+from cleaning import clean_batch
+from dataset_io import iter_chunks, read_dataset, read_head, ChunkWriter, has_pyarrow
+from evaluate import save_confusion_matrix
+from instrumentation import measure
+from predict import score_texts
+from reporting import close_figures
+from show_tables import save_snapshots
+from synthetic_data import generate
+from train_model import make_tfidf, make_classifier
+
+DEFAULT_OUTPUT = "social-media-sentiment-analysis/results/bench_pipeline.json"
+DEFAULT_CHUNKSIZE = 100_000
+STAGES = ["generate", "clean", "vectorize", "train", "predict", "evaluate", "snapshot"]
+
+
+@contextmanager
+def _measure(stages: dict, name: str, rows: int):
+    with measure(name, rows) as record:
+        yield
+    stages[name] = {k: v for k, v in record.items() if k not in ("name", "rows")}
+
+
+def _test_rows(path: str, is_test: "np.ndarray", chunksize: int) -> tuple:
+    """(raw text, label) of the rows where is_test is set, in file order, read chunk by chunk."""
+    texts, labels, offset = [], [], 0
+    for chunk in iter_chunks(path, chunksize, columns=["text", "label"]):
+        mask = is_test[offset:offset + len(chunk)]
+        texts.extend(chunk["text"][mask].astype(str).tolist())
+        labels.extend(chunk["label"][mask].astype(str).tolist())
+        offset += len(chunk)
+    return texts, np.array(labels)
+
+
+def run(rows: int, seed: int, workdir: str, chunksize: int = DEFAULT_CHUNKSIZE) -> dict:
+    stages = {}
+    ext = ".parquet" if has_pyarrow() else ".csv"
+    raw, processed = os.path.join(workdir, "tweets_scraped" + ext), os.path.join(workdir, "tweets_clean" + ext)
+
+    def stage(name, n):
+        return _measure(stages, name, n)
+
+    with stage("generate", rows), ChunkWriter(raw) as out:
+        for chunk in generate(rows, seed, chunksize):
+            out.write(chunk)
+    with stage("clean", rows), ChunkWriter(processed) as out:
+        for chunk in iter_chunks(raw, chunksize):
+            chunk["text_clean"] = clean_batch(chunk["text"].astype(str).tolist())
+            out.write(chunk)
+
+    df = read_dataset(processed, columns=["text_clean", "label"])
+    y = df["label"].astype(str).to_numpy()
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    X_train = df["text_clean"].to_numpy()[train_idx]
+    labels = sorted(set(y))
+    del df
+
+    with stage("vectorize", len(train_idx)):
+        vec = make_tfidf()
+        X_fit = vec.fit_transform(X_train)
+    with stage("train", len(train_idx)):
+        clf = make_classifier().fit(X_fit, y[train_idx])
+    model = Pipeline([("tfidf", vec), ("clf", clf)])
+
+    is_test = np.zeros(len(y), dtype=bool)
+    is_test[test_idx] = True
+    del X_train, X_fit, y
+    test_text, y_test = _test_rows(raw, is_test, chunksize)
+    with stage("predict", len(test_text)):
+        preds, _ = score_texts(model, test_text)
+    with stage("evaluate", len(test_text)):
+        report = classification_report(y_test, preds, output_dict=True)
+        save_confusion_matrix(confusion_matrix(y_test, preds, labels=labels), labels,
+                              os.path.join(workdir, "confusion_matrix.png"))
+        close_figures()
+    with stage("snapshot", 200):
+        save_snapshots(read_head(processed, 200), "bench", 200, Path(workdir))
+
+    return {
+        "rows": rows,
+        "accuracy": round(report["accuracy"], 4),
+        "vocabulary": len(vec.vocabulary_),
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages.values()), 3),
+    }
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def compare(current: dict, previous: dict) -> None:
+    before = {r["rows"]: r for r in previous.get("runs", [])}
+    for r in current["runs"]:
+        old = before.get(r["rows"])
+        if old is None:
+            continue
+        print(f"vs {previous['environment']['timestamp']} at {r['rows']:,} rows (time now / before):")
+        for name, s in r["stages"].items():
+            if name in old["stages"] and old["stages"][name]["seconds"]:
+                ratio = s["seconds"] / old["stages"][name]["seconds"]
+                flag = "  <-- slower" if ratio > 1.1 else ""
+                print(f"  {name:10s} {old['stages'][name]['seconds']:9.3f}s -> {s['seconds']:9.3f}s  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile every pipeline stage on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000],
+                        help="corpus sizes to run, e.g. 10000 100000 1000000 10000000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk when generating and cleaning the corpus")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file")
+    parser.add_argument("--compare", help="earlier results JSON to compare stage times against")
+    parser.add_argument("--tracemalloc", action="store_true", help="also record peak Python allocations (slow)")
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "seed": args.seed, "chunksize": args.chunksize, "tracemalloc": args.tracemalloc, "runs": []}
+    for rows in args.rows:
+        if args.tracemalloc:
+            tracemalloc.start()
+        with tempfile.TemporaryDirectory() as workdir:
+            r = run(rows, args.seed, workdir, args.chunksize)
+        if args.tracemalloc:
+            tracemalloc.stop()
+        results["runs"].append(r)
+        print(f"rows: {rows:,}  accuracy: {r['accuracy']}  vocabulary: {r['vocabulary']:,}  total: {r['total_seconds']:.2f}s")
+        print(f"  {'stage':10s} {'seconds':>9s} {'rows/s':>12s} {'peak RSS MB':>12s} {'+RSS MB':>9s}")
+        for name in STAGES:
+            s = r["stages"][name]
+            print(f"  {name:10s} {s['seconds']:9.3f} {s['rows_per_s']:12,.0f} {s['peak_rss_mb']:12.1f} {s['rss_growth_mb']:9.1f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print("Saved benchmark results to", args.output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+bench_startup.py
+- Startup-time check for the sentiment.py CLI: runs `sentiment <command> --help` for every
+  subcommand in a fresh interpreter, several times, and reports the best wall time next to
+  a bare `python -c pass` for reference.
+- Also lists which heavy modules (pandas, sklearn, scipy, matplotlib, seaborn, nltk,
+  pyarrow, joblib) got imported on the way; --help should need none of them.
+- Exits with status 1 if any command is slower than --budget seconds or loads a heavy
+  module, so it can run as a CI gate. --output writes the measurements as JSON.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/bench_startup.py --budget 0.3
+  python social-media-sentiment-analysis/bench_startup.py --commands train score --repeat 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from sentiment import COMMANDS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY = ["pandas", "sklearn", "scipy", "matplotlib", "seaborn", "nltk", "pyarrow", "joblib"]
+
+# runs the CLI in-process so the loaded modules can be inspected afterwards
+_PROBE = """
+import json, sys
+sys.path.insert(0, {here!r})
+import sentiment
+try:
+    sentiment.main([{command!r}, "--help"])
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+
+def _time(cmd: list) -> tuple:
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return time.perf_counter() - t0, proc.stderr
+
+
+def measure(command: str, repeat: int) -> dict:
+    code = _PROBE.format(here=HERE, command=command, heavy=HEAVY)
+    runs = [_time([sys.executable, "-c", code]) for _ in range(repeat)]
+    return {
+        "command": command,
+        "best_seconds": round(min(t for t, _ in runs), 4),
+        "heavy_modules": json.loads(runs[-1][1].strip().splitlines()[-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sentiment.py startup time per subcommand")
+    parser.add_argument("--commands", nargs="+", choices=COMMANDS, default=list(COMMANDS))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command; the best is kept")
+    parser.add_argument("--budget", type=float, default=0.5, help="max seconds for `<command> --help`")
+    parser.add_argument("--output", help="optional JSON results file")
+    args = parser.parse_args()
+
+    baseline = min(_time([sys.executable, "-c", "pass"])[0] for _ in range(args.repeat))
+    print(f"python -c pass: {baseline:.3f}s   budget: {args.budget:.3f}s")
+    results, failed = [], []
+    for command in args.commands:
+        r = measure(command, args.repeat)
+        results.append(r)
+        problems = []
+        if r["best_seconds"] > args.budget:
+            problems.append("over budget")
+        if r["heavy_modules"]:
+            problems.append("loads " + ", ".join(r["heavy_modules"]))
+        if problems:
+            failed.append(command)
+        status = "; ".join(problems) or "ok"
+        print(f"  {command:11s} {r['best_seconds']:7.3f}s  (+{r['best_seconds'] - baseline:.3f}s)  {status}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python_seconds": round(baseline, 4), "budget": args.budget, "commands": results}, f, indent=2)
+        print("Saved startup timings to", args.output)
+    if failed:
+        raise SystemExit(f"Startup check failed for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+bench_storage.py
+- Compares CSV vs Parquet for a processed dataset: file size, full load time and
+  projected load time (only text_clean + label, what train_model/evaluate read).
+- Uses --input if given, otherwise a synthetic corpus of --rows rows.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/bench_storage.py --input social-media-sentiment-analysis/data/processed/tweets_clean.csv
+  python social-media-sentiment-analysis/bench_storage.py --rows 500000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from bench_cleaning import make_corpus
+from cleaning import clean_batch
+from dataset_io import read_dataset, write_dataset
+
+PROJECTION = ["text_clean", "label"]
+
+
+def synthetic(rows: int, seed: int = 42) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    text = make_corpus(rows, seed)
+    return pd.DataFrame({
+        "id": range(rows),
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta([rnd.randrange(86400 * 30) for _ in range(rows)], unit="s"),
+        "user": [f"user_{rnd.randrange(5000)}" for _ in range(rows)],
+        "text": text,
+        "likeCount": [rnd.randrange(500) for _ in range(rows)],
+        "label": [rnd.choice(["positive", "neutral", "negative"]) for _ in range(rows)],
+        "text_clean": clean_batch(text),
+    })
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", help="existing CSV or Parquet dataset (needs text_clean and label)")
+    parser.add_argument("--rows", type=int, default=200000, help="synthetic rows when --input is not given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = read_dataset(args.input) if args.input else synthetic(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"csv": os.path.join(tmp, "data.csv"), "parquet": os.path.join(tmp, "data.parquet")}
+        for path in paths.values():
+            write_dataset(df, path)
+
+        print(f"rows: {len(df):,}  columns: {list(df.columns)}")
+        print(f"{'format':8s} {'size MB':>9s} {'full load s':>12s} {'text_clean+label s':>19s}")
+        for fmt, path in paths.items():
+            size = os.path.getsize(path) / 1e6
+            full = best_of(lambda: read_dataset(path), args.repeat)
+            proj = best_of(lambda: read_dataset(path, columns=PROJECTION), args.repeat)
+            print(f"{fmt:8s} {size:9.2f} {full:12.3f} {proj:19.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+cleaning.py
+- Shared text cleaner used by every pipeline script (preprocess, train_quick, src/utils).
+- Output is byte-identical to the original multi-pass clean_text:
+    lower -> drop urls (http...) -> drop @mentions -> drop '#'
+    -> non [a-z0-9\\s'] to space -> collapse whitespace + strip
+- The six re.sub passes are fused into one compiled substitution plus one findall:
+    * urls, mentions and '#' are removed by a single alternation. A mention stops
+      right before any "http<non-space>" so it never eats the start of a url, which
+      is exactly what removing urls first used to guarantee.
+    * "replace junk with space, collapse, strip" is the same as joining the maximal
+      runs of [a-z0-9'] with a single space.
+- pack_texts / clean_packed move a batch between processes as one string plus an
+  offsets array, which pickles far smaller and faster than a list or a DataFrame.
+"""
+import re
+from array import array
+from itertools import accumulate
+
+_STRIP_RE = re.compile(r"http\S+|@(?:(?!http\S)\w)+|#")
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# identifies the cleaner's output for caches (feature_cache.py); bump the number if
+# clean_text changes in a way the patterns above don't show
+CLEANER_VERSION = f"1:{_STRIP_RE.pattern}:{_TOKEN_RE.pattern}"
+
+# bound methods, looked up once instead of per row
+_strip = _STRIP_RE.sub
+_tokens = _TOKEN_RE.findall
+_join = " ".join
+
+
+def strip_markup(s: str) -> str:
+    """Drop urls, @mentions and '#' from lowercased text (the first step of clean_text)."""
+    return _strip("", s)
+
+
+def clean_text(s: str) -> str:
+    if not isinstance(s, str):
+        return ""
+    return _join(_tokens(_strip("", s.lower())))
+
+
+def clean_batch(texts) -> list:
+    """Clean an iterable of texts, returns a list in the same order."""
+    return [_join(_tokens(_strip("", s.lower()))) if isinstance(s, str) else "" for s in texts]
+
+
+def clean_series(series):
+    """Clean a pandas Series, keeping its index (use instead of .apply(clean_text))."""
+    import pandas as pd
+    return pd.Series(clean_batch(series.tolist()), index=series.index)
+
+
+def pack_texts(texts) -> tuple:
+    """Pack texts into (joined string, end offsets); non-strings become ""."""
+    texts = [s if isinstance(s, str) else "" for s in texts]
+    return "".join(texts), array("q", accumulate(map(len, texts)))
+
+
+def unpack_texts(blob: str, ends) -> list:
+    out = []
+    start = 0
+    for end in ends:
+        out.append(blob[start:end])
+        start = end
+    return out
+
+
+def clean_packed(packed: tuple) -> str:
+    """Worker entry point: clean a packed batch, return the results joined by newlines.
+
+    Cleaned text never contains a newline, so the caller can split the result back.
+    """
+    return "\n".join(clean_batch(unpack_texts(*packed)))
+
+
+def unpack_cleaned(joined: str, n: int) -> list:
+    return joined.split("\n") if n else []
@@ -3,42 +3,296 @@ data_collection.py
 
 Usage:
 - If you already have a CSV with columns 'text' and (optional) 'label', use that.
-- Otherwise run: python data_collection.py --mode scrape --query "your keyword" --limit 500 --out data/raw/tweets_scraped.csv
+- Otherwise run: python data_collection.py --mode scrape --query "your keyword" --limit 500 --out data/raw/tweets_scraped.parquet
+- The output format follows the --out extension (.parquet by default when pyarrow is installed, else .csv).
+- Several queries are collected concurrently: repeat --query, set --workers and a per-source rate
+  limit with --rate (items/s shared by all queries of that source).
+- Rows are flushed every --batch-size rows into <out>.parts/ next to a checkpoint with the last id
+  written per query. An interrupted run picks up where it stopped when started again with the same
+  --out (--fresh starts over); rows are deduplicated by id. When every query is done the parts are
+  merged into --out.
+- --source fake generates tweets locally instead of hitting the network (for testing resumes,
+  dedupe and rate limits without snscrape).
 """
 import argparse
+import glob
+import json
 import os
-import pandas as pd
-from tqdm import tqdm
-
-def fetch_with_snscrape(query, limit=500, out_csv="social-media-sentiment-analysis/data/raw/tweets_scraped.csv"):
-    try:
-        import snscrape.modules.twitter as sntwitter
-    except Exception:
-        raise RuntimeError("snscrape is required for scraping. Install with: pip install snscrape")
-    rows = []
-    for i, tweet in enumerate(tqdm(sntwitter.TwitterSearchScraper(query).get_items())):
-        if i >= limit:
-            break
-        rows.append({
-            "date": tweet.date.isoformat(),
-            "id": tweet.id,
-            "user": tweet.user.username,
-            "text": tweet.content,
-            "likeCount": tweet.likeCount
-        })
-    os.makedirs(os.path.dirname(out_csv), exist_ok=True)
-    df = pd.DataFrame(rows)
-    df.to_csv(out_csv, index=False, encoding="utf-8")
-    print("Saved:", out_csv)
-    return out_csv
+import queue
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from dataset_io import write_dataset, read_dataset, default_path, is_parquet, iter_chunks, ChunkWriter, RAW_DATASET
+
+COLUMNS = ["date", "id", "user", "text", "likeCount"]
+
+
+class RateLimiter:
+    """Token bucket shared by every query of one source; rate <= 0 disables it."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SnscrapeSource:
+    """Twitter search through snscrape, newest first."""
+
+    def items(self, query: str, max_id=None):
+        try:
+            import snscrape.modules.twitter as sntwitter
+        except Exception:
+            raise RuntimeError("snscrape is required for scraping. Install with: pip install snscrape")
+        if max_id is not None:
+            query = f"{query} max_id:{max_id}"
+        for tweet in sntwitter.TwitterSearchScraper(query).get_items():
+            yield {
+                "date": tweet.date.isoformat(),
+                "id": tweet.id,
+                "user": tweet.user.username,
+                "text": tweet.content,
+                "likeCount": tweet.likeCount
+            }
+
+
+class FakeSource:
+    """Deterministic local stand-in for the scraper: `size` tweets per query, newest (highest id)
+    first. Ids come from a shared pool so different queries overlap, like real searches do.
+    `delay` sleeps per item, `fail_after` raises after that many items to simulate a crash."""
+
+    WORDS = ["good", "bad", "great", "awful", "love", "hate", "product", "service", "price", "ok"]
+
+    def __init__(self, size: int = 1000, delay: float = 0.0, fail_after: int = None, seed: int = 42):
+        self.size = size
+        self.delay = delay
+        self.fail_after = fail_after
+        self.seed = seed
+
+    def items(self, query: str, max_id=None):
+        rnd = random.Random(f"{self.seed}:{query}")
+        # every query walks down the same id range with its own stride, so ids repeat across queries
+        ids = range(10 * self.size, 0, -rnd.randint(1, 3))
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for n, tweet_id in enumerate(i for i in ids if max_id is None or i <= max_id):
+            if n >= self.size:
+                return
+            if self.fail_after is not None and n >= self.fail_after:
+                raise RuntimeError(f"fake source failed after {n} items")
+            if self.delay:
+                time.sleep(self.delay)
+            words = random.Random(tweet_id).choices(self.WORDS, k=8)
+            yield {
+                "date": (start + timedelta(minutes=tweet_id)).isoformat(),
+                "id": tweet_id,
+                "user": f"user_{tweet_id % 97}",
+                "text": f"{query}: " + " ".join(words),
+                "likeCount": tweet_id % 50
+            }
+
+
+SOURCES = {"snscrape": SnscrapeSource, "fake": FakeSource}
+
+_DONE = object()
+
+
+class Collector:
+    """Runs queries concurrently and writes deduplicated rows to <out>.parts/ in batches,
+    checkpointing the last id written per query after every batch."""
+
+    def __init__(self, source, out: str, limit: int = 500, batch_size: int = 10000,
+                 workers: int = 4, rate: float = 0.0, fresh: bool = False):
+        self.source = source
+        self.out = out
+        self.limit = limit
+        self.batch_size = batch_size
+        self.workers = workers
+        self.limiter = RateLimiter(rate, burst=max(int(rate), 1))
+        self.parts_dir = out + ".parts"
+        self.checkpoint_path = os.path.join(self.parts_dir, "checkpoint.json")
+        if fresh:
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self.ext = ".parquet" if is_parquet(out) else ".csv"
+        self.state = self._load_checkpoint()
+        self.seen = self._load_seen_ids()
+
+    def _load_checkpoint(self) -> dict:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_checkpoint(self) -> None:
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _parts(self) -> list:
+        return sorted(glob.glob(os.path.join(self.parts_dir, "part-*" + self.ext)))
+
+    def _load_seen_ids(self) -> set:
+        # a part can be on disk without its checkpoint update (crash in between), so dedupe
+        # against the parts themselves rather than trusting the checkpoint alone
+        seen = set()
+        for part in self._parts():
+            seen.update(read_dataset(part, columns=["id"])["id"].tolist())
+        return seen
+
+    def _put(self, rows: queue.Queue, item, stop: threading.Event) -> bool:
+        """Put `item` unless the run is stopping; False once it is."""
+        while not stop.is_set():
+            try:
+                rows.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, query: str, rows: queue.Queue, stop: threading.Event) -> None:
+        st = self.state.get(query, {})
+        count, last_id = st.get("count", 0), st.get("last_id")
+        try:
+            if count < self.limit:
+                max_id = last_id - 1 if last_id is not None else None
+                for row in self.source.items(query, max_id=max_id):
+                    self.limiter.acquire()
+                    if not self._put(rows, (query, row), stop):
+                        return
+                    count += 1
+                    if count >= self.limit:
+                        break
+            self._put(rows, (query, _DONE), stop)
+        except Exception as e:
+            self._put(rows, (query, e), stop)
+
+    def _flush(self, batch: list) -> None:
+        import pandas as pd
+        if batch:
+            path = os.path.join(self.parts_dir, f"part-{len(self._parts()):05d}{self.ext}")
+            write_dataset(pd.DataFrame(batch, columns=COLUMNS), path)
+            batch.clear()
+        self._save_checkpoint()
+
+    def run(self, queries: list) -> int:
+        """Collect every query, returns the number of new rows written."""
+        from tqdm import tqdm
+        pending = [q for q in queries if not self.state.get(q, {}).get("done")]
+        for q in queries:
+            if q not in pending:
+                print(f"query already complete: {q!r}")
+            elif q in self.state:
+                print(f"resuming {q!r} after {self.state[q]['count']} items (last id {self.state[q]['last_id']})")
+        rows = queue.Queue(maxsize=4 * self.batch_size)  # producers block instead of growing memory
+        stop = threading.Event()
+        batch, written, failed = [], 0, []
+        pool = ThreadPoolExecutor(max_workers=max(self.workers, 1))
+        try:
+            for q in pending:
+                pool.submit(self._produce, q, rows, stop)
+            running = len(pending)
+            with tqdm(unit="tweets") as bar:
+                while running:
+                    query, item = rows.get()
+                    st = self.state.setdefault(query, {"count": 0, "last_id": None, "done": False})
+                    if item is _DONE or isinstance(item, Exception):
+                        running -= 1
+                        if item is _DONE:
+                            st["done"] = True
+                        else:
+                            failed.append((query, item))
+                        continue
+                    st["count"] += 1
+                    st["last_id"] = item["id"]
+                    bar.update(1)
+                    if item["id"] in self.seen:
+                        continue
+                    self.seen.add(item["id"])
+                    batch.append(item)
+                    written += 1
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch)
+        finally:
+            # on an error or Ctrl+C here, producers blocked on the full queue must not keep the
+            # pool (and the process) waiting: stop them, then wait for them to return
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+        self._flush(batch)
+        for query, e in failed:
+            print(f"query {query!r} stopped: {e} (run again to resume)")
+        return written
+
+    def complete(self, queries: list) -> bool:
+        return all(self.state.get(q, {}).get("done") for q in queries)
+
+    def merge(self) -> str:
+        """Concatenate the parts into `out` chunk by chunk, then drop the parts directory."""
+        import pandas as pd
+        os.makedirs(os.path.dirname(self.out) or ".", exist_ok=True)
+        parts = self._parts()
+        if not parts:
+            write_dataset(pd.DataFrame(columns=COLUMNS), self.out)
+        else:
+            with ChunkWriter(self.out) as writer:
+                for part in parts:
+                    for chunk in iter_chunks(part, self.batch_size):
+                        writer.write(chunk)
+        shutil.rmtree(self.parts_dir)
+        return self.out
+
+
+def collect(queries: list, out: str, source=None, limit: int = 500, batch_size: int = 10000,
+            workers: int = 4, rate: float = 0.0, fresh: bool = False):
+    """Collect `queries` into `out`; returns the output path, or None if a query must be resumed."""
+    collector = Collector(source or SnscrapeSource(), out, limit=limit, batch_size=batch_size,
+                          workers=workers, rate=rate, fresh=fresh)
+    new = collector.run(queries)
+    print(f"{new} new rows, {len(collector.seen)} unique ids so far")
+    if not collector.complete(queries):
+        return None
+    collector.merge()
+    print("Saved:", out)
+    return out
+
+def fetch_with_snscrape(query, limit=500, out_csv=default_path(RAW_DATASET)):
+    return collect([query], out_csv, SnscrapeSource(), limit=limit)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--mode", choices=["csv", "scrape"], default="csv")
     parser.add_argument("--csv", help="Path to CSV with columns text,label (if mode=csv)")
-    parser.add_argument("--query", help="Search query for snscrape (if mode=scrape)", default="product review")
-    parser.add_argument("--limit", type=int, default=500)
-    parser.add_argument("--out", default="social-media-sentiment-analysis/data/raw/tweets_scraped.csv")
+    parser.add_argument("--query", action="append",
+                        help="Search query (if mode=scrape); repeat to collect several concurrently "
+                             "(default: 'product review')")
+    parser.add_argument("--limit", type=int, default=500, help="max items per query")
+    parser.add_argument("--out", default=default_path(RAW_DATASET))
+    parser.add_argument("--source", choices=sorted(SOURCES), default="snscrape",
+                        help="fake: local generator for testing, no network")
+    parser.add_argument("--workers", type=int, default=4, help="queries collected at the same time")
+    parser.add_argument("--rate", type=float, default=0.0, help="max items/s for the source (0: unlimited)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per flushed part")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint of a previous run")
     args = parser.parse_args()
 
     if args.mode == "csv":
@@ -48,7 +302,10 @@ def main():
             raise SystemExit(f"CSV not found: {args.csv}")
         print("Using existing CSV:", args.csv)
     else:
-        fetch_with_snscrape(args.query, limit=args.limit, out_csv=args.out)
+        queries = args.query or ["product review"]
+        if collect(queries, args.out, SOURCES[args.source](), limit=args.limit, batch_size=args.batch_size,
+                   workers=args.workers, rate=args.rate, fresh=args.fresh) is None:
+            raise SystemExit("Collection incomplete, run the same command again to resume.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
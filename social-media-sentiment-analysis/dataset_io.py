@@ -0,0 +1,310 @@
+"""
+dataset_io.py
+- Dataset I/O shared by the pipeline scripts. The format follows the file extension:
+  .parquet/.pq (pyarrow) or CSV, optionally compressed as .gz (gzip) or .zst (needs `zstandard`).
+- New datasets default to Parquet when pyarrow is installed and fall back to CSV otherwise
+  (see default_path; resolve_dataset picks the newest copy of a dataset stem). Parquet stores `label` dictionary-encoded, and
+  readers can ask for just the columns they need (column projection), which for Parquet
+  means the other columns are never read from disk.
+- A directory is read as one dataset made of its part-* files in name order (the day-partitioned
+  output of preprocess.py --incremental).
+"""
+import gzip
+import importlib.util
+import os
+import time
+
+# paths without extension; default_path() adds .parquet or .csv
+RAW_DATASET = "social-media-sentiment-analysis/data/raw/tweets_scraped"
+PROCESSED_DATASET = "social-media-sentiment-analysis/data/processed/tweets_clean"
+DEDUPED_DATASET = "social-media-sentiment-analysis/data/processed/tweets_dedup"
+
+# low-cardinality columns stored dictionary-encoded in Parquet
+DICTIONARY_COLUMNS = ("label",)
+
+
+def is_parquet(path) -> bool:
+    return str(path).endswith((".parquet", ".pq"))
+
+
+def has_pyarrow() -> bool:
+    # find_spec only locates the package; importing pyarrow here would cost ~150 ms at the
+    # start of every script that computes a default path
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def default_path(stem: str) -> str:
+    """`stem` + .parquet if pyarrow is available, else + .csv."""
+    return stem + (".parquet" if has_pyarrow() else ".csv")
+
+
+def _modified(path: str) -> float:
+    """Last modification of a file, or of the newest part file of a partitioned directory."""
+    if os.path.isdir(path):
+        return max((os.path.getmtime(f) for f in dataset_files(path)), default=0.0)
+    return os.path.getmtime(path)
+
+
+def resolve_dataset(path) -> str:
+    """The dataset to read for `path`.
+    - A path without extension (RAW_DATASET, PROCESSED_DATASET, ...) resolves to the newest of
+      <stem>.parquet, <stem>.csv and the partitioned directory <stem>, so a stale CSV next to a
+      freshly written Parquet file is not picked up; default_path(stem) if none exists.
+    - A path with extension is returned if it exists, else the same dataset in the other format
+      (.parquet <-> .csv) or as a partitioned directory, if that exists."""
+    path = str(path)
+    base, ext = os.path.splitext(path)
+    if not ext:
+        # ties (same mtime) go to default_path's format
+        preferred = default_path(path)
+        candidates = [preferred, path + (".csv" if preferred.endswith(".parquet") else ".parquet"), path]
+        existing = [c for c in candidates if os.path.exists(c) and (os.path.isfile(c) or dataset_files(c))]
+        return max(existing, key=_modified) if existing else preferred
+    if os.path.exists(path):
+        return path
+    for other in (".parquet", ".csv"):
+        if other != ext and os.path.exists(base + other):
+            return base + other
+    if os.path.isdir(base):
+        return base
+    return path
+
+
+def dataset_files(path) -> list:
+    """The data files of a dataset: `path` itself, or the part-* files of a directory in name order."""
+    path = str(path)
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith((".", "_"))]
+        files.extend(os.path.join(root, n) for n in names if n.startswith("part-"))
+    return sorted(files)
+
+
+def dataset_columns(path) -> list:
+    """Column names without reading the data."""
+    if os.path.isdir(path):
+        files = dataset_files(path)
+        return dataset_columns(files[0]) if files else []
+    if is_parquet(path):
+        return list(_pyarrow().parquet.read_schema(path).names)
+    import pandas as pd
+    return list(pd.read_csv(path, encoding="utf-8", nrows=0).columns)
+
+
+def read_dataset(path, columns=None):
+    """Load a CSV or Parquet dataset (or a directory of parts), only `columns` if given."""
+    import pandas as pd
+    if os.path.isdir(path):
+        parts = [read_dataset(f, columns) for f in dataset_files(path)]
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    if is_parquet(path):
+        _pyarrow()
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, encoding="utf-8", usecols=columns)
+
+
+def read_head(path, n: int, columns=None):
+    """The first `n` rows only: nrows for CSV, the first record batches for Parquet."""
+    import pandas as pd
+    if os.path.isdir(path):
+        parts, rows = [], 0
+        for f in dataset_files(path):
+            if rows >= n:
+                break
+            parts.append(read_head(f, n - rows, columns))
+            rows += len(parts[-1])
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    if is_parquet(path):
+        pa = _pyarrow()
+        batches, rows = [], 0
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=max(n, 1), columns=columns):
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= n:
+                break
+        if not batches:
+            return pd.read_parquet(path, columns=columns)  # no rows: keeps the schema
+        return pa.Table.from_batches(batches).slice(0, n).to_pandas()
+    return pd.read_csv(path, encoding="utf-8", usecols=columns, nrows=n, compression="infer")
+
+
+def count_rows(path) -> tuple:
+    """(rows, exact): Parquet row counts come from the file metadata; CSV rows are counted as
+    lines minus the header, reading raw bytes, so quoted fields containing newlines make the
+    count too high (exact is False)."""
+    if os.path.isdir(path):
+        counts = [count_rows(f) for f in dataset_files(path)]
+        return sum(c for c, _ in counts), all(e for _, e in counts)
+    if is_parquet(path):
+        return _pyarrow().parquet.ParquetFile(path).metadata.num_rows, True
+    lines, last = 0, b"\n"
+    with _open_binary(str(path)) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1  # no newline after the last row
+    return max(lines - 1, 0), False
+
+
+def _open_binary(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except Exception:
+            raise RuntimeError("zstandard is required for .zst files. Install with: pip install zstandard")
+        return zstandard.open(path, "rb")
+    return open(path, "rb")
+
+
+def _encode(df):
+    for col in DICTIONARY_COLUMNS:
+        if col in df.columns and df[col].dtype.name != "category":
+            df = df.assign(**{col: df[col].astype(str).astype("category")})
+    return df
+
+
+def write_dataset(df, path) -> None:
+    """Write a whole DataFrame as CSV or Parquet (label dictionary-encoded)."""
+    path = str(path)
+    if is_parquet(path):
+        _pyarrow()
+        _encode(df).to_parquet(path, index=False)
+    else:
+        with open_text_output(path) as f:
+            df.to_csv(f, index=False)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except Exception:
+        raise RuntimeError("pyarrow is required for Parquet files. Install with: pip install pyarrow")
+    return pyarrow
+
+
+def open_text_output(path: str):
+    """Open `path` for text writing, compressing by extension (.gz / .zst)."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except Exception:
+            raise RuntimeError("zstandard is required for .zst files. Install with: pip install zstandard")
+        return zstandard.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def iter_csv_chunks(path: str, chunksize: int, **kwargs):
+    """Yield DataFrame chunks of `path`; pandas infers .gz / .zst input compression."""
+    import pandas as pd
+    with pd.read_csv(path, encoding="utf-8", chunksize=chunksize, compression="infer", **kwargs) as reader:
+        yield from reader
+
+
+def iter_chunks(path: str, chunksize: int, columns=None, dtype=None):
+    """Yield DataFrame chunks from a CSV (.csv/.gz/.zst) or Parquet file (or each part of a
+    directory), optionally only `columns`. `dtype` is passed to read_csv (Parquet files carry
+    their own types): with dtype=str a CSV column comes out the same in every chunk, instead of
+    float64 in a chunk where it has an empty field."""
+    if os.path.isdir(path):
+        for f in dataset_files(path):
+            yield from iter_chunks(f, chunksize, columns, dtype)
+    elif is_parquet(path):
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from iter_csv_chunks(path, chunksize, usecols=columns, dtype=dtype)
+
+
+def _text_schema(table):
+    """The schema of a first Parquet chunk, with the columns that are all null in it (read by
+    pandas as float64 or object) stored as strings: the file's schema is fixed by this chunk,
+    and a later chunk may have text there (e.g. `user`)."""
+    pa = _pyarrow()
+    fields = [pa.field(f.name, pa.string()) if (table.num_rows and table.column(f.name).null_count == table.num_rows
+                                                 and (pa.types.is_null(f.type) or pa.types.is_floating(f.type)))
+              else f for f in table.schema]
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+def _as_text(df, schema):
+    """Numbers in columns the file stores as strings, converted to str (NaN stays null)."""
+    pa = _pyarrow()
+    numeric = [f.name for f in schema if pa.types.is_string(f.type) and f.name in df.columns
+               and df[f.name].dtype.kind in "biuf"]
+    if not numeric:
+        return df
+    return df.assign(**{c: df[c].astype(str).where(df[c].notna(), None) for c in numeric})
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to one CSV (.csv/.gz/.zst) or Parquet output file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._handle = None
+        self._parquet = None
+        self._schema = None
+
+    def write(self, df) -> None:
+        if is_parquet(self.path):
+            pa = _pyarrow()
+            df = _encode(df)
+            if self._parquet is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._schema = _text_schema(table)
+                table = table.cast(self._schema)
+                self._parquet = pa.parquet.ParquetWriter(self.path, self._schema)
+            else:
+                table = pa.Table.from_pandas(_as_text(df, self._schema), schema=self._schema, preserve_index=False)
+            self._parquet.write_table(table)
+        else:
+            if self._handle is None:
+                self._handle = open_text_output(self.path)
+                df.to_csv(self._handle, index=False)
+            else:
+                df.to_csv(self._handle, index=False, header=False)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._handle is not None:
+            self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Throughput:
+    """Running rows/sec counter for chunked jobs."""
+
+    def __init__(self):
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def add(self, n: int) -> None:
+        self.rows += n
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.rows:,} rows in {self.elapsed:.1f}s ({self.rate:,.0f} rows/s)"
@@ -0,0 +1,232 @@
+"""
+dedup.py
+- Deduplication stage between preprocess.py and train_model.py: retweets and copy-pasted spam
+  otherwise inflate training time and put copies of the same text on both sides of the split.
+- Exact duplicates: rows whose text_clean hashes (64-bit) to one already kept.
+- Near duplicates: MinHash signatures over character shingles of text_clean, split into
+  bands for locality-sensitive hashing; a row whose band hash matches a band of a kept row
+  is dropped. Texts with Jaccard similarity above about (1/bands)^(1/rows per band) collide
+  (~0.77 with the default 64 permutations in 8 bands).
+- Streams the input chunk by chunk. Memory does not depend on the chunk count: per kept row
+  it holds one 64-bit text hash and one 64-bit key per band, in sorted numpy arrays.
+- The first occurrence of a text is kept, so row order decides which copy survives.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/dedup.py --input social-media-sentiment-analysis/data/processed/tweets_clean.parquet
+  python social-media-sentiment-analysis/dedup.py --input tweets_clean.parquet --output tweets_dedup.parquet --exact-only
+"""
+import argparse
+import os
+from typing import TYPE_CHECKING
+
+import instrumentation
+from dataset_io import iter_chunks, read_head, ChunkWriter, Throughput, default_path, PROCESSED_DATASET, DEDUPED_DATASET
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_CHUNKSIZE = 100_000
+_BATCH_SHINGLES = 32_768  # shingles per batch; the (permutations x shingles) matrix stays in cache
+_MIX = 0xBF58476D1CE4E5B9  # 64-bit finalizer constant (splitmix64)
+
+
+def _offsets(counts: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    return np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+
+def _sorted_unique(values: "np.ndarray") -> "np.ndarray":
+    # sort + neighbour compare; np.unique's hash-based path is several times slower on uint64
+    import numpy as np
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate([[True], values[1:] != values[:-1]])]
+    return values
+
+
+class HashSet:
+    """Set of uint64 values kept as a few sorted arrays; a new array is merged into the
+    previous one while that one is not more than twice its size, so there are O(log n)."""
+
+    def __init__(self):
+        self.levels = []
+
+    def __len__(self) -> int:
+        return sum(len(level) for level in self.levels)
+
+    def contains(self, values: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+        found = np.zeros(len(values), dtype=bool)
+        for level in self.levels:
+            pos = np.minimum(np.searchsorted(level, values), len(level) - 1)
+            found |= level[pos] == values
+        return found
+
+    def add(self, values: "np.ndarray") -> None:
+        import numpy as np
+        level = _sorted_unique(values)
+        if not len(level):
+            return
+        while self.levels and len(self.levels[-1]) <= 2 * len(level):
+            level = _sorted_unique(np.concatenate([self.levels.pop(), level]))
+        self.levels.append(level)
+
+
+def text_hashes(texts) -> "np.ndarray":
+    import numpy as np
+    import pandas as pd
+    return pd.util.hash_array(np.asarray(texts, dtype=object))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, bands: int = 8, shingle: int = 5, seed: int = 1):
+        import numpy as np
+        if num_perm % bands:
+            raise SystemExit(f"--num-perm ({num_perm}) must be a multiple of --bands ({bands})")
+        self.num_perm, self.bands, self.rows, self.shingle = num_perm, bands, num_perm // bands, shingle
+        rng = np.random.default_rng(seed)
+        # h(x) = a * x + b mod 2^32 with odd a is a permutation of the 32-bit shingle hashes
+        self.a = (rng.integers(0, 2**31, num_perm, dtype=np.uint32) * np.uint32(2) + np.uint32(1))[:, None]
+        self.b = rng.integers(0, 2**32, num_perm, dtype=np.uint32)[:, None]
+        self.salt = rng.integers(1, 2**63, (bands, self.rows), dtype=np.uint64)
+        self.char_mult = rng.integers(1, 2**63, shingle, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def shingle_hashes(self, texts: list) -> tuple:
+        """32-bit hashes of every character k-gram of every text (texts shorter than k give one),
+        computed from the code points of all texts at once. Returns (hashes, k-grams per text)."""
+        import numpy as np
+        k = self.shingle
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        # every text is followed by k-1 zeros, so no k-gram spans two texts
+        starts = np.concatenate([[0], np.cumsum(lengths + k - 1)[:-1]])
+        padded = np.zeros(int((lengths + k - 1).sum()), dtype=np.uint64)
+        padded[np.repeat(starts - _offsets(lengths), lengths) + np.arange(len(codes))] = codes
+        counts = np.maximum(lengths - k + 1, 1)
+        first = np.repeat(starts - _offsets(counts), counts) + np.arange(int(counts.sum()))
+        h = np.zeros(len(first), dtype=np.uint64)
+        for t in range(k):
+            h += padded[first + t] * self.char_mult[t]
+        h ^= h >> np.uint64(31)
+        h *= _MIX
+        h ^= h >> np.uint64(29)
+        return (h >> np.uint64(32)).astype(np.uint32), counts
+
+    def signatures(self, texts: list) -> "np.ndarray":
+        """(len(texts), num_perm) minimum hash values."""
+        import numpy as np
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        ends = np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)))
+        start = 0
+        while start < len(texts):
+            # texts of about _BATCH_SHINGLES characters, at least one
+            base = ends[start - 1] if start else 0
+            stop = max(int(np.searchsorted(ends, base + _BATCH_SHINGLES, side="right")), start + 1)
+            h, counts = self.shingle_hashes(texts[start:stop])
+            # (permutations x shingles), so each text's minimum is a reduceat over a contiguous run
+            perm = np.empty((self.num_perm, len(h)), dtype=np.uint32)
+            np.multiply(self.a, h, out=perm)
+            perm += self.b
+            out[start:stop] = np.minimum.reduceat(perm, _offsets(counts), axis=1).T
+            start = stop
+        return out
+
+    def band_keys(self, sig: "np.ndarray") -> "np.ndarray":
+        """(n, bands) 64-bit keys; band j only collides with band j."""
+        import numpy as np
+        bands = sig.astype(np.uint64).reshape(len(sig), self.bands, self.rows)
+        with np.errstate(over="ignore"):
+            keys = (bands * self.salt).sum(axis=2, dtype=np.uint64)
+        return keys + np.arange(self.bands, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+
+
+def _first_in_chunk(keys: "np.ndarray") -> "np.ndarray":
+    """True where no earlier row of the chunk has the same key (per column for 2-d keys)."""
+    import numpy as np
+    keys = keys.reshape(len(keys), -1)
+    first = np.ones(len(keys), dtype=bool)
+    for j in range(keys.shape[1]):
+        order = np.argsort(keys[:, j], kind="stable")
+        ordered = keys[order, j]
+        repeat = np.concatenate([[False], ordered[1:] == ordered[:-1]])
+        first[order[repeat]] = False
+    return first
+
+
+class Deduplicator:
+    def __init__(self, near: bool = True, **minhash):
+        self.exact = HashSet()
+        self.near = HashSet() if near else None
+        self.hasher = MinHasher(**minhash) if near else None
+        self.counts = {"rows": 0, "exact": 0, "near": 0}
+
+    def keep_mask(self, texts: list) -> "np.ndarray":
+        """Mask of rows to keep; kept rows are remembered for the following chunks."""
+        import numpy as np
+        if not len(texts):
+            return np.zeros(0, dtype=bool)
+        h = text_hashes(texts)
+        keep = ~self.exact.contains(h) & _first_in_chunk(h)
+        self.counts["rows"] += len(texts)
+        self.counts["exact"] += int((~keep).sum())
+        if self.near is not None and keep.any():
+            idx = np.flatnonzero(keep)
+            keys = self.hasher.band_keys(self.hasher.signatures([texts[i] for i in idx]))
+            unique = ~self.near.contains(keys.ravel()).reshape(keys.shape).any(axis=1) & _first_in_chunk(keys)
+            keep[idx[~unique]] = False
+            self.counts["near"] += int((~unique).sum())
+            self.near.add(keys[unique].ravel())
+        self.exact.add(h[keep])
+        return keep
+
+    def summary(self) -> str:
+        c = self.counts
+        removed = c["exact"] + c["near"]
+        share = removed / c["rows"] if c["rows"] else 0.0
+        return (f"{c['rows']:,} rows: removed {c['exact']:,} exact and {c['near']:,} near duplicates "
+                f"({share:.1%}), kept {c['rows'] - removed:,}")
+
+
+def dedup(args) -> Deduplicator:
+    d = Deduplicator(near=not args.exact_only, num_perm=args.num_perm, bands=args.bands, shingle=args.shingle)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    stats = Throughput()
+    written = False
+    with instrumentation.stage("load+dedup+save") as record, ChunkWriter(args.output) as out:
+        for chunk in iter_chunks(args.input, args.chunksize):
+            if "text_clean" not in chunk.columns:
+                raise SystemExit("Input must have a 'text_clean' column (run preprocess.py first)")
+            keep = d.keep_mask(chunk["text_clean"].fillna("").astype(str).tolist())
+            out.write(chunk[keep])
+            written = True
+            stats.add(len(chunk))
+            print(f"{stats}; kept {out.rows:,}")
+        if not written:
+            # an empty Parquet input has no batches: still write the (empty) dataset with its schema
+            out.write(read_head(args.input, 0))
+        if record is not None:
+            record["rows"] = stats.rows
+    return d
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop exact and near-duplicate texts (MinHash/LSH)")
+    parser.add_argument("--input", default=default_path(PROCESSED_DATASET),
+                        help="processed dataset with text_clean (file or partitioned directory)")
+    parser.add_argument("--output", default=default_path(DEDUPED_DATASET))
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--exact-only", action="store_true", help="skip MinHash near-duplicate detection")
+    parser.add_argument("--num-perm", type=int, default=64, help="MinHash permutations")
+    parser.add_argument("--bands", type=int, default=8, help="LSH bands (num-perm / bands rows each)")
+    parser.add_argument("--shingle", type=int, default=5, help="character shingle length")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.run("dedup", args):
+        d = dedup(args)
+    print(d.summary())
+    print("Saved deduplicated data to", args.output)
+
+
+if __name__ == "__main__":
+    main()
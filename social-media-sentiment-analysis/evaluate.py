@@ -1,42 +1,193 @@
 """
 evaluate.py
 - Load pipeline and dataset, produce classification report & confusion matrix figure.
+- --chunksize N streams the dataset instead: each chunk is predicted and only added to a
+  running confusion matrix, so memory is bounded by the chunk size, not the holdout size.
+  The report text is rebuilt from the confusion counts in classification_report's layout and
+  the png is the same. --workers N predicts chunks in a process pool (predict.py's), in order.
+- --memo-size / --memo-file score identical texts once (prediction_cache.py, as in predict.py).
+- Stage timings/memory go to a JSON run log (instrumentation.py); --profile adds a cProfile dump.
 """
 import argparse
 import os
-import pandas as pd
-import joblib
-from sklearn.metrics import classification_report, confusion_matrix
-import seaborn as sns
-import matplotlib.pyplot as plt
+from typing import TYPE_CHECKING
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--model", required=True)
-    parser.add_argument("--input", required=True, help="processed csv with text_clean and label")
-    parser.add_argument("--out-dir", default="social-media-sentiment-analysis/figures")
-    args = parser.parse_args()
+import instrumentation
+from instrumentation import stage
+from dataset_io import read_dataset, dataset_columns, iter_chunks, Throughput
+from model_artifact import load_model
+from predict import _scored_chunks, add_memo_arguments, check_memo_arguments
+from prediction_cache import memoized, combine_stats, format_stats
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_CHUNKSIZE = 100_000
+
+def save_confusion_matrix(cm, labels, path: str) -> None:
+    from reporting import plot_confusion_matrix
+    plot_confusion_matrix(cm, labels, path)
+
+
+class ConfusionCounts:
+    """Confusion matrix accumulated chunk by chunk; labels are added as they show up."""
+
+    def __init__(self):
+        import numpy as np
+        self._index = {}
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def update(self, y_true, y_pred) -> None:
+        import numpy as np
+        if len(y_true) == 0:
+            return
+        y_true, y_pred = np.asarray(y_true, dtype=str), np.asarray(y_pred, dtype=str)
+        seen, codes = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+        for label in seen:
+            self._index.setdefault(str(label), len(self._index))
+        k = len(self._index)
+        if k > len(self.counts):
+            grown = np.zeros((k, k), dtype=np.int64)
+            grown[:len(self.counts), :len(self.counts)] = self.counts
+            self.counts = grown
+        glob = np.array([self._index[str(label)] for label in seen], dtype=np.int64)[codes]
+        t, p = glob[:len(y_true)], glob[len(y_true):]
+        self.counts += np.bincount(t * k + p, minlength=k * k).reshape(k, k)
+
+    @property
+    def labels(self) -> list:
+        """All labels, true or predicted, sorted (classification_report's rows)."""
+        return sorted(self._index)
+
+    @property
+    def true_labels(self) -> list:
+        """Labels present in y_true, sorted (the confusion matrix axes)."""
+        return sorted(label for label, i in self._index.items() if self.counts[i].sum())
+
+    def matrix(self, labels: list) -> "np.ndarray":
+        import numpy as np
+        order = [self._index[label] for label in labels]
+        return self.counts[np.ix_(order, order)]
 
-    model = joblib.load(args.model)
-    df = pd.read_csv(args.input, encoding="utf-8")
-    X = df["text_clean"].astype(str)
-    y = df["label"].astype(str)
 
-    preds = model.predict(X)
+def report_from_confusion(cm: "np.ndarray", labels: list, digits: int = 2) -> str:
+    """classification_report's text for a confusion matrix (rows true, columns predicted);
+    undefined precision/recall count as 0, like its default zero_division."""
+    import numpy as np
+    tp = np.diag(cm).astype(float)
+    support, predicted = cm.sum(axis=1), cm.sum(axis=0)
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    # 2tp / (2tp + fp + fn), the form sklearn uses, so ties round the same way
+    denom = (support + predicted).astype(float)
+    f1 = np.divide(2 * tp, denom, out=np.zeros_like(tp), where=denom > 0)
+    total = int(support.sum())
+
+    headers = ["precision", "recall", "f1-score", "support"]
+    width = max(max(len(str(label)) for label in labels), len("weighted avg"), digits)
+    head_fmt = "{:>{width}s} " + " {:>9}" * len(headers)
+    row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+    report = head_fmt.format("", *headers, width=width) + "\n\n"
+    for row in zip(labels, precision, recall, f1, support):
+        report += row_fmt.format(str(row[0]), *row[1:4], int(row[4]), width=width, digits=digits)
+    report += "\n"
+    accuracy = tp.sum() / total if total else 0.0
+    report += ("{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n").format(
+        "accuracy", "", "", accuracy, total, width=width, digits=digits)
+    def weighted(v):
+        return np.average(v, weights=support) if total else 0.0
+
+    for name, avg in (("macro avg", np.mean), ("weighted avg", weighted)):
+        report += row_fmt.format(name, avg(precision), avg(recall), avg(f1), total, width=width, digits=digits)
+    return report
+
+
+def _streamed_confusion(args) -> ConfusionCounts:
+    counts = ConfusionCounts()
+    stats = Throughput()
+    memo_stats = {}
+    chunks = iter_chunks(args.input, args.chunksize, columns=["text_clean", "label"])
+    scored = _scored_chunks(chunks, args.model, "text_clean", False, args.workers, proba=False,
+                            memo_size=args.memo_size, memo_file=args.memo_file, memo_stats=memo_stats)
+    for chunk, preds, _ in scored:
+        counts.update(chunk["label"].astype(str), preds)
+        stats.add(len(chunk))
+        print(f"evaluated {stats}")
+    if memo_stats:
+        print(format_stats(combine_stats(list(memo_stats.values()))))
+    return counts
+
+def evaluate_streaming(args) -> tuple:
+    with stage("predict+count") as record:
+        counts = _streamed_confusion(args)
+        if not counts.labels:
+            raise SystemExit(f"No rows to evaluate in {args.input}")
+        if record is not None:
+            record["rows"] = int(counts.counts.sum())
+    with stage("metrics"):
+        report = report_from_confusion(counts.matrix(counts.labels), counts.labels)
+        labels = counts.true_labels
+        cm = counts.matrix(labels)
+    return report, labels, cm
+
+def evaluate(args) -> None:
+    missing = {"text_clean", "label"} - set(dataset_columns(args.input))
+    if missing:
+        raise SystemExit(f"Input must contain columns: {sorted(missing)}")
+    if args.chunksize or args.workers > 1:
+        report, labels, cm = evaluate_streaming(args)
+    else:
+        report, labels, cm = evaluate_in_memory(args)
     print("Classification Report:")
-    print(classification_report(y, preds))
+    print(report)
 
-    labels = sorted(list(set(y)))
-    cm = confusion_matrix(y, preds, labels=labels)
     os.makedirs(args.out_dir, exist_ok=True)
-    plt.figure(figsize=(6,5))
-    sns.heatmap(cm, annot=True, fmt="d", xticklabels=labels, yticklabels=labels, cmap="Blues")
-    plt.xlabel("Predicted")
-    plt.ylabel("True")
     p = os.path.join(args.out_dir, "confusion_matrix.png")
-    plt.tight_layout()
-    plt.savefig(p)
+    with stage("plot"):
+        save_confusion_matrix(cm, labels, p)
     print("Saved confusion matrix to", p)
 
+def evaluate_in_memory(args) -> tuple:
+    from sklearn.metrics import classification_report, confusion_matrix
+    with stage("load_model"):
+        model = load_model(args.model)
+        if args.memo_size:
+            model = memoized(model, args.model, args.memo_size, args.memo_file)
+    with stage("load_data"):
+        df = read_dataset(args.input, columns=["text_clean", "label"])
+    X = df["text_clean"].fillna("").astype(str)
+    y = df["label"].astype(str)
+
+    with stage("predict", len(X)):
+        preds = model.predict(X)
+    if args.memo_size:
+        print(model.stats_line())
+        if args.memo_file:
+            model.save()
+    with stage("metrics", len(X)):
+        report = classification_report(y, preds)
+        labels = sorted(list(set(y)))
+        cm = confusion_matrix(y, preds, labels=labels)
+    return report, labels, cm
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True, help="joblib pipeline or compact model directory")
+    parser.add_argument("--input", required=True, help="processed csv/parquet with text_clean and label")
+    parser.add_argument("--out-dir", default="social-media-sentiment-analysis/figures")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the dataset this many rows at a time (bounded memory)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"predict chunks in N processes (streams with --chunksize, default {DEFAULT_CHUNKSIZE:,})")
+    add_memo_arguments(parser)
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+    check_memo_arguments(args)
+    if args.workers > 1 and not args.chunksize:
+        args.chunksize = DEFAULT_CHUNKSIZE
+
+    with instrumentation.run("evaluate", args):
+        evaluate(args)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
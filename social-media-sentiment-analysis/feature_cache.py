@@ -0,0 +1,203 @@
+"""
+feature_cache.py
+- Content-addressed on-disk cache for cleaned text and fitted features, shared by the scripts.
+- Keys are hashes of the input file's content plus the parameters that produced the entry
+  (cleaner version, vectorizer params, split), so a changed file or parameter is a miss.
+- Each entry is a directory under the cache root; entries are evicted least-recently-used
+  first once the cache grows past its size limit.
+- digests.json memoizes file content digests by (path, size, mtime). An entry's .complete
+  marker lists the digests known to the run that stored it; when entries are evicted, the
+  digests no remaining entry lists are dropped from digests.json.
+- Environment:
+    SENTIMENT_CACHE_DIR     cache root (default social-media-sentiment-analysis/.cache)
+    SENTIMENT_CACHE_MAX_MB  size limit in MB (default 2048)
+    SENTIMENT_CACHE=0       disable the cache
+"""
+import hashlib
+import json
+import os
+import shutil
+
+DEFAULT_DIR = "social-media-sentiment-analysis/.cache"
+DEFAULT_MAX_MB = 2048
+
+
+def file_digest(path: str) -> str:
+    """blake2b of the file content (read in 1 MB blocks)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def make_key(*parts) -> str:
+    blob = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+class FeatureCache:
+    def __init__(self, root: str = None, max_mb: float = None, enabled: bool = None):
+        self.root = root or os.environ.get("SENTIMENT_CACHE_DIR", DEFAULT_DIR)
+        self.max_bytes = int(float(max_mb or os.environ.get("SENTIMENT_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1e6)
+        self.enabled = enabled if enabled is not None else os.environ.get("SENTIMENT_CACHE", "1") != "0"
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}
+        if self.enabled:
+            # the limit may have been lowered since the last run
+            self.evict()
+
+    def digest(self, path: str) -> str:
+        """Content digest of `path`, memoized on (path, size, mtime) within a run and across runs.
+        A partitioned dataset directory digests to the combination of its part files."""
+        if os.path.isdir(path):
+            from dataset_io import dataset_files
+            return make_key(*[(os.path.relpath(f, path), self.digest(f)) for f in dataset_files(path)])
+        st = os.stat(path)
+        sig = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        if sig in self._digests:
+            return self._digests[sig]
+        index = os.path.join(self.root, "digests.json")
+        known = {}
+        if self.enabled and os.path.exists(index):
+            try:
+                with open(index, encoding="utf-8") as f:
+                    known = json.load(f)
+            except (OSError, ValueError):
+                known = {}
+        if sig not in known:
+            known[sig] = file_digest(path)
+            if self.enabled:
+                os.makedirs(self.root, exist_ok=True)
+                with open(index, "w", encoding="utf-8") as f:
+                    json.dump(known, f)
+        self._digests[sig] = known[sig]
+        return known[sig]
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def lookup(self, key: str):
+        """Entry directory for `key` if cached (and mark it recently used), else None."""
+        path = self._entry(key)
+        if self.enabled and os.path.isfile(os.path.join(path, ".complete")):
+            os.utime(path)
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def store(self, key: str, write) -> str:
+        """Create the entry for `key` by calling write(directory), then enforce the size limit."""
+        if not self.enabled:
+            return None
+        path = self._entry(key)
+        tmp = f"{path}.tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        write(tmp)
+        with open(os.path.join(tmp, ".complete"), "w", encoding="utf-8") as f:
+            json.dump(sorted(set(self._digests.values())), f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def entries(self) -> list:
+        """[(last_used, size_bytes, path)] for every complete entry."""
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(os.path.join(path, ".complete")):
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                out.append((os.path.getmtime(path), size, path))
+        return out
+
+    def evict(self) -> int:
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            self._prune_digests([path for _, _, path in entries])
+        return removed
+
+    def _prune_digests(self, kept: list) -> None:
+        """Drop the digests.json entries that none of the `kept` entries (nor this run) uses.
+        Entries from before .complete listed digests keep everything."""
+        used = set(self._digests.values())
+        for path in kept:
+            try:
+                with open(os.path.join(path, ".complete"), encoding="utf-8") as f:
+                    used.update(json.load(f))
+            except (OSError, ValueError):
+                return
+        index = os.path.join(self.root, "digests.json")
+        try:
+            with open(index, encoding="utf-8") as f:
+                known = json.load(f)
+        except (OSError, ValueError):
+            return
+        pruned = {sig: d for sig, d in known.items() if d in used}
+        if len(pruned) < len(known):
+            tmp = f"{index}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(pruned, f)
+            os.replace(tmp, index)
+
+    # cleaned text: one row per line (cleaned text never contains a newline)
+
+    def get_texts(self, key: str):
+        path = self.lookup(key)
+        if path is None:
+            return None
+        with open(os.path.join(path, "texts.txt"), encoding="utf-8") as f:
+            data = f.read()
+        return data.split("\n") if data else []
+
+    def put_texts(self, key: str, texts: list) -> None:
+        def write(d):
+            with open(os.path.join(d, "texts.txt"), "w", encoding="utf-8", newline="\n") as f:
+                f.write("\n".join(texts))
+        self.store(key, write)
+
+    # fitted features: the vectorizer (joblib) plus named sparse matrices (.npz)
+
+    def get_features(self, key: str):
+        """(vectorizer, {name: csr_matrix}) or None on a miss."""
+        path = self.lookup(key)
+        if path is None:
+            return None
+        import joblib
+        from scipy import sparse
+        vectorizer = joblib.load(os.path.join(path, "vectorizer.joblib"))
+        matrices = {f[:-4]: sparse.load_npz(os.path.join(path, f))
+                    for f in os.listdir(path) if f.endswith(".npz")}
+        return vectorizer, matrices
+
+    def put_features(self, key: str, vectorizer, matrices: dict) -> None:
+        import joblib
+        from scipy import sparse
+
+        def write(d):
+            joblib.dump(vectorizer, os.path.join(d, "vectorizer.joblib"))
+            for name, m in matrices.items():
+                # uncompressed: a cache hit should cost a read, not a decompression
+                sparse.save_npz(os.path.join(d, f"{name}.npz"), m.tocsr(), compressed=False)
+        self.store(key, write)
+
+    def stats_line(self) -> str:
+        if not self.enabled:
+            return "cache: disabled"
+        entries = self.entries()
+        size = sum(s for _, s, _ in entries) / 1e6
+        return (f"cache: {self.hits} hit(s), {self.misses} miss(es); {len(entries)} entries, "
+                f"{size:.1f} MB of {self.max_bytes / 1e6:g} MB in {self.root}")
+
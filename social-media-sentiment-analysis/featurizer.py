@@ -0,0 +1,290 @@
+"""
+featurizer.py
+- FusedTfidfVectorizer: drop-in for the TfidfVectorizer 'tfidf' step of the train_model.py /
+  train_quick.py pipelines that takes raw text. Cleaning (cleaning.py), tokenization and
+  n-gram lookup happen in one pass over batches of texts, so no text_clean column has to be
+  built, written or read back.
+- Same features as TfidfVectorizer(token_pattern default) on clean_text output: after the
+  cleaner only [a-z0-9'] runs are left, and \\b\\w\\w+\\b on those is exactly the [a-z0-9]{2,}
+  runs of the lowercased text with urls/mentions/'#' stripped. Vocabulary, idf and
+  normalization follow sklearn, up to ties in term frequency at the max_features cutoff
+  (the n-gram seen first wins here).
+- Vocabulary mode (default): fit counts 64-bit hashes of the n-grams, vectorized per batch,
+  and never holds a dict of every distinct n-gram; the strings of the kept columns are taken
+  back from the few texts where they first occur. transform looks columns up in a pandas Index.
+  Hashing mode (n_features=N): column = the n-gram hash mod N, no vocabulary.
+- Output is a CSR matrix with float32 data and int32 indices/indptr (int64 past 2^31 values),
+  built directly from the per-batch column arrays.
+- bench_featurizer.py compares time and peak memory with TfidfVectorizer.
+"""
+import numbers
+import re
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from cleaning import strip_markup, CLEANER_VERSION
+
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+
+TOKEN_PATTERN = r"[a-z0-9]{2,}"
+# identifies the featurizer's tokens for caches (feature_cache.py), like CLEANER_VERSION
+FEATURIZER_VERSION = f"2:{TOKEN_PATTERN}:{CLEANER_VERSION}"
+
+_words = re.compile(TOKEN_PATTERN).findall
+
+
+def _doc_ngrams(tokens: list, min_n: int, max_n: int) -> list:
+    if max_n == 1:
+        return tokens
+    out = list(tokens) if min_n == 1 else []
+    if max_n == 2:
+        out.extend([a + " " + b for a, b in zip(tokens, tokens[1:])])
+        return out
+    for n in range(max(min_n, 2), max_n + 1):
+        out.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return out
+
+
+def _gram_hashes(grams: list) -> "np.ndarray":
+    import numpy as np
+    import pandas as pd
+    if not grams:
+        return np.zeros(0, dtype=np.uint64)
+    return pd.util.hash_array(np.asarray(grams, dtype=object))
+
+
+def _df_limit(value, n_docs: int) -> float:
+    """Document count for min_df/max_df, unrounded like TfidfVectorizer (max_df=0.95 of 10
+    docs keeps df <= 9.5)."""
+    return value if isinstance(value, numbers.Integral) else value * n_docs
+
+
+class FusedTfidfVectorizer(TransformerMixin, BaseEstimator):
+    def __init__(self, ngram_range: tuple = (1, 1), max_features: int = None, min_df=1, max_df=1.0,
+                 n_features: int = None, norm: str = "l2", use_idf: bool = True, smooth_idf: bool = True,
+                 sublinear_tf: bool = False, clean: bool = True, batch_size: int = 10_000):
+        self.ngram_range = ngram_range
+        self.max_features = max_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.n_features = n_features
+        self.norm = norm
+        self.use_idf = use_idf
+        self.smooth_idf = smooth_idf
+        self.sublinear_tf = sublinear_tf
+        self.clean = clean
+        self.batch_size = batch_size
+
+    def _analyze(self, texts: list) -> tuple:
+        """(n-grams of all texts, n-grams per text). clean=False skips the url/mention strip
+        for text that already went through cleaning.py (the tokens are the same)."""
+        min_n, max_n = self.ngram_range
+        strip = self.clean
+        grams, lengths = [], []
+        for s in texts:
+            if not isinstance(s, str):
+                s = ""
+            s = s.lower()
+            g = _doc_ngrams(_words(strip_markup(s) if strip else s), min_n, max_n)
+            grams.extend(g)
+            lengths.append(len(g))
+        return grams, lengths
+
+    def _batches(self, X):
+        it = iter(X)
+        while True:
+            batch = list(islice(it, self.batch_size))
+            if not batch:
+                return
+            yield self._analyze(batch)
+
+    def _hash_columns(self, grams: list) -> "np.ndarray":
+        import numpy as np
+        return (_gram_hashes(grams) % np.uint64(self.n_features)).astype(np.int32)
+
+    @staticmethod
+    def _counts(cols: list, lengths: list, n_cols: int, data: "np.ndarray" = None) -> "sparse.csr_matrix":
+        """CSR of n-gram counts from per-batch column arrays (`data` for entries that are
+        already counts); columns < 0 are dropped."""
+        import numpy as np
+        from scipy import sparse
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int32)
+        lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+        keep = cols >= 0
+        if not keep.all():
+            rows = np.repeat(np.arange(len(lengths)), lengths)
+            lengths = np.bincount(rows[keep], minlength=len(lengths))
+            cols = cols[keep]
+            data = data[keep] if data is not None else None
+        index_dtype = np.int32 if len(cols) < 2**31 else np.int64
+        indptr = np.zeros(len(lengths) + 1, dtype=index_dtype)
+        np.cumsum(lengths, out=indptr[1:])
+        if data is None:
+            data = np.ones(len(cols), dtype=np.float32)
+        X = sparse.csr_matrix((data, cols.astype(index_dtype, copy=False), indptr), shape=(len(lengths), n_cols))
+        X.sum_duplicates()
+        return X
+
+    def _weight(self, X: "sparse.csr_matrix") -> "sparse.csr_matrix":
+        import numpy as np
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1.0
+        if self.use_idf:
+            X.data *= self._idf32[X.indices]
+        if self.norm in ("l1", "l2"):
+            rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+            values = X.data * X.data if self.norm == "l2" else np.abs(X.data)
+            norms = np.bincount(rows, weights=values, minlength=X.shape[0])
+            if self.norm == "l2":
+                norms = np.sqrt(norms)
+            norms[norms == 0] = 1.0
+            X.data /= norms[rows].astype(np.float32)
+        return X
+
+    def _set_idf(self, df: "np.ndarray", n_docs: int) -> None:
+        import numpy as np
+        smooth = int(self.smooth_idf)
+        self.idf_ = np.log((n_docs + smooth) / (df + smooth)) + 1.0
+        self._idf32 = self.idf_.astype(np.float32)
+
+    def fit(self, X, y=None):
+        self.fit_transform(X)
+        return self
+
+    def fit_transform(self, X, y=None) -> "sparse.csr_matrix":
+        import numpy as np
+        import pandas as pd
+        if self.n_features:
+            cols, lengths = [], []
+            for grams, n in self._batches(X):
+                cols.append(self._hash_columns(grams))
+                lengths.append(np.asarray(n, dtype=np.int64))
+            counts = self._counts(cols, lengths, self.n_features)
+            self._set_idf(np.bincount(counts.indices, minlength=self.n_features), counts.shape[0])
+            return self._weight(counts)
+
+        texts = X if hasattr(X, "__getitem__") else list(X)
+        hashes, lengths = [], []
+        for grams, n in self._batches(texts):
+            hashes.append(_gram_hashes(grams))
+            lengths.append(np.asarray(n, dtype=np.int64))
+        # provisional column per distinct n-gram hash, numbered in order of first appearance
+        codes, uniques = pd.factorize(np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64))
+        del hashes
+        n_terms = len(uniques)
+        first = np.flatnonzero(np.diff(np.maximum.accumulate(codes), prepend=-1) > 0)
+        counts = self._counts([codes.astype(np.int32)], lengths, n_terms)
+        del codes
+        n_docs = counts.shape[0]
+        df = np.bincount(counts.indices, minlength=n_terms)
+        tf = np.bincount(counts.indices, weights=counts.data, minlength=n_terms)
+
+        min_count, max_count = _df_limit(self.min_df, n_docs), _df_limit(self.max_df, n_docs)
+        if max_count < min_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+        keep = (df >= min_count) & (df <= max_count)
+        if self.max_features is not None and keep.sum() > self.max_features:
+            idx = np.flatnonzero(keep)
+            best = idx[np.argsort(-tf[idx], kind="stable")[:self.max_features]]
+            keep[:] = False
+            keep[best] = True
+        if not keep.any():
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        kept = np.flatnonzero(keep)
+        terms = self._recover_terms(texts, first[kept], np.concatenate(lengths))
+        alpha = np.argsort(terms)  # final columns in alphabetical order, like TfidfVectorizer
+        column = np.full(n_terms, -1, dtype=np.int32)
+        column[kept[alpha]] = np.arange(len(kept), dtype=np.int32)
+        self.vocabulary_ = dict(zip(terms[alpha].tolist(), range(len(kept))))
+        self._set_idf(df[kept[alpha]], n_docs)
+
+        remapped = column[counts.indices]
+        X = self._counts([remapped], [np.diff(counts.indptr)], len(kept), counts.data)
+        return self._weight(X)
+
+    def _recover_terms(self, texts, positions: "np.ndarray", lengths: "np.ndarray") -> "np.ndarray":
+        """The n-gram strings at the given positions of the n-gram stream (one per kept column),
+        re-analyzing only the texts they occur in."""
+        import numpy as np
+        ends = np.cumsum(lengths)
+        docs = np.searchsorted(ends, positions, side="right")
+        offsets = positions - (ends[docs] - lengths[docs])
+        get = texts.iloc.__getitem__ if hasattr(texts, "iloc") else texts.__getitem__
+        terms = np.empty(len(positions), dtype=object)
+        order = np.argsort(docs, kind="stable")
+        bounds = np.flatnonzero(np.diff(docs[order], prepend=-1, append=-1))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            at = order[lo:hi]
+            grams = self._analyze([get(int(docs[at[0]]))])[0]
+            terms[at] = [grams[k] for k in offsets[at].tolist()]
+        return terms
+
+    def _lookup(self) -> "pd.Index":
+        import pandas as pd
+        index = self.__dict__.get("_index")
+        if index is None:
+            index = self._index = pd.Index(self.get_feature_names_out())
+        return index
+
+    def transform(self, X) -> "sparse.csr_matrix":
+        import numpy as np
+        if not hasattr(self, "idf_"):
+            raise ValueError("FusedTfidfVectorizer is not fitted yet; call fit or fit_transform first")
+        cols, lengths = [], []
+        for grams, n in self._batches(X):
+            if self.n_features:
+                cols.append(self._hash_columns(grams))
+            else:
+                cols.append(self._lookup().get_indexer(grams).astype(np.int32) if grams
+                            else np.zeros(0, dtype=np.int32))
+            lengths.append(np.asarray(n, dtype=np.int64))
+        n_cols = self.n_features or len(self.vocabulary_)
+        return self._weight(self._counts(cols, lengths, n_cols))
+
+    def select_features(self, columns: "np.ndarray") -> None:
+        """Keep only `columns` (ascending), renumbered from 0; used by model_artifact.prune_pipeline."""
+        if self.n_features:
+            raise ValueError("hashing mode (n_features) has no vocabulary to prune")
+        names = self.get_feature_names_out()[columns]
+        self.vocabulary_ = dict(zip(names.tolist(), range(len(names))))
+        self.idf_ = self.idf_[columns]
+        self._idf32 = self.idf_.astype("float32")
+        self.__dict__.pop("_index", None)
+
+    def get_feature_names_out(self, input_features=None) -> "np.ndarray":
+        import numpy as np
+        if self.n_features:
+            raise ValueError("hashing mode (n_features) has no feature names")
+        names = np.empty(len(self.vocabulary_), dtype=object)
+        names[list(self.vocabulary_.values())] = list(self.vocabulary_)
+        return names
+
+    def cache_params(self) -> dict:
+        """get_params() plus the tokenizer version, for feature cache keys."""
+        return {**self.get_params(), "featurizer": FEATURIZER_VERSION}
+
+    def compact_params(self) -> dict:
+        """The TfidfVectorizer settings with the same features on cleaned text, for
+        model_artifact.export_model (the compact model is always fed clean_text output)."""
+        if self.n_features:
+            raise ValueError("compact export needs a vocabulary; hashing mode (n_features) is not supported")
+        return {"analyzer": "word", "preprocessor": None, "tokenizer": None, "stop_words": None,
+                "strip_accents": None, "lowercase": True, "token_pattern": TOKEN_PATTERN,
+                "ngram_range": self.ngram_range, "binary": False, "sublinear_tf": self.sublinear_tf,
+                "norm": self.norm, "use_idf": self.use_idf}
+
+    def __getstate__(self):
+        state = dict(super().__getstate__())  # may be the live __dict__ itself
+        state.pop("_index", None)  # rebuilt on first transform
+        state.pop("_idf32", None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if "idf_" in state:
+            self._idf32 = state["idf_"].astype("float32")
@@ -0,0 +1,229 @@
+"""
+incremental.py
+- State of the append-only processed dataset written by preprocess.py --incremental:
+    <out>/day=YYYY-MM-DD/part-<run>-<seq>.parquet|csv   cleaned rows, partitioned by `date` day
+    <out>/_index.sqlite                                   processed ids, runs, cleaner version
+- The index maps every processed id to its day partition and a hash of its raw columns, so a
+  run cleans only ids it has not seen and ids whose raw row changed. New rows are appended
+  as new part files; existing parts are only rewritten when a changed row has to be dropped
+  from its old day (the day is marked dirty and compacted at the end of the run).
+- The cleaner version (cleaning.CLEANER_VERSION) is stored too: when it changes, every
+  processed row is stale and the dataset is rebuilt from scratch.
+- A run writes its parts as _pending-part-* files, which readers skip, and renames them to
+  part-* after the run is committed together with its index rows. At the next start, pending
+  parts of a committed run are renamed, those of an interrupted run are deleted (its rows are
+  processed again), and so are leftover .part-* temp files.
+- Ids are kept as strings: preprocess.py reads CSV input with dtype=str, because a column with
+  an empty field would parse as float64, and tweet ids (~1.6e18) are above 2^53, so distinct
+  ids would round to the same float. Raw columns are hashed as those strings too.
+- dataset_io reads the directory as one dataset (part files in name order).
+"""
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from dataset_io import dataset_files, read_dataset, write_dataset
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+INDEX_FILE = "_index.sqlite"
+UNKNOWN_DAY = "unknown"
+PENDING = "_pending-"
+# stored next to the cleaner version: rows hashed/ids kept in another way need a rebuild
+ROW_FORMAT = "str-v2"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS processed (id TEXT PRIMARY KEY, day TEXT NOT NULL, hash INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS runs (run INTEGER PRIMARY KEY, started TEXT, status TEXT, rows INTEGER);
+CREATE TABLE IF NOT EXISTS dirty (day TEXT PRIMARY KEY);
+CREATE TEMP TABLE batch (id TEXT PRIMARY KEY, hash INTEGER);
+"""
+
+
+def id_strings(ids: "pd.Series") -> "pd.Series":
+    """Ids as strings, the same whether they were read as int or str. Float ids are only
+    accepted while they are exact integers (below 2^53)."""
+    import numpy as np
+    if ids.dtype.kind == "f":
+        if (ids.abs() >= 2**53).any() or (ids != np.floor(ids)).any():
+            raise ValueError("ids were read as float and lost precision; read them as strings")
+        ids = ids.astype("Int64")
+    return ids.astype(str)
+
+
+def row_hashes(df: "pd.DataFrame") -> "pd.Series":
+    """64-bit hash of each row's raw columns, as signed int for sqlite. Values are hashed as
+    strings so the hash does not depend on the dtypes a particular chunk was parsed with."""
+    import numpy as np
+    import pandas as pd
+    cols = sorted(c for c in df.columns if c != "text_clean")
+    h = pd.util.hash_pandas_object(df[cols].astype(str), index=False)
+    return pd.Series(h.to_numpy().view(np.int64), index=df.index)
+
+
+def day_partitions(df: "pd.DataFrame") -> "pd.Series":
+    import pandas as pd
+    if "date" not in df.columns:
+        return pd.Series(UNKNOWN_DAY, index=df.index)
+    dates = pd.to_datetime(df["date"], utc=True, errors="coerce", format="ISO8601")
+    return dates.dt.strftime("%Y-%m-%d").fillna(UNKNOWN_DAY)
+
+
+class PartitionedDataset:
+    def __init__(self, root: str, ext: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.con = sqlite3.connect(os.path.join(root, INDEX_FILE))
+        self.con.executescript(_SCHEMA)
+        self.ext = self._meta("format") or ext
+        self._set_meta("format", self.ext)
+        self.con.commit()
+        self.run = None
+        self._seq = 0
+
+    def _meta(self, key: str):
+        row = self.con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.con.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _day_dir(self, day: str) -> str:
+        return os.path.join(self.root, f"day={day}")
+
+    def _parts(self):
+        for path in dataset_files(self.root):
+            yield path, int(os.path.basename(path).split("-")[1])
+
+    def _pending(self, run: int = None):
+        """(pending part, run) of every run, or of `run`."""
+        for name in sorted(os.listdir(self.root)):
+            day_dir = os.path.join(self.root, name)
+            if not (name.startswith("day=") and os.path.isdir(day_dir)):
+                continue
+            for f in sorted(os.listdir(day_dir)):
+                if f.startswith(PENDING + "part-"):
+                    r = int(f[len(PENDING):].split("-")[1])
+                    if run is None or r == run:
+                        yield os.path.join(day_dir, f), r
+
+    def _publish(self, run: int = None) -> None:
+        for path, _ in list(self._pending(run)):
+            name = os.path.basename(path)[len(PENDING):]
+            os.replace(path, os.path.join(os.path.dirname(path), name))
+
+    def recover(self) -> None:
+        """Drop temp files and the parts of runs that never committed, publish the parts of
+        committed runs, then finish pending compactions."""
+        done = {r for (r,) in self.con.execute("SELECT run FROM runs WHERE status = 'done'")}
+        stale = [path for path, run in self._parts() if run not in done]
+        stale += [path for path, run in self._pending() if run not in done]
+        for path in stale:
+            os.remove(path)
+        temps = [os.path.join(d, f) for d in (os.path.join(self.root, n) for n in os.listdir(self.root))
+                 if os.path.isdir(d) for f in os.listdir(d) if f.startswith(".part-")]
+        for path in temps:
+            os.remove(path)
+        self._publish()
+        self.con.execute("DELETE FROM runs WHERE status != 'done'")
+        self.con.commit()
+        if stale:
+            print(f"Removed {len(stale)} part file(s) of an interrupted run")
+        self.compact()
+
+    def check_version(self, version: str) -> bool:
+        """Store the cleaner version (with ROW_FORMAT); on a mismatch clear everything.
+        True if a rebuild happens."""
+        version = f"{version}/{ROW_FORMAT}"
+        previous = self._meta("cleaner_version")
+        rebuild = previous is not None and previous != version
+        if rebuild:
+            for name in os.listdir(self.root):
+                if name.startswith("day="):
+                    shutil.rmtree(os.path.join(self.root, name))
+            for table in ("processed", "runs", "dirty"):
+                self.con.execute(f"DELETE FROM {table}")
+        self._set_meta("cleaner_version", version)
+        self.con.commit()
+        return rebuild
+
+    def begin(self) -> int:
+        row = self.con.execute("SELECT COALESCE(MAX(run), 0) + 1 FROM runs").fetchone()
+        self.run, self._seq = row[0], 0
+        started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.con.execute("INSERT INTO runs VALUES (?, ?, 'running', 0)", (self.run, started))
+        self.con.commit()
+        return self.run
+
+    def select(self, df: "pd.DataFrame") -> tuple:
+        """Return (rows of `df` that are new or changed, number of changed rows) and record them
+        in the (uncommitted) index. A changed row's old day is marked for compaction."""
+        df = df.assign(id=id_strings(df["id"]))
+        ids, hashes = df["id"], row_hashes(df)
+        self.con.execute("DELETE FROM batch")
+        self.con.executemany("INSERT OR REPLACE INTO batch VALUES (?, ?)", zip(ids, hashes.tolist()))
+        known = dict(self.con.execute(
+            "SELECT b.id, p.hash = b.hash FROM batch b JOIN processed p ON p.id = b.id"))
+        unchanged = ids.map(known).eq(1)
+        changed = ids.isin(known.keys()) & ~unchanged
+        self.con.execute(
+            "INSERT OR IGNORE INTO dirty SELECT p.day FROM batch b JOIN processed p ON p.id = b.id "
+            "WHERE p.hash != b.hash")
+        out = df[~unchanged].copy()
+        out["_day"] = day_partitions(out)
+        self.con.executemany(
+            "INSERT OR REPLACE INTO processed VALUES (?, ?, ?)",
+            zip(ids[~unchanged], out["_day"], hashes[~unchanged].tolist()))
+        return out, int(changed.sum())
+
+    def append(self, df: "pd.DataFrame") -> None:
+        """Write cleaned rows (as returned by select) as new pending part files, one per day;
+        commit() publishes them."""
+        for day, part in df.groupby("_day", sort=True):
+            self._seq += 1
+            name = f"part-{self.run:06d}-{self._seq:05d}{self.ext}"
+            day_dir = self._day_dir(day)
+            os.makedirs(day_dir, exist_ok=True)
+            tmp = os.path.join(day_dir, "." + name)
+            write_dataset(part.drop(columns="_day"), tmp)
+            os.replace(tmp, os.path.join(day_dir, PENDING + name))
+
+    def commit(self, rows: int) -> None:
+        self.con.execute("UPDATE runs SET status = 'done', rows = ? WHERE run = ?", (rows, self.run))
+        self.con.commit()
+        # a crash before every part is renamed is finished by the next recover()
+        self._publish(self.run)
+        self.compact()
+
+    def compact(self) -> None:
+        """Rewrite dirty day partitions: keep the rows whose id the index places in that day,
+        last copy per id. The result replaces the newest part, so a crash midway is redone."""
+        import pandas as pd
+        for (day,) in self.con.execute("SELECT day FROM dirty").fetchall():
+            files = dataset_files(self._day_dir(day))
+            if files:
+                df = pd.concat([read_dataset(f) for f in files], ignore_index=True)
+                ids = id_strings(df["id"])
+                current = dict(self.con.execute(
+                    "SELECT id, day FROM processed WHERE id IN (SELECT value FROM json_each(?))",
+                    (pd.Series(ids.unique()).to_json(orient="values"),)))
+                keep = (ids.map(current) == day) & ~ids.duplicated(keep="last")
+                tmp = os.path.join(self._day_dir(day), "." + os.path.basename(files[-1]))
+                write_dataset(df[keep.to_numpy()], tmp)
+                os.replace(tmp, files[-1])
+                for f in files[:-1]:
+                    os.remove(f)
+            self.con.execute("DELETE FROM dirty WHERE day = ?", (day,))
+            self.con.commit()
+
+    def stats(self) -> str:
+        (ids,) = self.con.execute("SELECT COUNT(*) FROM processed").fetchone()
+        (days,) = self.con.execute("SELECT COUNT(DISTINCT day) FROM processed").fetchone()
+        return f"{ids:,} ids in {days:,} day partitions"
+
+    def close(self) -> None:
+        self.con.close()
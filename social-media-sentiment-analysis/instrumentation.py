@@ -0,0 +1,230 @@
+"""
+instrumentation.py
+- Per-stage timing and memory measurement shared by the pipeline scripts and bench_pipeline.py.
+- `measure(name)` times a block (wall + CPU), samples peak RSS in a background thread and,
+  when tracemalloc is tracing, records the peak of Python allocations in that block.
+- `run(script, args)` wraps a script's main: stages opened with `stage(name)` (or the `timed`
+  decorator) anywhere inside it are collected and written as one JSON log per run to
+  results/runs/<script>_<timestamp>.json, with a short summary printed at the end.
+  `stage` is a no-op outside `run`, so library-style calls stay cheap.
+- Environment / flags:
+    --profile or SENTIMENT_PROFILE=1   cProfile the run, dump <log>.prof and print the top calls
+    SENTIMENT_TRACEMALLOC=1            trace Python allocations (slow, off by default)
+    SENTIMENT_RUN_LOG_DIR              where the JSON logs go; SENTIMENT_RUN_LOG=0 disables them
+"""
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DEFAULT_LOG_DIR = "social-media-sentiment-analysis/results/runs"
+
+_current = None
+_frames = []  # open measure() blocks, innermost last, for nested tracemalloc peaks
+
+
+def rss_bytes() -> int:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource  # no current RSS available: fall back to the lifetime peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+class _PeakSampler(threading.Thread):
+    def __init__(self, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes()
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+
+class _Frame:
+    __slots__ = ("carried",)
+
+    def __init__(self):
+        self.carried = 0
+
+
+@contextmanager
+def measure(name: str, rows: int = None):
+    """Measure the block; yields the record dict, which is filled in when the block exits.
+    Set record["rows"] inside the block when the row count is only known at the end."""
+    record = {"name": name, "rows": rows}
+    tracing = tracemalloc.is_tracing()
+    frame = _Frame()
+    if tracing:
+        if _frames:
+            _frames[-1].carried = max(_frames[-1].carried, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    _frames.append(frame)
+    start_rss = rss_bytes()
+    sampler = _PeakSampler()
+    sampler.start()
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        sampler.stop.set()
+        sampler.join()
+        _frames.pop()
+        traced = None
+        if tracing:
+            traced = max(frame.carried, tracemalloc.get_traced_memory()[1])
+            if _frames:
+                _frames[-1].carried = max(_frames[-1].carried, traced)
+            tracemalloc.reset_peak()
+        peak = max(sampler.peak, rss_bytes())
+        rows = record["rows"]
+        record.update({
+            "seconds": round(wall, 4),
+            "cpu_seconds": round(cpu, 4),
+            "rows_per_s": round(rows / wall, 1) if rows is not None and wall else None,
+            "peak_rss_mb": round(peak / 1e6, 1),
+            "rss_growth_mb": round((peak - start_rss) / 1e6, 1),
+            "tracemalloc_peak_mb": round(traced / 1e6, 1) if traced is not None else None,
+        })
+
+
+class Run:
+    def __init__(self, script: str, argv: list, profile: bool):
+        self.script = script
+        self.argv = argv
+        self.profile = profile
+        self.stages = []
+        self.path = []
+        self.started = datetime.now(timezone.utc)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        self.path.append(name)
+        try:
+            with measure("/".join(self.path), rows) as record:
+                # listed in start order; the record is filled in when the block exits
+                self.stages.append(record)
+                yield record
+        finally:
+            self.path.pop()
+
+    def log_path(self) -> str:
+        log_dir = os.environ.get("SENTIMENT_RUN_LOG_DIR", DEFAULT_LOG_DIR)
+        return os.path.join(log_dir, f"{self.script}_{self.started.strftime('%Y%m%dT%H%M%S%fZ')}")
+
+    def summary(self) -> str:
+        lines = [f"[{self.script}] stage timings:"]
+        for s in self.stages:
+            rows = f" {s['rows']:,} rows" if s.get("rows") is not None else ""
+            lines.append(f"  {s['name']:24s} {s['seconds']:9.3f}s  peak RSS {s['peak_rss_mb']:8.1f} MB{rows}")
+        return "\n".join(lines)
+
+
+def profiling_requested(args=None) -> bool:
+    return bool(getattr(args, "profile", False)) or os.environ.get("SENTIMENT_PROFILE", "0") == "1"
+
+
+def add_profile_argument(parser) -> None:
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile this run and dump the stats next to its JSON run log")
+
+
+@contextmanager
+def run(script: str, args=None):
+    """Instrument a whole script run; stages inside are collected and logged as JSON."""
+    global _current
+    r = Run(script, sys.argv[1:], profiling_requested(args))
+    own_tracing = os.environ.get("SENTIMENT_TRACEMALLOC", "0") == "1" and not tracemalloc.is_tracing()
+    if own_tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if r.profile else None
+    previous, _current = _current, r
+    status = "ok"
+    total = {}
+    try:
+        if profiler:
+            profiler.enable()
+        with measure("total") as total:
+            yield r
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status = f"exit: {e.code}"
+        raise
+    except BaseException as e:
+        status = f"error: {type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        _current = previous
+        if own_tracing:
+            tracemalloc.stop()
+        _finish(r, total, status, profiler)
+
+
+def _finish(r: Run, total: dict, status: str, profiler) -> None:
+    print(r.summary())
+    print(f"  {'total':24s} {total['seconds']:9.3f}s  peak RSS {total['peak_rss_mb']:8.1f} MB")
+    base = r.log_path()
+    prof_path = None
+    if profiler:
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        prof_path = base + ".prof"
+        profiler.dump_stats(prof_path)
+        print(f"Profile saved to {prof_path}; top calls by cumulative time:")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(15)
+    if os.environ.get("SENTIMENT_RUN_LOG", "1") == "0":
+        return
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    log = {
+        "script": r.script,
+        "argv": r.argv,
+        "started": r.started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "status": status,
+        "seconds": total["seconds"],
+        "cpu_seconds": total["cpu_seconds"],
+        "peak_rss_mb": total["peak_rss_mb"],
+        "tracemalloc": tracemalloc.is_tracing() or os.environ.get("SENTIMENT_TRACEMALLOC", "0") == "1",
+        "profile": prof_path,
+        "stages": r.stages,
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(log, f, indent=2)
+    print("Run log saved to", base + ".json")
+
+
+@contextmanager
+def stage(name: str, rows: int = None):
+    """Record a stage in the active run (if any)."""
+    if _current is None:
+        yield None
+        return
+    with _current.stage(name, rows) as record:
+        yield record
+
+
+def timed(name: str = None):
+    """Decorator form of stage(); defaults to the function name."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            with stage(name or fn.__name__):
+                return fn(*a, **kw)
+        return inner
+    return wrap
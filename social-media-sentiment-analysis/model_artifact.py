@@ -0,0 +1,341 @@
+"""
+model_artifact.py
+- Compact export of a trained TF-IDF + linear classifier pipeline (train_model.py / train_quick.py)
+  into a directory of plain files, and a loader that needs neither pickle nor sklearn:
+    meta.json       classes, vectorizer settings, how probabilities are computed
+    vocab.bin       the n-grams as UTF-8, concatenated in column order (TfidfVectorizer's own,
+                    sorted) with vocab_offsets.npy: n-gram j is vocab.bin[offsets[j]:offsets[j + 1]]
+    vocab_hash.npy  sorted 64-bit hashes of the n-grams (pandas.util.hash_array), and
+                    vocab_hash_cols.npy the column of each: transform() looks n-grams up here
+    idf.npy, coef.npy, intercept.npy
+- Arrays are opened with mmap_mode='r', so loading is a few file opens: nothing is unpickled,
+  no vocabulary dict is built, and scoring workers share the pages through the OS cache.
+- The vocabulary takes ~12 bytes per n-gram plus its UTF-8 length, instead of 4 bytes per
+  character of the longest n-gram for every n-gram in a fixed-width numpy string array.
+- CompactModel has the predict / predict_proba / decision_function / classes_ interface used by
+  predict.py, evaluate.py and serve.py; load_model() accepts a compact directory or a joblib file.
+- save_pipeline-style joblib dumps drop TfidfVectorizer.stop_words_ (only kept for introspection).
+- prune_pipeline() keeps only the features with the largest weights (max over classes of
+  |coef| * idf, the weight a raw term count gets before normalization) and drops the rest
+  from the vocabulary too. Row norms then only cover the kept features, so scores shift a
+  little; train_model.py --prune-keep reports the held-out accuracy delta.
+- export_model(weights='float16' | 'int8') stores the coefficients quantized (int8 with one
+  scale per class).
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/model_artifact.py export --model social-media-sentiment-analysis/models/model_pipeline.joblib --out social-media-sentiment-analysis/models/model_compact
+  python social-media-sentiment-analysis/model_artifact.py check --model social-media-sentiment-analysis/models/model_pipeline.joblib --compact social-media-sentiment-analysis/models/model_compact --input data.parquet
+"""
+import argparse
+import json
+import os
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FORMAT_VERSION = 1
+WEIGHTS = ["float64", "float16", "int8"]
+
+
+def strip_pipeline(pipeline):
+    """Drop attributes that are never used for prediction (in place)."""
+    for _, step in getattr(pipeline, "steps", []):
+        if hasattr(step, "stop_words_"):
+            del step.stop_words_
+    return pipeline
+
+
+def feature_weights(pipeline) -> "np.ndarray":
+    """Per-feature weight of a TF-IDF + linear pipeline: max over classes of |coef| * idf."""
+    import numpy as np
+    vec, clf = pipeline.named_steps["tfidf"], pipeline.named_steps["clf"]
+    idf = vec.idf_ if getattr(vec, "use_idf", True) else 1.0
+    return np.abs(np.asarray(clf.coef_)).max(axis=0) * idf
+
+
+def prune_pipeline(pipeline, keep: float):
+    """Copy of `pipeline` with the `keep` share (0..1] of features of largest weight; the
+    vectorizer vocabulary and idf and the classifier coefficients are cut to match."""
+    import copy
+    import numpy as np
+    from sklearn.base import clone
+    steps = getattr(pipeline, "named_steps", {})
+    vec, clf = steps.get("tfidf"), steps.get("clf")
+    if vec is None or clf is None or not hasattr(vec, "vocabulary_") or not hasattr(clf, "coef_"):
+        raise ValueError("pruning needs a fitted Pipeline with a 'tfidf' vocabulary and a linear 'clf'")
+    if not 0 < keep <= 1:
+        raise ValueError(f"keep must be in (0, 1], got {keep}")
+    weights = feature_weights(pipeline)
+    n_keep = max(1, int(round(keep * len(weights))))
+    # ascending column order keeps the vocabulary sorted (column j is still the j-th name)
+    kept = np.sort(np.argsort(-weights, kind="stable")[:n_keep])
+    pruned = copy.deepcopy(pipeline)
+    vec, clf = pruned.named_steps["tfidf"], pruned.named_steps["clf"]
+    if hasattr(vec, "select_features"):
+        vec.select_features(kept)
+    else:
+        # a fresh TfidfVectorizer given the cut vocabulary and idf (its idf_ setter builds the
+        # transformer), so no fitted state of the full width is left behind
+        names = vec.get_feature_names_out()[kept]
+        small = clone(vec)
+        small.vocabulary_ = dict(zip(names.tolist(), range(len(kept))))
+        small.idf_ = vec.idf_[kept]
+        pruned.set_params(tfidf=small)
+    clf.coef_ = np.ascontiguousarray(clf.coef_[:, kept])
+    clf.n_features_in_ = len(kept)
+    return pruned
+
+
+def _proba_kind(clf, n_classes: int) -> str:
+    if n_classes == 2:
+        return "binary"
+    if type(clf).__name__ == "LogisticRegression" and getattr(clf, "solver", "") != "liblinear":
+        return "softmax"
+    return "ovr"
+
+
+def quantize(coef: "np.ndarray", weights: str) -> tuple:
+    """(stored coefficients, per-class scale or None)."""
+    import numpy as np
+    if weights == "float16":
+        return coef.astype(np.float16), None
+    if weights == "int8":
+        scale = np.abs(coef).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        return np.round(coef / scale[:, None]).astype(np.int8), scale
+    return coef, None
+
+
+def vocab_hashes(terms) -> "np.ndarray":
+    """64-bit hashes of n-gram strings, the lookup key of the compact vocabulary."""
+    import numpy as np
+    import pandas as pd
+    return pd.util.hash_array(np.asarray(terms, dtype=object))
+
+
+def export_model(pipeline, out_dir: str, weights: str = "float64") -> str:
+    import numpy as np
+    if weights not in WEIGHTS:
+        raise ValueError(f"weights must be one of {WEIGHTS}, got {weights!r}")
+    steps = getattr(pipeline, "named_steps", {})
+    vec, clf = steps.get("tfidf"), steps.get("clf")
+    if vec is None or clf is None or not hasattr(vec, "vocabulary_") or not hasattr(clf, "coef_"):
+        raise ValueError("export needs a fitted Pipeline with 'tfidf' (TfidfVectorizer) and a linear 'clf'")
+    # FusedTfidfVectorizer (featurizer.py) describes itself as the equivalent TfidfVectorizer
+    p = vec.compact_params() if hasattr(vec, "compact_params") else vec.get_params()
+    unsupported = [k for k in ("preprocessor", "tokenizer", "stop_words", "strip_accents") if p[k] is not None]
+    if p["analyzer"] != "word" or unsupported:
+        raise ValueError(f"compact export supports analyzer='word' without {unsupported or 'callables'}")
+
+    vocab = [t.encode("utf-8") for t in vec.get_feature_names_out()]  # already sorted, index j == column j
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "vocab.bin"), "wb") as f:
+        f.write(b"".join(vocab))
+    offsets = np.concatenate([[0], np.cumsum([len(t) for t in vocab])])
+    np.save(os.path.join(out_dir, "vocab_offsets.npy"),
+            offsets.astype(np.int32 if offsets[-1] < 2**31 else np.int64))
+    hashes = vocab_hashes(vec.get_feature_names_out())
+    order = np.argsort(hashes, kind="stable")
+    if len(order) > 1 and (np.diff(hashes[order]) == 0).any():
+        raise ValueError("two n-grams of the vocabulary have the same 64-bit hash")
+    np.save(os.path.join(out_dir, "vocab_hash.npy"), hashes[order])
+    np.save(os.path.join(out_dir, "vocab_hash_cols.npy"), order.astype(np.int32))
+    np.save(os.path.join(out_dir, "idf.npy"), vec.idf_ if p["use_idf"] else np.ones(len(vocab)))
+    coef, scale = quantize(np.ascontiguousarray(clf.coef_, dtype=np.float64), weights)
+    np.save(os.path.join(out_dir, "coef.npy"), coef)
+    if scale is not None:
+        np.save(os.path.join(out_dir, "coef_scale.npy"), scale)
+    np.save(os.path.join(out_dir, "intercept.npy"), np.asarray(clf.intercept_, dtype=np.float64))
+    classes = [c.item() if hasattr(c, "item") else c for c in clf.classes_]
+    meta = {
+        "format": FORMAT_VERSION,
+        "weights": weights,
+        "classes": classes,
+        "proba": _proba_kind(clf, len(classes)),
+        "lowercase": p["lowercase"],
+        "token_pattern": p["token_pattern"],
+        "ngram_range": list(p["ngram_range"]),
+        "binary": p["binary"],
+        "sublinear_tf": p["sublinear_tf"],
+        "norm": p["norm"],
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+class CompactModel:
+    """TF-IDF + linear model scoring from memory-mapped arrays; same outputs as the pipeline."""
+
+    def __init__(self, path: str):
+        import numpy as np
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported compact model format: {self.meta.get('format')}")
+        self.path = path
+        self.vocab_hash = np.load(os.path.join(path, "vocab_hash.npy"), mmap_mode="r")
+        self.vocab_hash_cols = np.load(os.path.join(path, "vocab_hash_cols.npy"), mmap_mode="r")
+        self._check_hashes()
+        self.n_features = len(self.vocab_hash)
+        self.idf = np.load(os.path.join(path, "idf.npy"), mmap_mode="r")
+        self.coef = np.load(os.path.join(path, "coef.npy"), mmap_mode="r")
+        self.intercept = np.load(os.path.join(path, "intercept.npy"), mmap_mode="r")
+        self.coef_scale = None
+        if self.meta.get("weights") == "int8":
+            self.coef_scale = np.load(os.path.join(path, "coef_scale.npy"))
+        self.classes_ = np.array(self.meta["classes"])
+        self._token = re.compile(self.meta["token_pattern"]).findall
+        self._min_n, self._max_n = self.meta["ngram_range"]
+
+    def feature_names(self) -> list:
+        """The n-gram of every column."""
+        import numpy as np
+        offsets = np.load(os.path.join(self.path, "vocab_offsets.npy")).tolist()
+        with open(os.path.join(self.path, "vocab.bin"), "rb") as f:
+            blob = f.read()
+        return [blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def _check_hashes(self) -> None:
+        """The stored hashes must be what vocab_hashes() computes here (same hash function)."""
+        import numpy as np
+        offsets = np.load(os.path.join(self.path, "vocab_offsets.npy"), mmap_mode="r")
+        n = min(len(offsets) - 1, 8)
+        with open(os.path.join(self.path, "vocab.bin"), "rb") as f:
+            blob = f.read(int(offsets[n]))
+        terms = [blob[offsets[j]:offsets[j + 1]].decode("utf-8") for j in range(n)]
+        pos = np.minimum(np.searchsorted(self.vocab_hash, vocab_hashes(terms)), max(len(self.vocab_hash) - 1, 0))
+        if n and not (np.asarray(self.vocab_hash_cols)[pos] == np.arange(n)).all():
+            raise ValueError(f"vocabulary hashes of {self.path} do not match this pandas version's hash_array")
+
+    def _ngrams(self, doc: str) -> list:
+        if self.meta["lowercase"]:
+            doc = doc.lower()
+        tokens = self._token(doc)
+        if self._max_n == 1:
+            return tokens
+        out = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), self._max_n + 1):
+            out.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return out
+
+    def transform(self, texts):
+        import numpy as np
+        from scipy import sparse
+        grams, lengths = [], []
+        for doc in texts:
+            g = self._ngrams(doc)
+            grams.extend(g)
+            lengths.append(len(g))
+        n_docs, n_features = len(lengths), self.n_features
+        rows = np.repeat(np.arange(n_docs), lengths)
+        if grams and n_features:
+            keys = vocab_hashes(grams)
+            pos = np.searchsorted(self.vocab_hash, keys)
+            pos[pos == n_features] = 0
+            hit = self.vocab_hash[pos] == keys
+            rows, cols = rows[hit], np.asarray(self.vocab_hash_cols)[pos[hit]].astype(np.int64)
+        else:
+            rows, cols = rows[:0], np.zeros(0, dtype=np.int64)
+        X = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_docs, n_features))
+        X.sum_duplicates()
+        if self.meta["binary"]:
+            X.data[:] = 1.0
+        elif self.meta["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        X = X @ sparse.diags(np.asarray(self.idf))
+        if self.meta["norm"] == "l2":
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        elif self.meta["norm"] == "l1":
+            norms = np.asarray(abs(X).sum(axis=1)).ravel()
+        else:
+            return X.tocsr()
+        norms[norms == 0] = 1.0
+        return (sparse.diags(1.0 / norms) @ X).tocsr()
+
+    def decision_function(self, texts) -> "np.ndarray":
+        import numpy as np
+        coef = np.asarray(self.coef)
+        if coef.dtype != np.float64:
+            # dequantized per call, the mapped file stays shared and small
+            coef = coef.astype(np.float32)
+            if self.coef_scale is not None:
+                coef *= self.coef_scale[:, None].astype(np.float32)
+        scores = self.transform(texts) @ coef.T + np.asarray(self.intercept)
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, texts) -> "np.ndarray":
+        import numpy as np
+        scores = self.decision_function(texts)
+        kind = self.meta["proba"]
+        if kind == "binary":
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1.0 - p, p])
+        if kind == "softmax":
+            scores = scores - scores.max(axis=1, keepdims=True)
+            e = np.exp(scores)
+            return e / e.sum(axis=1, keepdims=True)
+        p = 1.0 / (1.0 + np.exp(-scores))
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict(self, texts) -> "np.ndarray":
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+
+def is_compact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def load_model(path: str):
+    """CompactModel for an exported directory, otherwise the joblib pipeline (arrays memory-mapped)."""
+    if is_compact(path):
+        return CompactModel(path)
+    import joblib
+    # arrays are only memory-mapped if the file was dumped uncompressed (joblib's default)
+    return joblib.load(path, mmap_mode="r")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / check compact model artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="write a compact directory from a joblib pipeline")
+    exp.add_argument("--model", required=True)
+    exp.add_argument("--out", required=True)
+    exp.add_argument("--weights", choices=WEIGHTS, default="float64", help="coefficient storage")
+    chk = sub.add_parser("check", help="compare compact and joblib predictions on a dataset")
+    chk.add_argument("--model", required=True)
+    chk.add_argument("--compact", required=True)
+    chk.add_argument("--input", required=True, help="csv/parquet with text_clean")
+    chk.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    import time
+    import joblib
+    import numpy as np
+    if args.command == "export":
+        export_model(joblib.load(args.model), args.out, args.weights)
+        size = sum(os.path.getsize(os.path.join(args.out, f)) for f in os.listdir(args.out))
+        print(f"Exported {args.model} -> {args.out} ({size / 1e6:.1f} MB)")
+        return
+
+    from dataset_io import read_dataset
+    texts = read_dataset(args.input, columns=["text_clean"])["text_clean"].astype(str).tolist()[:args.rows]
+    t0 = time.perf_counter()
+    pipeline = joblib.load(args.model)
+    t1 = time.perf_counter()
+    compact = CompactModel(args.compact)
+    t2 = time.perf_counter()
+    p_ref, p_new = pipeline.predict_proba(texts), compact.predict_proba(texts)
+    same = (pipeline.classes_[p_ref.argmax(1)] == compact.predict(texts)).mean()
+    print(f"load: joblib {t1 - t0:.3f}s, compact {t2 - t1:.4f}s")
+    print(f"max |proba diff| on {len(texts):,} rows: {np.abs(p_ref - p_new).max():.2e}, same label: {same:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+predict.py
+- Bulk offline scoring with the trained pipeline (no labels needed).
+- Streams a CSV (.csv/.gz/.zst) or Parquet input in chunks, cleans the text column with
+  cleaning.py and writes pred_label plus one proba_<class> column per class.
+- --workers N scores chunks in a process pool; output keeps input order. Each worker loads
+  the model with joblib mmap_mode='r', so the numpy arrays of the pipeline are shared through
+  the OS page cache instead of being copied into every process.
+- Output format follows the extension of --output (.csv/.csv.gz/.csv.zst/.parquet).
+- --model can also be a directory written by model_artifact.py export, which loads without
+  unpickling anything.
+- --memo-size N scores identical cleaned texts once per batch and keeps an LRU of N results
+  across chunks (prediction_cache.py; one LRU per worker). --memo-file also keeps the LRU
+  between runs of the same model (single process only).
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/predict.py --input data/raw/tweets_scraped.csv --output scored.parquet --workers 8
+  python social-media-sentiment-analysis/predict.py --input tweets.parquet --output scored.parquet --memo-size 200000 --memo-file .cache/memo.npz
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cleaning import clean_batch, pack_texts, unpack_texts
+from dataset_io import iter_chunks, ChunkWriter, Throughput
+from model_artifact import load_model
+from prediction_cache import memoized, combine_stats, format_stats, DEFAULT_MAX_ENTRIES
+
+DEFAULT_MODEL = "social-media-sentiment-analysis/models/model_pipeline.joblib"
+
+_MODEL = None
+
+
+def score_texts(model, texts: list, clean: bool = True, proba: bool = True) -> tuple:
+    """Return (labels, proba) for raw texts; proba is None if the model has no predict_proba
+    or `proba` is False."""
+    import numpy as np
+    if not len(texts):
+        # sklearn refuses 0 samples; a header-only CSV yields such a chunk
+        classes = np.asarray(model.classes_)
+        empty = np.zeros((0, len(classes)), dtype=np.float32)
+        return classes[:0], empty if proba and hasattr(model, "predict_proba") else None
+    if clean:
+        texts = clean_batch(texts)
+    if proba and hasattr(model, "predict_proba"):
+        proba = model.predict_proba(texts)
+        return np.asarray(model.classes_)[proba.argmax(axis=1)], proba.astype(np.float32)
+    return np.asarray(model.predict(texts)), None
+
+
+def _load(model_path: str, memo_size: int = 0, memo_file: str = None):
+    model = load_model(model_path)
+    if memo_size or memo_file:
+        return memoized(model, model_path, memo_size, memo_file)
+    return model
+
+
+def _init_worker(model_path: str, memo_size: int) -> None:
+    global _MODEL
+    _MODEL = _load(model_path, memo_size)
+
+
+def _score_packed(packed: tuple, clean: bool, proba: bool) -> tuple:
+    labels, proba = score_texts(_MODEL, unpack_texts(*packed), clean, proba)
+    stats = _MODEL.stats() if hasattr(_MODEL, "stats") else None
+    return labels, proba, (os.getpid(), stats)
+
+
+def _texts(chunk, text_col: str) -> list:
+    if text_col not in chunk.columns:
+        raise SystemExit(f"Input must contain '{text_col}' column.")
+    return chunk[text_col].fillna("").astype(str).tolist()
+
+
+def _scored_chunks(chunks, model_path: str, text_col: str, clean: bool, workers: int, proba: bool = True,
+                   memo_size: int = 0, memo_file: str = None, memo_stats: dict = None):
+    """Yield (chunk, labels, proba) in input order. With memo_size/memo_file the model is
+    memoized; memo_stats then receives the memo stats of each process."""
+    if workers <= 1:
+        model = _load(model_path, memo_size, memo_file)
+        for chunk in chunks:
+            yield (chunk, *score_texts(model, _texts(chunk, text_col), clean, proba))
+        if memo_stats is not None and hasattr(model, "stats"):
+            memo_stats[os.getpid()] = model.stats()
+        if memo_file:
+            model.save()
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path, memo_size)) as pool:
+        pending = deque()
+
+        def result(fut):
+            labels, proba, (pid, stats) = fut.result()
+            if memo_stats is not None and stats is not None:
+                memo_stats[pid] = stats  # counters are cumulative per worker: keep the latest
+            return labels, proba
+
+        for chunk in chunks:
+            packed = pack_texts(_texts(chunk, text_col))
+            pending.append((chunk, pool.submit(_score_packed, packed, clean, proba)))
+            if len(pending) >= 2 * workers:
+                done, fut = pending.popleft()
+                yield (done, *result(fut))
+        while pending:
+            done, fut = pending.popleft()
+            yield (done, *result(fut))
+
+
+def add_memo_arguments(parser) -> None:
+    parser.add_argument("--memo-size", type=int, default=0,
+                        help="score identical cleaned texts once and keep an LRU of N results (0: off)")
+    parser.add_argument("--memo-file", default=None,
+                        help="load/save the LRU in this .npz (ignored if written for another model); "
+                             f"implies --memo-size {DEFAULT_MAX_ENTRIES:,} if not given")
+
+
+def check_memo_arguments(args) -> None:
+    if args.memo_size < 0:
+        raise SystemExit("--memo-size must be >= 0")
+    if args.memo_file and getattr(args, "workers", 1) > 1:
+        raise SystemExit("--memo-file needs --workers 1 (each worker keeps its own LRU)")
+    if args.memo_file and not args.memo_size:
+        args.memo_size = DEFAULT_MAX_ENTRIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a large CSV/Parquet file with the saved pipeline")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="joblib pipeline or compact model directory")
+    parser.add_argument("--input", required=True, help="CSV/Parquet with a text column")
+    parser.add_argument("--output", required=True, help="scored output (.csv, .csv.gz, .csv.zst or .parquet)")
+    parser.add_argument("--text-column", default="text",
+                        help="column to score; 'text_clean' is assumed already cleaned")
+    parser.add_argument("--keep-columns", nargs="*", default=None,
+                        help="input columns copied to the output (default: all)")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    add_memo_arguments(parser)
+    args = parser.parse_args()
+    check_memo_arguments(args)
+
+    columns = None
+    if args.keep_columns is not None:
+        columns = list(dict.fromkeys(args.keep_columns + [args.text_column]))
+    clean = args.text_column != "text_clean"
+    classes = [str(c) for c in load_model(args.model).classes_]
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    stats = Throughput()
+    memo_stats = {}
+    chunks = iter_chunks(args.input, args.chunksize, columns=columns)
+    scored = _scored_chunks(chunks, args.model, args.text_column, clean, args.workers,
+                            memo_size=args.memo_size, memo_file=args.memo_file, memo_stats=memo_stats)
+    with ChunkWriter(args.output) as writer:
+        for chunk, labels, proba in scored:
+            out = chunk if args.keep_columns is None else chunk[args.keep_columns].copy()
+            out["pred_label"] = labels
+            if proba is not None:
+                for j, c in enumerate(classes):
+                    out[f"proba_{c}"] = proba[:, j]
+            writer.write(out)
+            stats.add(len(out))
+    print(f"Scored {stats} -> {args.output}")
+    if memo_stats:
+        print(format_stats(combine_stats(list(memo_stats.values()))))
+
+
+if __name__ == "__main__":
+    main()
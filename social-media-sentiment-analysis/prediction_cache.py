@@ -0,0 +1,167 @@
+"""
+prediction_cache.py
+- Memoized scoring for retweets and copy-pasted spam: after cleaning, many texts in a batch
+  are identical, and the model would vectorize and score every copy.
+- MemoizedModel wraps a loaded model (pipeline or compact model) with the same predict /
+  predict_proba / classes_, so predict.py, evaluate.py and serve.py use it in place of the model.
+  It is fed cleaned texts, so the key is the cleaned text:
+    - identical texts within a batch are scored once (keyed by their 64-bit hash, as in dedup.py)
+    - a bounded LRU maps text hash -> probabilities (or label) of texts from earlier batches
+    - only texts in neither are sent to the model, as one batch
+- Entries are tied to the model's content hash (model_digest). The LRU can be saved to an .npz
+  file and loaded in a later run; a file written for a different model is ignored.
+- stats() / stats_line(): rows, unique rows per batch, LRU hits, rows scored by the model and
+  the hit rate (share of rows not scored by the model).
+- Memory: one slot of n_classes float64 values per entry plus the LRU's dict entry (~100 bytes);
+  the default 100,000 entries take ~15 MB.
+"""
+import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from dedup import text_hashes
+from feature_cache import file_digest, make_key
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def model_digest(path: str) -> str:
+    """Content hash of a joblib model file or of every file of a compact model directory."""
+    if os.path.isdir(path):
+        return make_key(*[(name, file_digest(os.path.join(path, name))) for name in sorted(os.listdir(path))])
+    return file_digest(path)
+
+
+def combine_stats(stats: list) -> dict:
+    """Sum of several stats() dicts (one per worker process)."""
+    counters = ("rows", "unique", "hits", "scored", "entries", "loaded")
+    out = {k: sum(s[k] for s in stats) for k in counters}
+    out["max_entries"] = sum(s["max_entries"] for s in stats)
+    out["hit_rate"] = 1.0 - out["scored"] / out["rows"] if out["rows"] else 0.0
+    return out
+
+
+def format_stats(s: dict) -> str:
+    return (f"memo: {s['rows']:,} rows, {s['unique']:,} unique per batch, {s['hits']:,} LRU hit(s), "
+            f"{s['scored']:,} scored by the model ({s['hit_rate']:.1%} hit rate); "
+            f"{s['entries']:,} of {s['max_entries']:,} entries")
+
+
+class MemoizedModel:
+    def __init__(self, model, model_hash: str, max_entries: int = DEFAULT_MAX_ENTRIES, path: str = None):
+        import numpy as np
+        self.model = model
+        self.model_hash = model_hash
+        self.max_entries = max_entries
+        self.path = path
+        self.classes_ = model.classes_
+        self._proba = hasattr(model, "predict_proba")
+        if self._proba:
+            self.predict_proba = self._predict_proba
+        # with predict_proba a slot holds the probabilities, otherwise the label's index in classes_
+        width = len(self.classes_) if self._proba else 1
+        self._slots = OrderedDict()  # text hash -> row in _values, least recently used first
+        self._values = np.empty((max_entries, width))
+        self.rows = self.unique = self.hits = self.scored = self.loaded = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _score(self, texts: list) -> "np.ndarray":
+        import numpy as np
+        if self._proba:
+            return np.asarray(self.model.predict_proba(texts), dtype=np.float64)
+        index = {c: i for i, c in enumerate(self.classes_)}
+        return np.array([[index[c]] for c in self.model.predict(texts)], dtype=np.float64)
+
+    def _insert(self, keys: list, values: "np.ndarray") -> None:
+        import numpy as np
+        if self.max_entries <= 0:
+            return
+        # more new texts than slots: only the last max_entries would survive anyway
+        keys, values = keys[-self.max_entries:], values[-self.max_entries:]
+        slots = []
+        for k in keys:
+            if len(self._slots) < self.max_entries:
+                slot = len(self._slots)
+            else:
+                _, slot = self._slots.popitem(last=False)
+            self._slots[k] = slot
+            slots.append(slot)
+        self._values[np.array(slots, dtype=np.int64)] = values
+
+    def _lookup(self, texts) -> tuple:
+        """(values of the unique texts, index of each text's row in them)."""
+        import numpy as np
+        import pandas as pd
+        texts = list(texts)
+        codes, keys = pd.factorize(text_hashes(texts))
+        keys = keys.tolist()
+        first = np.unique(codes, return_index=True)[1]
+        found = np.fromiter((self._slots.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        hit = found >= 0
+        values = np.empty((len(keys), self._values.shape[1]))
+        values[hit] = self._values[found[hit]]
+        for j in np.flatnonzero(hit).tolist():
+            self._slots.move_to_end(keys[j])
+        miss = np.flatnonzero(~hit)
+        if len(miss):
+            values[miss] = self._score([texts[i] for i in first[miss]])
+            self._insert([keys[j] for j in miss.tolist()], values[miss])
+        self.rows += len(texts)
+        self.unique += len(keys)
+        self.hits += int(hit.sum())
+        self.scored += len(miss)
+        return values, codes
+
+    def _predict_proba(self, texts) -> "np.ndarray":
+        values, codes = self._lookup(texts)
+        return values[codes]
+
+    def predict(self, texts) -> "np.ndarray":
+        import numpy as np
+        values, codes = self._lookup(texts)
+        best = values.argmax(axis=1) if self._proba else values[:, 0].astype(np.int64)
+        return np.asarray(self.classes_)[best[codes]]
+
+    def save(self, path: str = None) -> str:
+        """Write the LRU (least recently used first) with the model hash; atomic replace."""
+        import numpy as np
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        keys = np.fromiter(self._slots.keys(), dtype=np.uint64, count=len(self._slots))
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        tmp = f"{path}.tmp{os.getpid()}.npz"
+        np.savez(tmp, model=np.array(self.model_hash), keys=keys, values=self._values[slots])
+        os.replace(tmp, path)
+        return path
+
+    def load(self, path: str) -> int:
+        """Add the entries saved by save() for this model; returns how many (0 if the file is
+        for another model or unreadable)."""
+        import numpy as np
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_hash or data["values"].shape[1] != self._values.shape[1]:
+                    return 0
+                keys, values = data["keys"].tolist(), data["values"]
+        except (OSError, ValueError, KeyError):
+            return 0
+        self._insert(keys, values)
+        self.loaded = min(len(keys), max(self.max_entries, 0))
+        return self.loaded
+
+    def stats(self) -> dict:
+        return {"rows": self.rows, "unique": self.unique, "hits": self.hits, "scored": self.scored,
+                "hit_rate": 1.0 - self.scored / self.rows if self.rows else 0.0,
+                "entries": len(self._slots), "max_entries": self.max_entries, "loaded": self.loaded}
+
+    def stats_line(self) -> str:
+        return format_stats(self.stats())
+
+
+def memoized(model, model_path: str, max_entries: int = DEFAULT_MAX_ENTRIES, path: str = None) -> MemoizedModel:
+    """Wrap the model loaded from `model_path`; the persisted LRU at `path` is keyed by its hash."""
+    return MemoizedModel(model, model_digest(model_path), max_entries, path)
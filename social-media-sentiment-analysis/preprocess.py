@@ -1,37 +1,171 @@
 """
 preprocess.py
-- Input CSV must have column 'text'. If 'label' exists, it is preserved.
-- Outputs cleaned CSV to social-media-sentiment-analysis/data/processed/tweets_clean.csv (default).
+- Input CSV/Parquet must have column 'text'. If 'label' exists, it is preserved.
+- Outputs cleaned data to social-media-sentiment-analysis/data/processed/tweets_clean.parquet
+  (default; .csv when pyarrow is not installed). The output format follows the extension.
+- --chunksize N streams the input N rows at a time and appends to the output, so memory
+  stays bounded by the chunk size instead of the dataset size.
+- --workers N cleans chunks in a process pool (implies streaming); output keeps input order.
+- .gz / .zst input and output paths are (de)compressed automatically.
+- --incremental appends to a day-partitioned output directory instead of rewriting one file:
+  only ids not processed before (or whose raw row changed) are cleaned, so a daily run costs
+  time in proportion to the new rows. See incremental.py; the readers accept the directory.
+- Stage timings/memory go to a JSON run log (instrumentation.py); --profile adds a cProfile dump.
 """
 import argparse
 import os
-import re
-import pandas as pd
-
-def clean_text(s: str) -> str:
-    if not isinstance(s, str):
-        return ""
-    s = s.lower()
-    s = re.sub(r"http\S+", "", s)
-    s = re.sub(r"@\w+", "", s)
-    s = re.sub(r"#", "", s)
-    s = re.sub(r"[^a-z0-9\s']", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+from cleaning import CLEANER_VERSION, clean_text, clean_series, pack_texts, clean_packed, unpack_cleaned  # noqa: F401
+import instrumentation
+from dataset_io import (iter_chunks, read_dataset, write_dataset, ChunkWriter, Throughput,
+                        default_path, has_pyarrow, PROCESSED_DATASET)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _require_text(df: "pd.DataFrame") -> None:
+    if "text" not in df.columns:
+        raise SystemExit("Input CSV must have a 'text' column")
+
+
+def clean_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    _require_text(df)
+    df["text_clean"] = clean_series(df["text"].astype(str))
+    return df
+
+
+def _parallel_clean(chunks, workers: int):
+    """Yield chunks with text_clean filled in by a process pool, in input order.
+
+    Only the packed text column crosses the process boundary; at most 2 * workers
+    chunks are in flight so memory stays bounded.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            _require_text(chunk)
+            packed = pack_texts(chunk["text"].astype(str).tolist())
+            pending.append((chunk, pool.submit(clean_packed, packed)))
+            if len(pending) >= 2 * workers:
+                done, fut = pending.popleft()
+                done["text_clean"] = unpack_cleaned(fut.result(), len(done))
+                yield done
+        while pending:
+            done, fut = pending.popleft()
+            done["text_clean"] = unpack_cleaned(fut.result(), len(done))
+            yield done
+
+
+def preprocess_streaming(input_path: str, output_path: str, chunksize: int, workers: int = 1) -> Throughput:
+    stats = Throughput()
+    chunks = iter_chunks(input_path, chunksize)
+    cleaned = _parallel_clean(chunks, workers) if workers > 1 else map(clean_frame, chunks)
+    # load, clean and save overlap chunk by chunk, so they are measured as one stage
+    with instrumentation.stage("load+clean+save") as record, ChunkWriter(output_path) as out:
+        for i, chunk in enumerate(cleaned):
+            out.write(chunk)
+            stats.add(len(chunk))
+            print(f"chunk {i + 1}: {stats}")
+        if record is not None:
+            record["rows"] = stats.rows
+    return stats
+
+
+def preprocess_incremental(input_path: str, out_dir: str, chunksize: int, workers: int = 1) -> Throughput:
+    from incremental import PartitionedDataset
+    if os.path.isfile(out_dir):
+        raise SystemExit(f"--incremental writes a directory, but {out_dir} is a file")
+    dataset = PartitionedDataset(out_dir, ".parquet" if has_pyarrow() else ".csv")
+    try:
+        dataset.recover()
+        if dataset.check_version(CLEANER_VERSION):
+            print("Cleaner version or row format changed: reprocessing every row")
+        run = dataset.begin()
+        seen = Throughput()
+        counts = {"new": 0, "changed": 0}
+
+        def pending():
+            # raw columns as strings: an empty id would turn the column into float64 and
+            # round distinct ids together (see incremental.py)
+            for chunk in iter_chunks(input_path, chunksize, dtype=str):
+                if "id" not in chunk.columns:
+                    raise SystemExit("Incremental preprocessing needs an 'id' column")
+                chunk = chunk[chunk["id"].notna()].drop_duplicates("id", keep="last")
+                seen.add(len(chunk))
+                todo, changed = dataset.select(chunk)
+                counts["new"] += len(todo) - changed
+                counts["changed"] += changed
+                if len(todo):
+                    yield todo
+
+        stats = Throughput()
+        cleaned = _parallel_clean(pending(), workers) if workers > 1 else map(clean_frame, pending())
+        with instrumentation.stage("select+clean+append") as record:
+            for chunk in cleaned:
+                dataset.append(chunk)
+                stats.add(len(chunk))
+                print(f"run {run}: {seen.rows:,} rows read, {stats.rows:,} cleaned")
+            if record is not None:
+                record["rows"] = seen.rows
+        with instrumentation.stage("commit"):
+            dataset.commit(stats.rows)
+        print(f"run {run}: {counts['new']:,} new, {counts['changed']:,} changed, "
+              f"{seen.rows - stats.rows:,} unchanged rows skipped; {dataset.stats()}")
+        return stats
+    finally:
+        dataset.close()
+
+
+def preprocess(args) -> None:
+    if args.incremental:
+        stats = preprocess_incremental(args.input, args.output, args.chunksize or DEFAULT_CHUNKSIZE, args.workers)
+        print(f"Appended cleaned data to {args.output} ({stats})")
+        return
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    if args.chunksize or args.workers > 1:
+        stats = preprocess_streaming(args.input, args.output, args.chunksize or DEFAULT_CHUNKSIZE, args.workers)
+        print(f"Wrote cleaned data to {args.output} ({stats})")
+        return
+
+    stats = Throughput()
+    with instrumentation.stage("load"):
+        df = read_dataset(args.input)
+    with instrumentation.stage("clean", len(df)):
+        df = clean_frame(df)
+    with instrumentation.stage("save", len(df)):
+        write_dataset(df, args.output)
+    stats.add(len(df))
+    print(f"Wrote cleaned data to {args.output} ({stats})")
+
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, help="raw csv path with 'text' column")
-    parser.add_argument("--output", default="social-media-sentiment-analysis/data/processed/tweets_clean.csv")
+    parser.add_argument("--input", required=True,
+                        help="raw dataset with 'text' column (.csv, .csv.gz, .csv.zst, .parquet)")
+    parser.add_argument("--output", default=None,
+                        help=f"default {default_path(PROCESSED_DATASET)}, or the directory "
+                             f"{PROCESSED_DATASET} with --incremental")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the input this many rows at a time (bounded memory)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"clean chunks in N processes (streams with --chunksize, default {DEFAULT_CHUNKSIZE:,})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="append new/changed ids to a day-partitioned output directory")
+    instrumentation.add_profile_argument(parser)
     args = parser.parse_args()
+    if args.output is None:
+        args.output = PROCESSED_DATASET if args.incremental else default_path(PROCESSED_DATASET)
+
+    with instrumentation.run("preprocess", args):
+        preprocess(args)
 
-    df = pd.read_csv(args.input, encoding="utf-8")
-    if "text" not in df.columns:
-        raise SystemExit("Input CSV must have a 'text' column")
-    df["text_clean"] = df["text"].astype(str).apply(clean_text)
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    df.to_csv(args.output, index=False, encoding="utf-8")
-    print("Wrote cleaned data to", args.output)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+reporting.py
+- Figures from pre-aggregated tables, so plotting cost does not grow with the dataset:
+    label distribution     label -> count
+    confusion matrix       counts from evaluate.ConfusionCounts (label vs pred_label)
+    sentiment over time    (period, label) -> count, from `date`
+- aggregate() builds all tables in one pass over a dataset, chunk by chunk; Report.update()
+  can also be fed chunks directly.
+- Always uses the non-interactive Agg backend. Each kind of figure is created once per
+  process and cleared for the next call, and close_figures() releases them, so repeated
+  calls in one process (bench_pipeline.py, a notebook) do not leak figures.
+- render() draws several figures in parallel worker processes (pyplot is not thread-safe);
+  only the small tables are sent to the workers.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/reporting.py --input social-media-sentiment-analysis/data/processed/tweets_clean.parquet
+  python social-media-sentiment-analysis/reporting.py --input scored.parquet --label-column pred_label --freq W --workers 3
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import instrumentation
+from dataset_io import iter_chunks, dataset_columns, Throughput, default_path, PROCESSED_DATASET
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_OUT_DIR = "social-media-sentiment-analysis/figures"
+DEFAULT_CHUNKSIZE = 100_000
+FREQUENCIES = {"D": "day", "W": "week", "M": "month"}
+
+_FIGURES = {}
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _figure(kind: str, figsize: tuple):
+    """The figure for `kind`, cleared; created on first use."""
+    plt = _pyplot()
+    fig = _FIGURES.get(kind)
+    if fig is None or not plt.fignum_exists(fig.number):
+        fig = _FIGURES[kind] = plt.figure(figsize=figsize)
+    else:
+        fig.clf()
+        fig.set_size_inches(figsize)
+    return fig
+
+
+def close_figures() -> None:
+    plt = _pyplot()
+    for fig in _FIGURES.values():
+        plt.close(fig)
+    _FIGURES.clear()
+
+
+def _save(fig, path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+def plot_label_distribution(counts: "pd.Series", path: str) -> str:
+    """Horizontal bars, most frequent label first."""
+    import seaborn as sns
+    counts = counts.sort_values(ascending=False)
+    fig = _figure("label_distribution", (6, 4))
+    ax = fig.add_subplot()
+    sns.barplot(x=counts.to_numpy(), y=counts.index.astype(str), orient="h", ax=ax)
+    ax.set_xlabel("count")
+    ax.set_ylabel("label")
+    ax.set_title("Label distribution")
+    return _save(fig, path)
+
+
+def plot_confusion_matrix(cm, labels: list, path: str) -> str:
+    import seaborn as sns
+    fig = _figure("confusion_matrix", (6, 5))
+    ax = fig.add_subplot()
+    sns.heatmap(cm, annot=True, fmt="d", xticklabels=labels, yticklabels=labels, cmap="Blues", ax=ax)
+    ax.set_xlabel("Predicted")
+    ax.set_ylabel("True")
+    return _save(fig, path)
+
+
+def plot_sentiment_over_time(table: "pd.DataFrame", path: str, freq: str = "D") -> str:
+    """Share of each label per period (lines), with the number of rows per period below."""
+    fig = _figure("sentiment_over_time", (9, 5))
+    top, bottom = fig.subplots(2, 1, sharex=True, gridspec_kw={"height_ratios": [3, 1]})
+    totals = table.sum(axis=1)
+    share = table.div(totals.where(totals > 0), axis=0)
+    for label in share.columns:
+        top.plot(share.index, share[label], label=str(label))
+    top.set_ylabel("share of rows")
+    top.set_title(f"Sentiment per {FREQUENCIES[freq]}")
+    top.legend(loc="upper right")
+    bottom.bar(table.index, totals.to_numpy(), width={"D": 0.8, "W": 5, "M": 20}[freq], color="grey")
+    bottom.set_ylabel("rows")
+    fig.autofmt_xdate()
+    return _save(fig, path)
+
+
+class Report:
+    """Tables for the figures, accumulated chunk by chunk."""
+
+    def __init__(self, label_col: str = "label", freq: str = "D"):
+        self.label_col = label_col
+        self.freq = freq
+        self.label_counts = None
+        self.over_time = None
+        self.confusion = None
+
+    def update(self, chunk: "pd.DataFrame") -> None:
+        import pandas as pd
+        # rows without a label are not counted (as seaborn's countplot did), not a "nan" bar
+        chunk = chunk[chunk[self.label_col].notna()]
+        labels = chunk[self.label_col].astype(str)
+        counts = labels.value_counts()
+        self.label_counts = counts if self.label_counts is None else self.label_counts.add(counts, fill_value=0)
+        if "date" in chunk.columns:
+            dates = pd.to_datetime(chunk["date"], utc=True, errors="coerce", format="ISO8601")
+            period = dates.dt.tz_localize(None).dt.to_period(self.freq).dt.start_time
+            counts = labels.groupby([period, labels]).size()
+            self.over_time = counts if self.over_time is None else self.over_time.add(counts, fill_value=0)
+        if self.label_col == "pred_label" and "label" in chunk.columns:
+            from evaluate import ConfusionCounts
+            if self.confusion is None:
+                self.confusion = ConfusionCounts()
+            known = chunk["label"].notna().to_numpy()
+            self.confusion.update(chunk["label"][known].astype(str), labels[known])
+
+    def tables(self) -> dict:
+        """Figure name -> (plot function name, args, kwargs): small and picklable, for render()."""
+        out = {}
+        if self.label_counts is not None:
+            out["label_dist"] = ("plot_label_distribution", (self.label_counts.astype("int64"),), {})
+        if self.over_time is not None and len(self.over_time):
+            table = self.over_time.unstack(fill_value=0).astype("int64").sort_index()
+            out["sentiment_over_time"] = ("plot_sentiment_over_time", (table,), {"freq": self.freq})
+        if self.confusion is not None:
+            labels = self.confusion.true_labels
+            out["confusion_matrix"] = ("plot_confusion_matrix", (self.confusion.matrix(labels), labels), {})
+        return out
+
+
+def aggregate(path: str, label_col: str = "label", freq: str = "D", chunksize: int = DEFAULT_CHUNKSIZE) -> Report:
+    """One pass over a dataset (file or partitioned directory), reading only the needed columns."""
+    available = set(dataset_columns(path))
+    if label_col not in available:
+        raise SystemExit(f"Input must contain a '{label_col}' column")
+    columns = [c for c in dict.fromkeys([label_col, "label", "date"]) if c in available]
+    report = Report(label_col, freq)
+    stats = Throughput()
+    for chunk in iter_chunks(path, chunksize, columns=columns):
+        report.update(chunk)
+        stats.add(len(chunk))
+    print(f"Aggregated {stats}")
+    return report
+
+
+def _render_one(name: str, spec: tuple, out_dir: str) -> str:
+    fn, args, kwargs = spec
+    return globals()[fn](*args, os.path.join(out_dir, name + ".png"), **kwargs)
+
+
+def render(tables: dict, out_dir: str = DEFAULT_OUT_DIR, workers: int = 1) -> list:
+    """Draw every table from Report.tables(); with workers > 1 each figure in its own process.
+    Figures are closed afterwards."""
+    if workers <= 1 or len(tables) <= 1:
+        try:
+            return [_render_one(name, spec, out_dir) for name, spec in tables.items()]
+        finally:
+            close_figures()
+    with ProcessPoolExecutor(max_workers=min(workers, len(tables))) as pool:
+        futures = [pool.submit(_render_one, name, spec, out_dir) for name, spec in tables.items()]
+        return [f.result() for f in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate a dataset in one pass and render report figures")
+    parser.add_argument("--input", default=default_path(PROCESSED_DATASET),
+                        help="dataset with a label column; with pred_label and label also a confusion matrix")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--label-column", default="label", help="'label', or 'pred_label' for scored output")
+    parser.add_argument("--freq", choices=FREQUENCIES, default="D", help="period of the sentiment-over-time plot")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=1, help="render figures in N processes")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.run("reporting", args):
+        with instrumentation.stage("aggregate"):
+            report = aggregate(args.input, args.label_column, args.freq, args.chunksize)
+        with instrumentation.stage("render"):
+            paths = render(report.tables(), args.out_dir, args.workers)
+    for p in paths:
+        print("Saved", p)
+
+
+if __name__ == "__main__":
+    main()
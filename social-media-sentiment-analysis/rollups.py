@@ -0,0 +1,477 @@
+"""
+rollups.py
+- Windowed sentiment aggregation over scored rows (predict.py output, or any dataset with a
+  label): counts per tumbling window (hour, day, ...) for every label, overall and per
+  dimension (user, plus --by columns such as a query column), with likeCount summed as well
+  for like-weighted sentiment (each row weighs 1 + its likes).
+- WindowAggregator consumes rows chunk by chunk and keeps only the windows that are still
+  open: a window closes once the newest date seen is more than --lateness past its end, and
+  its counts are emitted as an incremental update. All counts are additive, so rows that
+  arrive after their window closed (the scraper returns newest first) are simply emitted as
+  another update for that window.
+- Memory stays fixed: per open window each dimension keeps its --top keys (by rows), trimmed
+  after every chunk (Space-Saving style). A key's true count in a window is between `rows`
+  and `rows + error`:
+    - trimming raises the (grain, window, dim)'s watermark, kept as a '*dropped*' key row, to
+      the largest upper bound of a dropped key; untracked keys have at most that many rows
+    - a key that enters (again) after a trim starts with the watermark as its error
+    - merging updates sums each key's error, using a part's watermark where it lacks the key
+- RollupStore persists updates in a directory:
+    updates/part-<seq>.parquet|csv   emitted updates, appended per run
+    <grain>-<gen>.parquet|csv        compacted rollup per grain (updates summed in, trimmed)
+    state.json                       committed parts and rollups, aggregated input digests, --top
+  state.json is written last and is the commit point: files it does not list are leftovers
+  of an interrupted run and are deleted. Each input file is aggregated once (by content
+  digest); for a partitioned directory only new part files are read.
+- Sliding windows (e.g. 24h every hour) are sums of consecutive tumbling buckets, computed
+  by query() from the rollups, so time series never rescan the scored rows.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/rollups.py update --input scored.parquet --grains hour day --by query
+  python social-media-sentiment-analysis/rollups.py query --grain hour --window 24h --dim user --key some_user
+  python social-media-sentiment-analysis/rollups.py compact
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+import instrumentation
+from dataset_io import (iter_chunks, read_dataset, write_dataset, dataset_files, dataset_columns, ChunkWriter,
+                        Throughput, has_pyarrow)
+from feature_cache import file_digest
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+DEFAULT_STORE = "social-media-sentiment-analysis/data/rollups"
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_TOP = 100
+GRAINS = {"minute": "min", "hour": "h", "day": "D"}
+KEY_COLUMNS = ["grain", "window", "dim", "key", "label"]
+KEY_LEVELS = KEY_COLUMNS[:4]
+GROUP_LEVELS = KEY_COLUMNS[:3]
+VALUE_COLUMNS = ["rows", "likes", "error"]
+ALL = "all"
+# key of the row (label "") holding a (grain, window, dim)'s dropped-count watermark in `error`
+DROPPED = "*dropped*"
+STATE_FILE = "state.json"
+
+
+def _offset(grain: str) -> "pd.Timedelta":
+    import pandas as pd
+    return pd.Timedelta(1, unit=GRAINS[grain])
+
+
+def label_column(columns) -> str:
+    """pred_label for scored output, else label."""
+    for col in ("pred_label", "label"):
+        if col in columns:
+            return col
+    raise SystemExit("Input must contain a 'pred_label' (predict.py output) or 'label' column")
+
+
+def _split(df: "pd.DataFrame") -> tuple:
+    """(key rows, dropped-count watermark per (grain, window, dim))."""
+    keys = df.index.get_level_values("key")
+    marks = df[keys == DROPPED]
+    return df[keys != DROPPED], marks["error"].droplevel(["key", "label"])
+
+
+def _at(watermark: "pd.Series", index: "pd.MultiIndex") -> "np.ndarray":
+    """The watermark of each entry of `index` (which starts with grain, window, dim), 0 if none."""
+    import numpy as np
+    if not len(watermark):
+        return np.zeros(len(index), dtype="int64")
+    groups = index.droplevel([n for n in index.names if n not in GROUP_LEVELS])
+    return watermark.reindex(groups).fillna(0).astype("int64").to_numpy()
+
+
+def _marks_frame(watermark: "pd.Series") -> "pd.DataFrame":
+    import pandas as pd
+    watermark = watermark[watermark > 0]
+    if not len(watermark):
+        return None
+    idx = watermark.index
+    index = pd.MultiIndex.from_arrays(
+        [idx.get_level_values("grain"), idx.get_level_values("window"), idx.get_level_values("dim"),
+         [DROPPED] * len(idx), [""] * len(idx)], names=KEY_COLUMNS)
+    return pd.DataFrame({"rows": 0, "likes": 0, "error": watermark.astype("int64").to_numpy()}, index=index)
+
+
+def trim(df: "pd.DataFrame", top: int) -> "pd.DataFrame":
+    """Keep the `top` keys (by rows over all labels) of every (grain, window, dim) except 'all'.
+    The largest upper bound (rows + error) of a dropped key raises that group's watermark."""
+    import pandas as pd
+    if not len(df):
+        return df
+    data, watermark = _split(df)
+    dims = data.index.get_level_values("dim")
+    keyed = data[dims != ALL]
+    if not len(keyed):
+        return df
+    totals = keyed["rows"].groupby(level=KEY_LEVELS, sort=False).sum()
+    errors = keyed["error"].groupby(level=KEY_LEVELS, sort=False).max()
+    rank = totals.groupby(level=GROUP_LEVELS, sort=False).rank(method="first", ascending=False)
+    if rank.max() <= top:
+        return df
+    bound = (totals + errors)[rank > top].groupby(level=GROUP_LEVELS, sort=False).max()
+    watermark = pd.concat([watermark, bound]).groupby(level=GROUP_LEVELS, sort=False).max()
+    kept = keyed[rank.reindex(keyed.index.droplevel("label")).to_numpy() <= top]
+    return _concat([data[dims == ALL], kept, _marks_frame(watermark)])
+
+
+def _concat(frames: list) -> "pd.DataFrame":
+    import pandas as pd
+    frames = [f for f in frames if f is not None and len(f)]
+    if not frames:
+        return empty_rollup()
+    return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+
+def empty_rollup() -> "pd.DataFrame":
+    import pandas as pd
+    index = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([]), [], [], []], names=KEY_COLUMNS)
+    return pd.DataFrame({c: pd.Series([], dtype="int64") for c in VALUE_COLUMNS}, index=index)
+
+
+def merge(frames: list, top: int) -> "pd.DataFrame":
+    """Sum rollup frames key by key, then trim. A key's error is the sum over the frames of
+    its error there, or of the frame's watermark where the frame does not have the key (it may
+    have been dropped from it); watermarks add up."""
+    import pandas as pd
+    frames = [f for f in frames if f is not None and len(f)]
+    if len(frames) <= 1:
+        return trim(_concat(frames), top)
+    counts, errors, marks = [], [], []
+    for f in frames:
+        data, watermark = _split(f)
+        marks.append(watermark)
+        if len(data):
+            counts.append(data[["rows", "likes"]])
+            e = data["error"].groupby(level=KEY_LEVELS, sort=False).max()
+            errors.append(e - _at(watermark, e.index))
+    watermark = pd.concat(marks).groupby(level=GROUP_LEVELS, sort=False).sum()
+    if not counts:
+        return trim(_concat([_marks_frame(watermark)]), top)
+    df = pd.concat(counts).groupby(level=KEY_COLUMNS, sort=False).sum()
+    error = pd.concat(errors).groupby(level=KEY_LEVELS, sort=False).sum()
+    df["error"] = (error.reindex(df.index.droplevel("label")).to_numpy().astype("int64")
+                   + _at(watermark, df.index))
+    return trim(_concat([df[VALUE_COLUMNS], _marks_frame(watermark)]), top)
+
+
+class WindowAggregator:
+    def __init__(self, grains=("hour", "day"), by=(), top: int = DEFAULT_TOP, lateness: str = "1h",
+                 label_col: str = "pred_label"):
+        import pandas as pd
+        unknown = sorted(set(grains) - set(GRAINS))
+        if unknown:
+            raise SystemExit(f"Unknown grain(s) {unknown}, choose from {sorted(GRAINS)}")
+        self.grains = list(grains)
+        self.dims = [ALL, "user", *[c for c in by if c != "user"]]
+        self.top = top
+        self.lateness = pd.Timedelta(lateness)
+        self.label_col = label_col
+        self.open = empty_rollup()
+        self.newest = None
+        self.counts = {"rows": 0, "no_date": 0, "updates": 0}
+
+    def _partial(self, chunk: "pd.DataFrame") -> "pd.DataFrame":
+        import pandas as pd
+        dates = pd.to_datetime(chunk["date"], utc=True, errors="coerce", format="ISO8601").dt.tz_localize(None)
+        valid = dates.notna().to_numpy()
+        self.counts["no_date"] += int((~valid).sum())
+        chunk, dates = chunk[valid], dates[valid]
+        if not len(chunk):
+            return empty_rollup()
+        newest = dates.max()
+        self.newest = newest if self.newest is None else max(self.newest, newest)
+        likes = (pd.to_numeric(chunk["likeCount"], errors="coerce").fillna(0).astype("int64")
+                 if "likeCount" in chunk.columns else 0)
+        base = pd.DataFrame({"label": chunk[self.label_col].astype(str).to_numpy(), "rows": 1,
+                             "likes": likes, "error": 0}, index=chunk.index)
+        frames = []
+        for grain in self.grains:
+            base["window"] = dates.dt.floor(GRAINS[grain])
+            for dim in self.dims:
+                if dim != ALL and dim not in chunk.columns:
+                    continue
+                base["key"] = "" if dim == ALL else chunk[dim].astype(str)
+                g = base.groupby(["window", "key", "label"], sort=False)[VALUE_COLUMNS].sum()
+                frames.append(g.assign(grain=grain, dim=dim).set_index(["grain", "dim"], append=True)
+                              .reorder_levels(KEY_COLUMNS))
+        return _concat(frames)
+
+    def update(self, chunk: "pd.DataFrame") -> "pd.DataFrame":
+        """Add a chunk; returns the counts of the windows this chunk closed (maybe empty)."""
+        self.counts["rows"] += len(chunk)
+        self.open = merge([self.open, self._partial(chunk)], self.top)
+        if self.newest is None:
+            return empty_rollup()
+        ends = self.open.index.get_level_values("window") + self.open.index.get_level_values("grain").map(_offset)
+        closed = (ends <= self.newest - self.lateness)
+        out, self.open = self.open[closed], self.open[~closed]
+        self.counts["updates"] += len(out)
+        return out
+
+    def flush(self) -> "pd.DataFrame":
+        """Counts of every window still open (end of input)."""
+        out, self.open = self.open, empty_rollup()
+        self.counts["updates"] += len(out)
+        return out
+
+    def summary(self) -> str:
+        c = self.counts
+        return (f"{c['rows']:,} rows ({c['no_date']:,} without a date skipped) -> {c['updates']:,} update rows; "
+                f"{len(self.open):,} open")
+
+
+def to_frame(rollup: "pd.DataFrame") -> "pd.DataFrame":
+    return rollup.reset_index()
+
+
+def from_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    import pandas as pd
+    if not len(df):
+        return empty_rollup()
+    df = df.assign(window=pd.to_datetime(df["window"], format="ISO8601"),
+                   **{c: df[c].astype(str) for c in ("grain", "dim", "key", "label")})
+    # CSV reads "" back as NaN -> "nan"
+    df["key"] = df["key"].where(df["dim"] != ALL, "")
+    df["label"] = df["label"].where(df["key"] != DROPPED, "")
+    return df.set_index(KEY_COLUMNS)[VALUE_COLUMNS].astype("int64")
+
+
+class RollupStore:
+    def __init__(self, root: str = DEFAULT_STORE, top: int = None):
+        """`top` is recorded in state.json by the next commit; None uses the recorded one."""
+        self.root = root
+        os.makedirs(os.path.join(root, "updates"), exist_ok=True)
+        try:
+            with open(os.path.join(root, STATE_FILE), encoding="utf-8") as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {"ext": ".parquet" if has_pyarrow() else ".csv", "seq": 0, "gen": 0,
+                          "updates": [], "rollups": {}, "inputs": {}}
+        self.ext = self.state["ext"]
+        self.top = top if top is not None else self.state.get("top", DEFAULT_TOP)
+        self._pending = []
+        self._remove_uncommitted()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _remove_uncommitted(self) -> None:
+        known = set(self.state["updates"]) | set(self.state["rollups"].values())
+        for name in os.listdir(self.root) + [f"updates/{n}" for n in os.listdir(self._path("updates"))]:
+            if name.endswith(self.ext) and name not in known:
+                os.remove(self._path(name))
+
+    def _commit(self) -> None:
+        tmp = self._path(STATE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._path(STATE_FILE))
+
+    def seen(self, digest: str) -> bool:
+        return digest in self.state["inputs"]
+
+    def write(self, update: "pd.DataFrame") -> None:
+        """Write an update as a part file; it counts once commit() records it."""
+        if not len(update):
+            return
+        self.state["seq"] += 1
+        name = f"updates/part-{self.state['seq']:06d}{self.ext}"
+        write_dataset(to_frame(update), self._path(name))
+        self._pending.append(name)
+
+    def commit(self, inputs: dict) -> None:
+        """Make the written parts count, together with the inputs they came from."""
+        self.state["updates"] += self._pending
+        self.state["top"] = self.top
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for digest, path in inputs.items():
+            self.state["inputs"][digest] = {"path": path, "at": now}
+        self._pending = []
+        self._commit()
+
+    def _read(self, name: str) -> "pd.DataFrame":
+        return from_frame(read_dataset(self._path(name)))
+
+    def load(self, grain: str = None) -> "pd.DataFrame":
+        """Rollups plus the updates not compacted yet, summed (optionally one grain only)."""
+        names = [n for g, n in self.state["rollups"].items() if grain in (None, g)] + self.state["updates"]
+        frames = [self._read(n) for n in names]
+        if grain is not None:
+            frames = [f[f.index.get_level_values("grain") == grain] for f in frames]
+        return merge(frames, self.top)
+
+    def compact(self) -> int:
+        """Sum the updates into the per-grain rollups; returns the number of parts folded in."""
+        parts = self.state["updates"]
+        if not parts:
+            return 0
+        merged = merge([self._read(n) for n in [*self.state["rollups"].values(), *parts]], self.top)
+        self.state["gen"] += 1
+        old = list(self.state["rollups"].values())
+        rollups = {}
+        for grain, df in merged.groupby(level="grain", sort=True):
+            name = f"{grain}-{self.state['gen']:06d}{self.ext}"
+            write_dataset(to_frame(df.sort_index()), self._path(name))
+            rollups[grain] = name
+        self.state["rollups"], self.state["updates"] = rollups, []
+        self._commit()
+        for name in old + parts:
+            os.remove(self._path(name))
+        return len(parts)
+
+
+def query(rollup: "pd.DataFrame", grain: str, dim: str = ALL, key: str = "", window: str = None) -> "pd.DataFrame":
+    """Time series for one (grain, dim, key): rows, share_<label> and weighted_share_<label>
+    (rows weighted by 1 + likes) per bucket, plus `error` for a trimmed dim (the watermark in
+    buckets without the key). With `window` (e.g. '24h', '7D'), every bucket holds the sum of
+    the buckets in the window ending there (a sliding window)."""
+    import pandas as pd
+    idx = rollup.index
+    in_dim = (idx.get_level_values("grain") == grain) & (idx.get_level_values("dim") == dim)
+    sel = rollup[in_dim & (idx.get_level_values("key") == (key if dim != ALL else ""))]
+    if not len(sel):
+        return pd.DataFrame()
+    rows = sel["rows"].droplevel(["grain", "dim", "key"]).unstack("label", fill_value=0)
+    weight = (sel["rows"] + sel["likes"]).droplevel(["grain", "dim", "key"]).unstack("label", fill_value=0)
+    # every bucket between the first and last, so sliding sums see the empty ones too
+    full = pd.date_range(rows.index.min(), rows.index.max(), freq=GRAINS[grain])
+    rows, weight = rows.reindex(full, fill_value=0), weight.reindex(full, fill_value=0)
+    error = None
+    if dim != ALL:
+        marks = rollup[in_dim & (idx.get_level_values("key") == DROPPED)]["error"].droplevel(["grain", "dim", "key", "label"])
+        present = sel["error"].groupby(level="window").max()
+        error = present.reindex(full).fillna(marks.reindex(full)).fillna(0).astype("int64")
+    if window:
+        rows, weight = rows.rolling(window).sum().astype("int64"), weight.rolling(window).sum().astype("int64")
+        if error is not None:
+            error = error.rolling(window).sum().astype("int64")
+    total, wtotal = rows.sum(axis=1), weight.sum(axis=1)
+    out = pd.DataFrame({"rows": total})
+    if error is not None:
+        out["error"] = error
+    for label in rows.columns:
+        out[f"share_{label}"] = (rows[label] / total.where(total > 0)).round(4)
+    for label in weight.columns:
+        out[f"weighted_share_{label}"] = (weight[label] / wtotal.where(wtotal > 0)).round(4)
+    out.index.name = "window"
+    return out
+
+
+def top_keys(rollup: "pd.DataFrame", grain: str, dim: str = "user", n: int = 10) -> "pd.DataFrame":
+    """Keys of `dim` with the most rows over all windows of `grain`, with their label counts.
+    A key's error adds up its error in the windows that have it and the watermark elsewhere."""
+    idx = rollup.index
+    in_dim = (idx.get_level_values("grain") == grain) & (idx.get_level_values("dim") == dim)
+    dropped = idx.get_level_values("key") == DROPPED
+    sel, marks = rollup[in_dim & ~dropped], rollup[in_dim & dropped]["error"]
+    table = sel["rows"].groupby(level=["key", "label"]).sum().unstack("label", fill_value=0)
+    table["rows"] = table.sum(axis=1)
+    present = sel["error"].groupby(level=["window", "key"]).max()
+    own = present - marks.groupby(level="window").sum().reindex(present.index.get_level_values("window")).fillna(0).to_numpy()
+    table["error"] = (own.groupby(level="key").sum() + marks.sum()).astype("int64")
+    return table.sort_values("rows", ascending=False).head(n)
+
+
+def update(args) -> None:
+    store = RollupStore(args.store, args.top)
+    files = dataset_files(args.input) if os.path.isdir(args.input) else [args.input]
+    todo = {}
+    for path in files:
+        digest = file_digest(path)
+        if store.seen(digest):
+            print(f"already aggregated, skipped: {path}")
+        else:
+            todo[digest] = path
+    if not todo:
+        return
+    columns = set(dataset_columns(files[0]))
+    if "date" not in columns:
+        raise SystemExit("Input must contain a 'date' column")
+    agg = WindowAggregator(args.grains, args.by, args.top, args.lateness, label_column(columns))
+    wanted = [c for c in ["date", agg.label_col, "likeCount", *agg.dims[1:]] if c in columns]
+    stats = Throughput()
+    feed = ChunkWriter(args.updates) if args.updates else None
+    try:
+        with instrumentation.stage("aggregate") as record:
+            for path in todo.values():
+                for chunk in iter_chunks(path, args.chunksize, columns=wanted):
+                    closed = agg.update(chunk)
+                    store.write(closed)
+                    if feed is not None and len(closed):
+                        feed.write(to_frame(closed))
+                    stats.add(len(chunk))
+            closed = agg.flush()
+            store.write(closed)
+            if feed is not None and len(closed):
+                feed.write(to_frame(closed))
+            if record is not None:
+                record["rows"] = stats.rows
+    finally:
+        if feed is not None:
+            feed.close()
+    store.commit(todo)
+    print(f"Aggregated {stats}: {agg.summary()}")
+    if len(store.state["updates"]) >= args.compact_after:
+        with instrumentation.stage("compact"):
+            n = store.compact()
+        print(f"Compacted {n} update part(s) into {', '.join(sorted(store.state['rollups'].values()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Windowed sentiment rollups over scored rows")
+    sub = parser.add_subparsers(dest="command", required=True)
+    upd = sub.add_parser("update", help="aggregate new input into the rollup store")
+    upd.add_argument("--input", required=True, help="scored csv/parquet (or partitioned directory) with date")
+    upd.add_argument("--grains", nargs="+", choices=GRAINS, default=["hour", "day"], help="tumbling window sizes")
+    upd.add_argument("--by", nargs="*", default=[], help="extra dimension columns, e.g. query (user is always on)")
+    upd.add_argument("--top", type=int, default=DEFAULT_TOP, help="keys kept per window and dimension")
+    upd.add_argument("--lateness", default="1h", help="how long a window stays open after it ends")
+    upd.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    upd.add_argument("--updates", help="also append every emitted update to this csv/parquet file")
+    upd.add_argument("--compact-after", type=int, default=8, help="compact once this many update parts are pending")
+    qry = sub.add_parser("query", help="print a (sliding) time series or the top keys from the rollups")
+    qry.add_argument("--grain", choices=GRAINS, default="hour")
+    qry.add_argument("--dim", default=ALL, help="'all', 'user' or a --by column")
+    qry.add_argument("--key", default="", help="value of --dim; omit to list the top keys")
+    qry.add_argument("--window", help="sliding window length, e.g. 24h or 7D (default: tumbling buckets)")
+    qry.add_argument("--output", help="write the result to csv/parquet instead of printing it")
+    sub.add_parser("compact", help="fold pending updates into the per-grain rollups")
+    for p in (upd, qry, sub.choices["compact"]):
+        p.add_argument("--store", default=DEFAULT_STORE)
+    instrumentation.add_profile_argument(upd)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        with instrumentation.run("rollups", args):
+            update(args)
+    elif args.command == "compact":
+        store = RollupStore(args.store)
+        print(f"Compacted {store.compact()} update part(s) in {args.store}")
+    else:
+        import pandas as pd
+        rollup = RollupStore(args.store).load(args.grain)
+        if args.dim != ALL and not args.key:
+            table = top_keys(rollup, args.grain, args.dim)
+        else:
+            table = query(rollup, args.grain, args.dim, args.key, args.window)
+        if not len(table):
+            raise SystemExit(f"No rollups for grain={args.grain} dim={args.dim} key={args.key!r} in {args.store}")
+        if args.output:
+            write_dataset(table.reset_index(), args.output)
+            print("Saved", args.output)
+        else:
+            with pd.option_context("display.width", 200, "display.max_columns", 50, "display.max_rows", 200):
+                print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+sentiment.py
+- One entry point for the pipeline scripts:
+    sentiment collect | preprocess | dedup | train | evaluate | score | rollup | show  [script options]
+- Each subcommand runs the main() of the matching script with the remaining arguments, so
+  `sentiment train --search` is `train_model.py --search`. Only the chosen script is
+  imported, and the scripts themselves import pandas / sklearn / matplotlib / nltk inside the
+  functions that need them: `sentiment <cmd> --help` and argument errors return without
+  loading any of them.
+- bench_startup.py measures the startup time of every subcommand against a budget.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/sentiment.py train --search --n-jobs 4
+  python social-media-sentiment-analysis/sentiment.py score --input data.parquet --output scored.parquet
+"""
+import argparse
+import importlib
+import sys
+
+COMMANDS = {
+    "collect": ("data_collection", "scrape tweets into the raw dataset"),
+    "preprocess": ("preprocess", "clean the raw dataset"),
+    "dedup": ("dedup", "drop exact and near-duplicate texts"),
+    "train": ("train_model", "train (or search) the TF-IDF + classifier pipeline"),
+    "evaluate": ("evaluate", "classification report and confusion matrix"),
+    "score": ("predict", "bulk offline scoring of a CSV/Parquet file"),
+    "rollup": ("rollups", "windowed sentiment rollups of scored rows (update/query/compact)"),
+    "show": ("show_tables", "print and snapshot dataset tables"),
+}
+
+
+def main(argv=None):
+    epilog = "commands:\n" + "\n".join(f"  {name:11s} {help_}" for name, (_, help_) in COMMANDS.items())
+    parser = argparse.ArgumentParser(prog="sentiment", description="Social media sentiment pipeline",
+                                     epilog=epilog + "\n\nRun 'sentiment <command> --help' for its options.",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS, metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    # the script parses sys.argv itself; prog shows up as "sentiment <command>" in its help
+    sys.argv = [f"sentiment {args.command}", *args.args]
+    return module.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
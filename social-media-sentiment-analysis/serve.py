@@ -0,0 +1,267 @@
+"""
+serve.py
+- Local HTTP prediction server for models/model_pipeline.joblib (stdlib only, besides the model).
+  --model may also point at a compact model directory (model_artifact.py export).
+- The pipeline is loaded once; incoming texts go through cleaning.clean_batch like preprocess.py.
+- Concurrent requests are micro-batched: a single worker thread collects up to --max-batch texts
+  (or waits at most --max-wait-ms after the first one) and scores them with one predict_proba call.
+- --memo-size N memoizes the model (prediction_cache.py): identical cleaned texts in a batch are
+  scored once and the last N results are kept; --memo-file loads the LRU at start and saves it
+  on shutdown. /metrics then includes the memo hit rate.
+
+Endpoints:
+  POST /predict   {"text": "..."} or {"texts": ["...", ...]}
+                  -> {"predictions": [{"label": ..., "proba": {label: p, ...}}, ...]}
+  GET  /metrics   request/text/batch counters, throughput and p50/p99 latency (ms), memo stats
+  GET  /health
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/serve.py --port 8000 --max-batch 64 --max-wait-ms 5
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from cleaning import clean_batch
+from model_artifact import load_model
+from predict import add_memo_arguments, check_memo_arguments
+from prediction_cache import memoized
+
+DEFAULT_MODEL = "social-media-sentiment-analysis/models/model_pipeline.joblib"
+
+
+class ServerStats:
+    """Thread-safe counters plus a window of recent request latencies."""
+
+    def __init__(self, window: int = 10000):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.time()
+
+    def record_request(self, n_texts: int, seconds: float) -> None:
+        with self.lock:
+            self.requests += 1
+            self.texts += n_texts
+            self.latencies.append(seconds)
+
+    def record_batch(self) -> None:
+        with self.lock:
+            self.batches += 1
+
+    def record_error(self) -> None:
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            lat = np.array(self.latencies) * 1000.0
+            uptime = time.time() - self.started
+            return {
+                "uptime_s": round(uptime, 1),
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "errors": self.errors,
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "requests_per_s": round(self.requests / uptime, 2) if uptime else 0.0,
+                "texts_per_s": round(self.texts / uptime, 2) if uptime else 0.0,
+                "latency_ms": {
+                    "p50": round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+                    "p99": round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+                    "window": len(lat),
+                },
+            }
+
+
+class _Pending:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_STOP = object()  # queued by MicroBatcher.close()
+
+
+class MicroBatcher:
+    """Groups texts from concurrent callers into one vectorized predict_proba call."""
+
+    def __init__(self, model, stats: ServerStats, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.model = model
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.classes = [str(c) for c in model.classes_]
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def predict(self, texts: list) -> list:
+        item = _Pending(texts)
+        self.queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def close(self) -> None:
+        """Score the texts queued so far, then stop the worker thread; once this returns the
+        model is no longer in use (e.g. the memo can be saved)."""
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def _collect(self) -> tuple:
+        """(batch, whether close() was called)."""
+        item = self.queue.get()
+        if item is _STOP:
+            return [], True
+        batch, n = [item], len(item.texts)
+        deadline = time.monotonic() + self.max_wait
+        while n < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            n += len(item.texts)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                self._score(batch)
+
+    def _score(self, batch: list) -> None:
+        try:
+            texts = [t for item in batch for t in item.texts]
+            proba = self.model.predict_proba(clean_batch(texts))
+            best = proba.argmax(axis=1)
+            rows = [{"label": self.classes[j], "proba": dict(zip(self.classes, map(float, p)))}
+                    for j, p in zip(best, proba)]
+            self.stats.record_batch()
+            start = 0
+            for item in batch:
+                item.result = rows[start:start + len(item.texts)]
+                start += len(item.texts)
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        for item in batch:
+            item.done.set()
+
+
+class PredictHandler(BaseHTTPRequestHandler):
+    server_version = "SentimentServer/1.0"
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            metrics = self.server.stats.snapshot()
+            if hasattr(self.server.batcher.model, "stats"):
+                metrics["memo"] = self.server.batcher.model.stats()
+            self._send_json(200, metrics)
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            texts = payload["texts"] if "texts" in payload else [payload["text"]]
+            if not isinstance(texts, list):
+                raise ValueError("'texts' must be a list")
+        except (ValueError, KeyError, TypeError) as e:
+            self.server.stats.record_error()
+            self._send_json(400, {"error": f"bad request: {e}"})
+            return
+        try:
+            preds = self.server.batcher.predict(texts) if texts else []
+        except Exception as e:
+            self.server.stats.record_error()
+            self._send_json(500, {"error": str(e)})
+            return
+        self.server.stats.record_request(len(texts), time.perf_counter() - start)
+        self._send_json(200, {"predictions": preds})
+
+    def log_message(self, format, *args):
+        # per-request access logs would dominate latency under load
+        pass
+
+
+def make_server(model_path: str, host: str, port: int, max_batch: int, max_wait_ms: float,
+                memo_size: int = 0, memo_file: str = None) -> ThreadingHTTPServer:
+    model = load_model(model_path)
+    if memo_size:
+        # only the micro-batcher's thread calls the model, so the LRU needs no lock; stop it
+        # (MicroBatcher.close) before saving the LRU from another thread
+        model = memoized(model, model_path, memo_size, memo_file)
+    server = ThreadingHTTPServer((host, port), PredictHandler)
+    server.daemon_threads = True
+    server.stats = ServerStats()
+    server.batcher = MicroBatcher(model, server.stats, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the sentiment pipeline over HTTP with micro-batching")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=64, help="max texts per predict_proba call")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="max time to wait for more requests after the first one in a batch")
+    add_memo_arguments(parser)
+    args = parser.parse_args()
+    check_memo_arguments(args)
+
+    server = make_server(args.model, args.host, args.port, args.max_batch, args.max_wait_ms,
+                         args.memo_size, args.memo_file)
+    print(f"Serving {args.model} on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+        print("Final metrics:", json.dumps(server.stats.snapshot()))
+        if args.memo_file:
+            print(server.batcher.model.stats_line(), "->", server.batcher.model.save())
+
+
+if __name__ == "__main__":
+    main()
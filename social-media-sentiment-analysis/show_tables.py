@@ -2,62 +2,117 @@
 """
 social-media-sentiment-analysis/show_tables.py
 
-Load CSVs (raw + processed), save CSV/HTML snapshots to results/,
-and optionally print to console.
+Load datasets (raw + processed, CSV or Parquet), save CSV/HTML snapshots to results/,
+and optionally print to console. Stage timings/memory go to a JSON run log
+(instrumentation.py); --profile adds a cProfile dump.
+
+Only the first --head rows are read (nrows for CSV, first batches for Parquet), and row
+counts come from Parquet metadata or a raw line count, so the tool stays instant on
+multi-GB files. The CSV and HTML snapshots are written in one pass over those rows, and
+only the newest --keep snapshots per dataset are kept in results/.
 
 Usage (from repo root):
   python social-media-sentiment-analysis/show_tables.py --head 200 --print
 """
 import argparse
+import csv
+import html
 from pathlib import Path
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 import sys
 
+import instrumentation
+from instrumentation import stage
+from dataset_io import resolve_dataset, read_head, count_rows, RAW_DATASET, PROCESSED_DATASET
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 ROOT = Path.cwd()
 SM_DIR = ROOT / "social-media-sentiment-analysis"
-RAW_PATH = SM_DIR / "data" / "raw" / "tweets_scraped.csv"
-PROC_PATH = SM_DIR / "data" / "processed" / "tweets_clean.csv"
+RAW_PATH = Path(resolve_dataset(ROOT / RAW_DATASET))
+PROC_PATH = Path(resolve_dataset(ROOT / PROCESSED_DATASET))
 OUT_DIR = SM_DIR / "results"
+DEFAULT_KEEP = 5
+# shown escaped in HTML cells, like DataFrame.to_html
+_CONTROL = str.maketrans({"\t": "\\t", "\r": "\\r", "\n": "\\n"})
 
-def load_or_message(path: Path, msg: str) -> pd.DataFrame:
+def load_or_message(path: Path, msg: str, head: int) -> tuple:
+    """(first `head` rows or a one-row message frame, row count text)."""
+    import pandas as pd
     if path.exists():
         try:
-            return pd.read_csv(path)
+            rows, exact = count_rows(path)
+            return read_head(path, head), (f"{rows}" if exact else f"~{rows} (line count)")
         except Exception as e:
-            return pd.DataFrame({"error": [f"Failed to read {path.name}: {e}"]})
+            return pd.DataFrame({"error": [f"Failed to read {path.name}: {e}"]}), "?"
     else:
-        return pd.DataFrame({"info": [msg]})
+        return pd.DataFrame({"info": [msg]}), "0"
+
+def prune_snapshots(name_prefix: str, out_dir: Path, keep: int) -> list:
+    """Delete all but the newest `keep` snapshots (csv + html) of `name_prefix`."""
+    stamps = sorted({p.stem.rsplit("_", 1)[1] for p in out_dir.glob(f"{name_prefix}_head*_*.*")
+                     if p.suffix in (".csv", ".html")}, reverse=True)
+    removed = []
+    for p in out_dir.glob(f"{name_prefix}_head*_*.*"):
+        if p.suffix in (".csv", ".html") and p.stem.rsplit("_", 1)[1] in stamps[keep:]:
+            p.unlink()
+            removed.append(p)
+    return removed
+
+def _cell(value) -> str:
+    """A value as DataFrame.to_html shows it: NaN for missing, tabs and line breaks as \\t, \\r,
+    \\n, and &, < and > escaped."""
+    import pandas as pd
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return "NaN"
+    return html.escape(str(value).translate(_CONTROL), quote=False)
 
-def save_snapshots(df: pd.DataFrame, name_prefix: str, head: int, out_dir: Path):
+def write_snapshot(df: "pd.DataFrame", csv_path: Path, html_path: Path) -> None:
+    """Write `df` as CSV and as an HTML table (to_html's layout, no index) in one pass over its rows."""
+    import pandas as pd
+    with open(csv_path, "w", newline="", encoding="utf-8") as c, open(html_path, "w", encoding="utf-8") as h:
+        writer = csv.writer(c, lineterminator="\n")
+        writer.writerow(df.columns)
+        h.write('<table border="1" class="dataframe">\n  <thead>\n    <tr style="text-align: right;">\n')
+        h.writelines(f"      <th>{_cell(col)}</th>\n" for col in df.columns)
+        h.write("    </tr>\n  </thead>\n  <tbody>\n")
+        for row in df.itertuples(index=False, name=None):
+            writer.writerow(["" if v is None or (not isinstance(v, str) and pd.isna(v)) else v for v in row])
+            h.write("    <tr>\n")
+            h.writelines(f"      <td>{_cell(v)}</td>\n" for v in row)
+            h.write("    </tr>\n")
+        h.write("  </tbody>\n</table>")
+
+def save_snapshots(df: "pd.DataFrame", name_prefix: str, head: int, out_dir: Path, keep: int = None):
     out_dir.mkdir(parents=True, exist_ok=True)
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     csv_path = out_dir / f"{name_prefix}_head{head}_{ts}.csv"
     html_path = out_dir / f"{name_prefix}_head{head}_{ts}.html"
-    df.head(head).to_csv(csv_path, index=False)
-    df.head(head).to_html(html_path, index=False)
+    write_snapshot(df.head(head), csv_path, html_path)
+    if keep:
+        prune_snapshots(name_prefix, out_dir, keep)
     return csv_path, html_path
 
-def main():
-    p = argparse.ArgumentParser(description="Load and save tables for social-media-sentiment-analysis CSVs")
-    p.add_argument("--head", type=int, default=200, help="number of rows to include in snapshots / display")
-    p.add_argument("--print", action="store_true", help="print tables to console (text)")
-    args = p.parse_args()
-
+def show_tables(args) -> int:
+    import pandas as pd
     pd.set_option("display.max_columns", 50)
     pd.set_option("display.max_colwidth", 200)
 
-    df_raw = load_or_message(RAW_PATH, "tweets_scraped.csv not found. Run create_sample_data.py")
-    df_proc = load_or_message(PROC_PATH, "tweets_clean.csv not found. Run preprocess.py / train_quick.py")
+    with stage("load"):
+        df_raw, raw_rows = load_or_message(RAW_PATH, f"{RAW_PATH.name} not found. Run create_sample_data.py", args.head)
+        df_proc, proc_rows = load_or_message(PROC_PATH, f"{PROC_PATH.name} not found. Run preprocess.py / train_quick.py", args.head)
 
     # Save snapshots
     OUT_DIR.mkdir(parents=True, exist_ok=True)
-    raw_csv, raw_html = save_snapshots(df_raw, "tweets_scraped", args.head, OUT_DIR)
-    proc_csv, proc_html = save_snapshots(df_proc, "tweets_clean", args.head, OUT_DIR)
+    with stage("save"):
+        raw_csv, raw_html = save_snapshots(df_raw, "tweets_scraped", args.head, OUT_DIR, args.keep)
+        proc_csv, proc_html = save_snapshots(df_proc, "tweets_clean", args.head, OUT_DIR, args.keep)
 
     # Print short summary
-    print(f"Raw file:  {RAW_PATH} -> rows: {len(df_raw)}")
-    print(f"Proc file: {PROC_PATH} -> rows: {len(df_proc)}")
+    print(f"Raw file:  {RAW_PATH} -> rows: {raw_rows}")
+    print(f"Proc file: {PROC_PATH} -> rows: {proc_rows}")
     print()
     print("Saved snapshots:")
     print(f" - {raw_csv}")
@@ -70,18 +125,30 @@ def main():
         # Print tables to console in readable text form
         print("=== Raw scraped tweets (head) ===")
         try:
-            print(df_raw.head(args.head).to_string(index=False))
+            print(df_raw.to_string(index=False))
         except Exception:
-            print(df_raw.head(args.head).to_string())
+            print(df_raw.to_string())
         print()
         print("=== Processed / cleaned tweets (head) ===")
         try:
-            print(df_proc.head(args.head).to_string(index=False))
+            print(df_proc.to_string(index=False))
         except Exception:
-            print(df_proc.head(args.head).to_string())
+            print(df_proc.to_string())
         print()
 
     return 0
 
+def main():
+    p = argparse.ArgumentParser(description="Load and save tables for social-media-sentiment-analysis CSVs")
+    p.add_argument("--head", type=int, default=200, help="number of rows to include in snapshots / display")
+    p.add_argument("--print", action="store_true", help="print tables to console (text)")
+    p.add_argument("--keep", type=int, default=DEFAULT_KEEP,
+                   help=f"snapshots kept per dataset in results/, older ones are deleted; 0 keeps all (default {DEFAULT_KEEP})")
+    instrumentation.add_profile_argument(p)
+    args = p.parse_args()
+
+    with instrumentation.run("show_tables", args):
+        return show_tables(args)
+
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
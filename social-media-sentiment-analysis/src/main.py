@@ -1,16 +1,20 @@
-﻿import pandas as pd
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
-
-try:
-    nltk.data.find('sentiment/vader_lexicon')
-except:
-    nltk.download('vader_lexicon')
+﻿def ensure_vader_lexicon():
+    # checked when the analyzer is needed, not on import
+    import nltk
+    try:
+        nltk.data.find('sentiment/vader_lexicon')
+    except LookupError:
+        nltk.download('vader_lexicon')
 
 def demo():
+    import pandas as pd
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    from vader_batch import VaderBatchScorer
+    ensure_vader_lexicon()
     df = pd.DataFrame({'id':[1,2,3], 'text':["I love it","Not good","It's okay"]})
     sid = SentimentIntensityAnalyzer()
-    df[['neg','neu','pos','compound']] = df['text'].apply(lambda t: pd.Series(sid.polarity_scores(str(t))))
+    scorer = VaderBatchScorer.from_nltk(sid)
+    df[['neg','neu','pos','compound']] = scorer.score(df['text'].astype(str))
     print(df)
 
 if __name__ == '__main__':
@@ -1,10 +1,10 @@
 # src/utils.py
-import re
+import sys
+from pathlib import Path
 
-def clean_text(text: str) -> str:
-    if not text:
-        return ""
-    text = re.sub(r"http\S+", "", text)            # remove urls
-    text = re.sub(r"@\w+", "", text)               # remove mentions
-    text = re.sub(r"[^A-Za-z0-9\s']", " ", text)   # keep basic chars
-    return " ".join(text.split()).lower()
\ No newline at end of file
+# the shared cleaner lives next to the pipeline scripts (social-media-sentiment-analysis/cleaning.py)
+_PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+if _PROJECT_DIR not in sys.path:
+    sys.path.insert(0, _PROJECT_DIR)
+
+from cleaning import clean_text, clean_batch, clean_series  # noqa: E402,F401
\ No newline at end of file
@@ -0,0 +1,253 @@
+# src/vader_batch.py
+"""
+Batch VADER scorer: the same neg/neu/pos/compound as nltk's SentimentIntensityAnalyzer,
+computed for a whole column at once.
+
+- The lexicon, booster, negation and idiom words are loaded once into a small vocabulary
+  with valence/booster/negation lookup arrays.
+- Each text is tokenized the way VADER does (one Python pass), producing a flat array of
+  token ids for the whole batch. The VADER rules (ALL-CAPS emphasis, boosters/dampeners in
+  the 3 preceding words, negation incl. "never so/this", idioms, "least", "but") are then
+  applied as numpy operations on that array, and the per-text sums come from one sparse
+  (texts x tokens) matrix product.
+
+Tolerance vs nltk: neg/neu/pos within 1e-3 and compound within 1e-4. The rules are the
+same; the only source of differences is the final rounding (numpy rounds the binary value,
+Python's round() the decimal one), so a score can land one unit off in the last digit.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+# relative positions nltk's _idioms_check looks at, in its order of precedence
+_IDIOM_BEFORE = ((-1, 0), (-2, -1, 0), (-2, -1), (-3, -2, -1), (-3, -2))
+_IDIOM_AFTER = ((0, 1), (0, 1, 2))
+
+
+class VaderBatchScorer:
+    def __init__(self, lexicon: dict, constants):
+        self.c = constants
+        self._punc_chars = set("".join(constants.PUNC_LIST))
+        self._punc_list = constants.PUNC_LIST
+        self._remove_punc = constants.REGEX_REMOVE_PUNCTUATION.sub
+
+        self.idioms = {tuple(k.split()): v for k, v in constants.SPECIAL_CASE_IDIOMS.items()}
+        self.booster_bigrams = [tuple(k.split()) for k in constants.BOOSTER_DICT if " " in k]
+        special = {"but", "least", "at", "very", "never", "so", "this", "kind", "of"}
+        special.update(w for seq in self.idioms for w in seq)
+        special.update(w for seq in self.booster_bigrams for w in seq)
+
+        words = set(lexicon) | set(constants.BOOSTER_DICT) | set(constants.NEGATE) | special
+        words = sorted(w for w in words if " " not in w)
+        self.vocab = {w: i for i, w in enumerate(words)}
+        # extra ids for out-of-vocabulary words: one for words containing "n't" (negations), one for the rest
+        self.NT = len(words)
+        self.OOV = len(words) + 1
+        n = len(words) + 2
+
+        self.valence = np.zeros(n)
+        self.in_lex = np.zeros(n, dtype=bool)
+        self.boost = np.zeros(n)
+        self.negate = np.zeros(n, dtype=bool)
+        for w, i in self.vocab.items():
+            if w in lexicon:
+                self.valence[i] = lexicon[w]
+                self.in_lex[i] = True
+            self.boost[i] = constants.BOOSTER_DICT.get(w, 0.0)
+            self.negate[i] = w in constants.NEGATE or "n't" in w
+        self.negate[self.NT] = True
+        self.is_booster = self.boost != 0
+
+    @classmethod
+    def from_nltk(cls, analyzer=None):
+        """Build from an nltk SentimentIntensityAnalyzer (same lexicon and constants)."""
+        if analyzer is None:
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            analyzer = SentimentIntensityAnalyzer()
+        return cls(analyzer.lexicon, analyzer.constants)
+
+    def _words(self, text: str) -> list:
+        # SentiText._words_and_emoticons: split, drop 1-char tokens, strip leading/trailing
+        # punctuation when what remains is a word of the punctuation-free text
+        wes = [we for we in text.split() if len(we) > 1]
+        words_only = None
+        for k, we in enumerate(wes):
+            if we[0] in self._punc_chars or we[-1] in self._punc_chars:
+                if words_only is None:
+                    words_only = {w for w in self._remove_punc("", text).split() if len(w) > 1}
+                for p in self._punc_list:
+                    if we.endswith(p) and we[:-len(p)] in words_only:
+                        wes[k] = we[:-len(p)]
+                        break
+                else:
+                    for p in self._punc_list:
+                        if we.startswith(p) and we[len(p):] in words_only:
+                            wes[k] = we[len(p):]
+                            break
+        return wes
+
+    def _tokenize(self, texts: list):
+        vocab, nt, oov = self.vocab, self.NT, self.OOV
+        ids, upper, lower, first, offsets = [], [], [], [], [0]
+        cap_diff, punct = [], []
+        for text in texts:
+            if not isinstance(text, str):
+                text = ""
+            words = self._words(text)
+            n_upper = 0
+            seen = {}
+            base = len(ids)
+            for k, w in enumerate(words):
+                lw = w.lower()
+                ids.append(vocab.get(lw, nt if "n't" in lw else oov))
+                up = w.isupper()
+                upper.append(up)
+                lower.append(w == lw)
+                n_upper += up
+                # nltk scores every occurrence of a token with the context of its first occurrence
+                first.append(base + seen.setdefault(w, k))
+            offsets.append(len(ids))
+            cap_diff.append(0 < len(words) - n_upper < len(words))
+            ep = min(text.count("!"), 4) * 0.292
+            qm = text.count("?")
+            punct.append(ep + (0.0 if qm <= 1 else qm * 0.18 if qm <= 3 else 0.96))
+        return {
+            "ids": np.array(ids, dtype=np.int32),
+            "upper": np.array(upper, dtype=bool),
+            "lower": np.array(lower, dtype=bool),
+            "first": np.array(first, dtype=np.int64),
+            "offsets": np.array(offsets, dtype=np.int64),
+            "cap_diff": np.array(cap_diff, dtype=bool),
+            "punct": np.array(punct),
+        }
+
+    def _token_valence(self, tok: dict):
+        """Valence of every token as nltk's sentiment_valence computes it at that position."""
+        c = self.c
+        ids, offsets = tok["ids"], tok["offsets"]
+        n = len(ids)
+        pos = np.arange(n)
+        doc = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        local = pos - offsets[doc]
+        length = offsets[doc + 1] - offsets[doc]
+        caps = tok["upper"] & tok["cap_diff"][doc]
+
+        def at(k, arr):
+            return arr[np.clip(pos + k, 0, max(n - 1, 0))]
+
+        def inside(k):
+            return (local + k >= 0) & (local + k < length)
+
+        def word(k, w):
+            # exact (case-sensitive) word match at relative position k, like nltk's string compares
+            return inside(k) & (at(k, ids) == self.vocab[w]) & at(k, tok["lower"])
+
+        def seq(ks, words):
+            return np.logical_and.reduce([word(k, w) for k, w in zip(ks, words)])
+
+        v = self.valence[ids].copy()
+        v += np.where(caps, np.where(v > 0, c.C_INCR, -c.C_INCR), 0.0)
+
+        so_this = lambda k: word(k, "so") | word(k, "this")  # noqa: E731
+        for k, scale in ((1, 1.0), (2, 0.95), (3, 0.9)):
+            pk = at(-k, ids)
+            valid = (local >= k) & ~self.in_lex[pk]
+            b = self.boost[pk]
+            s = np.where(v < 0, -b, b)
+            s += np.where((b != 0) & at(-k, caps), np.where(v > 0, c.C_INCR, -c.C_INCR), 0.0)
+            v = np.where(valid, v + s * scale, v)
+            neg = self.negate[pk]
+            if k == 1:
+                factor = np.where(neg, c.N_SCALAR, 1.0)
+            elif k == 2:
+                factor = np.where(word(-2, "never") & so_this(-1), 1.5, np.where(neg, c.N_SCALAR, 1.0))
+            else:
+                boosted = (word(-3, "never") & so_this(-2)) | so_this(-1)
+                factor = np.where(boosted, 1.25, np.where(neg, c.N_SCALAR, 1.0))
+            v = np.where(valid, v * factor, v)
+            if k == 3:
+                v = np.where(valid, self._idioms(v, seq), v)
+
+        p1, p2 = at(-1, ids), at(-2, ids)
+        least = (p1 == self.vocab["least"]) & ~self.in_lex[p1]
+        not_at_very = (p2 != self.vocab["at"]) & (p2 != self.vocab["very"])
+        v = np.where(least & (local > 1) & not_at_very, v * c.N_SCALAR, v)
+        v = np.where(least & (local == 1), v * c.N_SCALAR, v)
+
+        v[~self.in_lex[ids]] = 0.0
+        # boosters and "kind" in "kind of" are never scored themselves
+        kind_of = (ids == self.vocab["kind"]) & inside(1) & (at(1, ids) == self.vocab["of"])
+        v[self.is_booster[ids] | kind_of] = 0.0
+        return v, doc, local
+
+    def _idioms(self, v, seq):
+        idiom = np.full(len(v), np.nan)
+        # the first matching sequence before the word wins, sequences after it override
+        for ks in reversed(_IDIOM_BEFORE):
+            for words, value in self.idioms.items():
+                if len(words) == len(ks):
+                    idiom = np.where(seq(ks, words), value, idiom)
+        for ks in _IDIOM_AFTER:
+            for words, value in self.idioms.items():
+                if len(words) == len(ks):
+                    idiom = np.where(seq(ks, words), value, idiom)
+        v = np.where(np.isnan(idiom), v, idiom)
+        damp = np.zeros(len(v), dtype=bool)
+        for words in self.booster_bigrams:
+            damp |= seq((-3, -2), words) | seq((-2, -1), words)
+        return np.where(damp, v + self.c.B_DECR, v)
+
+    def score(self, texts) -> pd.DataFrame:
+        """Return a DataFrame with neg, neu, pos, compound for each text (index kept for Series)."""
+        index = texts.index if isinstance(texts, pd.Series) else None
+        texts = list(texts)
+        tok = self._tokenize(texts)
+        ids, offsets, punct = tok["ids"], tok["offsets"], tok["punct"]
+        n_docs = len(texts)
+        v, doc, local = self._token_valence(tok)
+        v = v[tok["first"]]
+
+        # "but": halve everything before the first "but", 1.5x everything after it
+        is_but = ids == self.vocab["but"]
+        first_but = np.full(n_docs, np.iinfo(np.int64).max)
+        np.minimum.at(first_but, doc[is_but], local[is_but])
+        bi = first_but[doc]
+        has_but = bi != np.iinfo(np.int64).max
+        v = np.where(has_but & (local < bi), v * 0.5, np.where(has_but & (local > bi), v * 1.5, v))
+
+        per_token = np.column_stack([v, np.where(v > 0, v + 1, 0.0), np.where(v < 0, v - 1, 0.0), v == 0])
+        docs = csr_matrix((np.ones(len(v)), np.arange(len(v)), offsets), shape=(n_docs, len(v)))
+        sum_s, pos_sum, neg_sum, neu = (docs @ per_token).T
+
+        has = np.diff(offsets) > 0
+        sum_s = sum_s + np.where(sum_s > 0, punct, np.where(sum_s < 0, -punct, 0.0))
+        compound = sum_s / np.sqrt(sum_s * sum_s + 15)
+        more_pos, more_neg = pos_sum > -neg_sum, pos_sum < -neg_sum
+        pos_sum = pos_sum + np.where(more_pos, punct, 0.0)
+        neg_sum = neg_sum - np.where(more_neg, punct, 0.0)
+        total = np.where(has, pos_sum - neg_sum + neu, 1.0)
+        return pd.DataFrame({
+            "neg": np.where(has, np.abs(neg_sum / total), 0.0).round(3),
+            "neu": np.where(has, np.abs(neu / total), 0.0).round(3),
+            "pos": np.where(has, np.abs(pos_sum / total), 0.0).round(3),
+            "compound": np.where(has, compound, 0.0).round(4),
+        }, index=index)
+
+
+if __name__ == "__main__":
+    # quick agreement check against nltk: python social-media-sentiment-analysis/src/vader_batch.py
+    import time
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+    sid = SentimentIntensityAnalyzer()
+    samples = ["I love it", "Not good", "It's okay", "VADER is VERY SMART, handsome, and FUNNY!!!",
+               "The book was kind of good.", "At least it isn't a horrible book.", "Today SUX!",
+               "the plot was good, but the characters are uncompelling", "Make sure you :) or :D today!",
+               "It was never so good", "yeah right, the bomb", ""] * 2000
+    t0 = time.perf_counter()
+    expected = pd.DataFrame([sid.polarity_scores(t) for t in samples])[["neg", "neu", "pos", "compound"]]
+    t1 = time.perf_counter()
+    got = VaderBatchScorer.from_nltk(sid).score(samples)
+    t2 = time.perf_counter()
+    print("max abs diff:", (expected - got).abs().max().to_dict())
+    print(f"nltk per-row: {t1 - t0:.3f}s  batch: {t2 - t1:.3f}s  ({len(samples)} texts)")
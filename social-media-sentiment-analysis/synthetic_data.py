@@ -0,0 +1,164 @@
+"""
+synthetic_data.py
+- Seeded generator of labeled tweet-like rows, for benchmarks at 10^4 .. 10^7 rows
+  (create_sample_data.py only repeats 30 sentences).
+- Same columns as data_collection.py plus label: date, id, user, text, likeCount, label.
+- Text mixes a Zipf-distributed vocabulary (common words, product nouns and a long tail of
+  pseudo-words), label-dependent sentiment words with some noise, urls, @mentions, #hashtags,
+  emoji and punctuation, so cleaning and TF-IDF see realistic work.
+- Rows are produced in fixed blocks of BLOCK rows, each from its own seeded RNG: the same
+  seed always gives the same rows, whatever --chunksize is.
+
+Usage (from repo root):
+  python social-media-sentiment-analysis/synthetic_data.py --rows 1000000 --out social-media-sentiment-analysis/data/raw/tweets_synthetic.parquet
+"""
+import argparse
+import os
+import string
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import ChunkWriter, Throughput
+
+BLOCK = 10_000
+LABELS = np.array(["positive", "neutral", "negative"])
+LABEL_P = [0.4, 0.3, 0.3]
+
+SENTIMENT = {
+    "positive": ("love great excellent amazing awesome perfect happy fantastic recommend best "
+                 "superb wonderful nice good glad brilliant impressed satisfied fast reliable").split(),
+    "neutral": ("okay average fine ordinary decent normal standard expected usual fair "
+                "neutral typical moderate acceptable plain regular so-so adequate meh whatever").split(),
+    "negative": ("hate terrible awful worst broken bad poor disappointed refund slow "
+                 "useless horrible annoying waste never angry cheap faulty rude scam").split(),
+}
+COMMON = ("the a i it is this to and of for my was in on with but not just so that have "
+          "you at be are they we had get got would will all one from out up about what "
+          "when time really very too today now again still after").split()
+NOUNS = ("product service price quality support shipping delivery phone app update battery "
+         "screen order package store customer staff experience camera feature design size "
+         "color brand model version account refund box review week").split()
+EMOJI = ["!!!", "!", "?", "...", ":)", ":(", "❤️", "😂", "🔥", "👍", "😡", "it's", "don't"]
+
+
+def _pseudo_words(n: int, seed: int = 0) -> list:
+    rnd = np.random.default_rng(seed)
+    syllables = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+    words = set()
+    while len(words) < n:
+        picks = rnd.integers(0, len(syllables), size=(n, 4))
+        lengths = rnd.integers(2, 5, size=n)
+        words.update("".join(syllables[j] for j in row[:k]) for row, k in zip(picks.tolist(), lengths))
+    return sorted(words)[:n]
+
+
+def _zipf_p(n: int, s: float = 1.1) -> np.ndarray:
+    p = 1.0 / np.arange(1, n + 1) ** s
+    return p / p.sum()
+
+
+VOCAB = np.array(COMMON + NOUNS + _pseudo_words(30_000), dtype=object)
+VOCAB_P = _zipf_p(len(VOCAB))
+_B62 = np.array(list(string.ascii_letters + string.digits))
+START = pd.Timestamp("2025-01-01", tz="UTC")
+
+
+def _block(seed: int, index: int, rows: int, n_users: int) -> pd.DataFrame:
+    rng = np.random.default_rng([seed, index])
+    label_idx = rng.choice(len(LABELS), size=rows, p=LABEL_P)
+    lengths = np.clip(rng.poisson(14, rows), 3, 50)
+    filler = rng.choice(VOCAB, size=int(lengths.sum()), p=VOCAB_P)
+    ends = np.cumsum(lengths)
+    n_sent = 1 + rng.poisson(1.5, rows)
+    # 15% of the sentiment words come from another label, so the classes are not trivially separable
+    noisy = rng.random(int(n_sent.sum())) < 0.15
+    sent_label = np.repeat(label_idx, n_sent)
+    sent_label[noisy] = rng.integers(0, len(LABELS), int(noisy.sum()))
+    sent_pick = rng.integers(0, 20, int(n_sent.sum()))
+    sent_ends = np.cumsum(n_sent)
+
+    url = rng.random(rows) < 0.35
+    mention = rng.random(rows) < 0.45
+    hashtag = rng.random(rows) < 0.3
+    extra = rng.random(rows) < 0.35
+    users = rng.zipf(1.3, rows) % n_users
+    mention_users = rng.integers(0, n_users, rows)
+    url_chars = rng.choice(_B62, size=(rows, 10))
+    emoji = rng.choice(EMOJI, rows)
+    hashtag_words = rng.choice(VOCAB[:len(COMMON) + len(NOUNS) + 500], rows)
+    upper = rng.random(rows) < 0.5
+
+    texts = []
+    start = sent_start = 0
+    for i in range(rows):
+        words = list(filler[start:ends[i]])
+        for j in range(sent_start, sent_ends[i]):
+            word = SENTIMENT[LABELS[sent_label[j]]][sent_pick[j]]
+            words.insert(int((j * 7919 + i) % (len(words) + 1)), word)
+        if upper[i]:
+            words[0] = words[0].capitalize()
+        if mention[i]:
+            words.insert(0, f"@user_{mention_users[i]}")
+        if url[i]:
+            words.append("https://t.co/" + "".join(url_chars[i]))
+        if hashtag[i]:
+            words.append("#" + str(hashtag_words[i]).title())
+        if extra[i]:
+            words.append(emoji[i])
+        texts.append(" ".join(words))
+        start, sent_start = ends[i], sent_ends[i]
+
+    first_id = 1_600_000_000_000_000_000 + index * BLOCK * 1000
+    ids = first_id + np.cumsum(rng.integers(1, 1000, rows))
+    seconds = np.sort(rng.integers(0, 90 * 86400, rows))
+    return pd.DataFrame({
+        "date": (START + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        "id": ids,
+        "user": np.char.add("user_", users.astype(str)),
+        "text": texts,
+        "likeCount": np.minimum(rng.lognormal(1.0, 1.5, rows).astype(np.int64), 1_000_000),
+        "label": LABELS[label_idx],
+    })
+
+
+def generate(rows: int, seed: int = 42, chunksize: int = 100_000):
+    """Yield DataFrames of up to `chunksize` rows, `rows` in total."""
+    n_users = max(1000, rows // 50)
+    buf, buffered = [], 0
+    for index, offset in enumerate(range(0, rows, BLOCK)):
+        buf.append(_block(seed, index, min(BLOCK, rows - offset), n_users))
+        buffered += len(buf[-1])
+        if buffered >= chunksize:
+            df = pd.concat(buf, ignore_index=True)
+            while len(df) >= chunksize:
+                yield df.iloc[:chunksize]
+                df = df.iloc[chunksize:]
+            buf, buffered = [df], len(df)
+    if buffered:
+        yield pd.concat(buf, ignore_index=True)
+
+
+def synthetic_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    return pd.concat(generate(rows, seed, chunksize=max(rows, 1)), ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic labeled tweet dataset")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="output .csv/.csv.gz/.csv.zst/.parquet")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    stats = Throughput()
+    with ChunkWriter(args.out) as writer:
+        for chunk in generate(args.rows, args.seed, args.chunksize):
+            writer.write(chunk)
+            stats.add(len(chunk))
+    print(f"Wrote {stats} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import random
+import re
+
+from cleaning import clean_batch, clean_packed, clean_text, pack_texts, unpack_cleaned
+
+
+def legacy_clean_text(s):
+    """The original multi-pass cleaner of preprocess.py."""
+    if not isinstance(s, str):
+        return ""
+    s = s.lower()
+    s = re.sub(r"http\S+", "", s)
+    s = re.sub(r"@\w+", "", s)
+    s = re.sub(r"#", "", s)
+    s = re.sub(r"[^a-z0-9\s']", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+EDGE_CASES = [
+    "", "   ", "Hello World!", "RT @user: check https://t.co/abc #Deal",
+    "@userhttp://x.co/y", "@a@b@c http", "mail me@home.com", "#hash#tags##",
+    "don't STOP  believin'\n\tnow", "café naïve ÜBER", "emoji 😀 here", "a_b @c_d e_f",
+    "http", "xhttp://a b", "@", "@_", "1,000 likes!!!", None, 3.5,
+]
+
+
+def _random_texts(n=3000, seed=0):
+    rng = random.Random(seed)
+    pieces = ["http://t.co/", "https", "http", "@", "#", "_", "'", " ", "\t", "\n", "!", ".",
+              "a", "Z", "9", "é", "😀", "ab", "user", "x/y"]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 20))) for _ in range(n)]
+
+
+def test_matches_the_legacy_cleaner():
+    texts = EDGE_CASES + _random_texts()
+    expected = [legacy_clean_text(s) for s in texts]
+    assert [clean_text(s) for s in texts] == expected
+    assert clean_batch(texts) == expected
+
+
+def test_packed_batches_round_trip():
+    texts = EDGE_CASES + _random_texts(200, seed=1)
+    packed = pack_texts(texts)
+    assert unpack_cleaned(clean_packed(packed), len(texts)) == clean_batch(texts)
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from data_collection import Collector, FakeSource
+
+
+class FailingFlush(Collector):
+    def _flush(self, batch):
+        if batch:
+            raise RuntimeError("disk full")
+        super()._flush(batch)
+
+
+def test_consumer_error_does_not_hang_on_blocked_producers(tmp_path):
+    # batch_size 5 -> queue of 20 items: producers of 10,000 items are blocked on put when the
+    # first flush raises
+    collector = FailingFlush(FakeSource(size=10_000), str(tmp_path / "raw.csv"), limit=10_000,
+                             batch_size=5, workers=3)
+    errors = []
+
+    def run():
+        try:
+            collector.run(["a", "b", "c"])
+        except RuntimeError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(timeout=30)
+    assert not t.is_alive(), "Collector.run hung after the consumer raised"
+    assert [str(e) for e in errors] == ["disk full"]
+
+
+def test_resume_after_source_failure(tmp_path):
+    out = str(tmp_path / "raw.csv")
+    first = Collector(FakeSource(size=50, fail_after=20), out, limit=50, batch_size=8, workers=2)
+    first.run(["q"])
+    assert not first.complete(["q"])
+    second = Collector(FakeSource(size=50), out, limit=50, batch_size=8, workers=2)
+    second.run(["q"])
+    assert second.complete(["q"])
+    assert len(second.seen) == 50
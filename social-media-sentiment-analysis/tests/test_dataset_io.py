@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+from dataset_io import dataset_columns, default_path, read_dataset, resolve_dataset, write_dataset
+from preprocess import preprocess_streaming
+
+
+def test_parquet_chunks_with_text_after_an_empty_first_chunk(tmp_path):
+    src, out = tmp_path / "raw.csv", tmp_path / "clean.parquet"
+    pd.DataFrame({
+        "date": ["2025-01-01"] * 6,
+        "user": ["", "", "alice", "123", "", "bob"],  # all empty in the first chunk -> float64
+        "text": ["hi there", "a b", "c d", "e f", "g h", "x y"],
+    }).to_csv(src, index=False)
+
+    preprocess_streaming(str(src), str(out), chunksize=2)
+    df = read_dataset(str(out))
+    assert len(df) == 6
+    assert df["user"].tolist()[2:4] == ["alice", "123"]
+    assert df["user"].isna().sum() == 3
+
+
+def test_parquet_and_csv_round_trip_the_same_frame(tmp_path):
+    df = pd.DataFrame({"text_clean": ["good", "bad", "fine"], "label": ["positive", "negative", "neutral"],
+                       "likeCount": [3, 0, 1]})
+    write_dataset(df, str(tmp_path / "d.csv"))
+    write_dataset(df, str(tmp_path / "d.parquet"))
+    from_csv, from_parquet = read_dataset(str(tmp_path / "d.csv")), read_dataset(str(tmp_path / "d.parquet"))
+    assert from_parquet["label"].dtype.name == "category"  # dictionary-encoded
+    pd.testing.assert_frame_equal(from_parquet.assign(label=from_parquet["label"].astype(str)), from_csv,
+                                  check_dtype=False)
+    assert read_dataset(str(tmp_path / "d.parquet"), columns=["likeCount"]).columns.tolist() == ["likeCount"]
+    assert dataset_columns(str(tmp_path / "d.parquet")) == df.columns.tolist()
+
+
+def test_a_stem_resolves_to_its_newest_copy(tmp_path):
+    stem = str(tmp_path / "tweets")
+    assert resolve_dataset(stem) == default_path(stem)  # nothing yet
+    df = pd.DataFrame({"text": ["a"]})
+    write_dataset(df, stem + ".csv")
+    write_dataset(df, stem + ".parquet")
+    os.utime(stem + ".csv", (1_000, 1_000))
+    assert resolve_dataset(stem) == stem + ".parquet"
+    os.utime(stem + ".parquet", (500, 500))
+    assert resolve_dataset(stem) == stem + ".csv"
+    assert resolve_dataset(stem + ".parquet") == stem + ".parquet"  # an existing path is returned as given
+    os.remove(stem + ".parquet")
+    assert resolve_dataset(stem + ".parquet") == stem + ".csv"
@@ -0,0 +1,43 @@
+import types
+
+import pandas as pd
+
+from dataset_io import read_dataset
+from dedup import Deduplicator, dedup
+
+BASE = [
+    "the new phone battery lasts two full days and charges fast",
+    "worst customer service i have ever had never buying again",
+    "the weather in the city was lovely for the whole weekend",
+    "great match tonight the home team scored three goals late",
+]
+
+
+def test_exact_and_near_duplicates_keep_the_first_copy():
+    texts = [
+        BASE[0],
+        BASE[1],
+        BASE[0],                                  # exact copy
+        BASE[1] + " lol",                         # near copy (retweet with a comment)
+        BASE[2],
+        BASE[3],
+        BASE[2].replace("lovely", "lovly"),       # near copy (typo)
+    ]
+    keep = Deduplicator().keep_mask(texts)
+    assert keep.tolist() == [True, True, False, False, True, True, False]
+
+
+def test_exact_only_keeps_near_duplicates():
+    d = Deduplicator(near=False)
+    assert d.keep_mask([BASE[0], BASE[0] + " lol", BASE[0]]).tolist() == [True, True, False]
+    assert d.counts == {"rows": 3, "exact": 1, "near": 0}
+
+
+def test_duplicates_across_chunks(tmp_path):
+    texts = [BASE[i % 4] for i in range(12)] + ["something else entirely here"]  # copies span chunks of 3
+    src, out = tmp_path / "clean.csv", tmp_path / "dedup.csv"
+    pd.DataFrame({"id": range(len(texts)), "text_clean": texts}).to_csv(src, index=False)
+    dedup(types.SimpleNamespace(input=str(src), output=str(out), chunksize=3, exact_only=False,
+                                num_perm=64, bands=8, shingle=5))
+    kept = read_dataset(str(out))
+    assert kept["id"].tolist() == [0, 1, 2, 3, 12]
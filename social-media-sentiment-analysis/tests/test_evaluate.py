@@ -0,0 +1,54 @@
+import types
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.pipeline import Pipeline
+
+from evaluate import ConfusionCounts, evaluate_in_memory, evaluate_streaming, report_from_confusion
+
+
+def _sklearn_report(y_true, y_pred):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # undefined precision/recall: both report 0
+        return classification_report(y_true, y_pred)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_chunked_counts_give_sklearns_report_and_matrix(seed):
+    rng = np.random.default_rng(seed)
+    y_true = rng.choice(["negative", "neutral", "positive"], 1_000, p=[0.5, 0.3, 0.2])
+    # a label only ever predicted, and a class that is never predicted right
+    y_pred = np.where(rng.random(1_000) < 0.7, y_true, rng.choice(["negative", "spam"], 1_000))
+    counts = ConfusionCounts()
+    for start in range(0, len(y_true), 128):
+        counts.update(y_true[start:start + 128], y_pred[start:start + 128])
+    counts.update([], [])
+
+    assert report_from_confusion(counts.matrix(counts.labels), counts.labels) == _sklearn_report(y_true, y_pred)
+    labels = sorted(set(y_true))
+    assert counts.true_labels == labels
+    np.testing.assert_array_equal(counts.matrix(labels), confusion_matrix(y_true, y_pred, labels=labels))
+
+
+def test_streaming_evaluation_matches_in_memory(tmp_path):
+    texts = ["good great love", "bad awful hate", "fine okay average", "good but awful", "okay love"] * 40
+    labels = ["positive", "negative", "neutral", "negative", "positive"] * 40
+    model = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression())]).fit(texts[:50], labels[:50])
+    joblib.dump(model, tmp_path / "model.joblib")
+    pd.DataFrame({"text_clean": texts, "label": labels}).to_csv(tmp_path / "holdout.csv", index=False)
+
+    args = types.SimpleNamespace(model=str(tmp_path / "model.joblib"), input=str(tmp_path / "holdout.csv"),
+                                 chunksize=33, workers=1, memo_size=0, memo_file=None)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = evaluate_in_memory(args)
+    report, cm_labels, cm = evaluate_streaming(args)
+    assert report == expected[0]
+    assert cm_labels == expected[1]
+    np.testing.assert_array_equal(cm, expected[2])
@@ -0,0 +1,32 @@
+import json
+import os
+
+from feature_cache import FeatureCache, make_key
+
+
+def _index(root):
+    with open(os.path.join(root, "digests.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_evicted_entries_take_their_digests_along(tmp_path):
+    root = str(tmp_path / "cache")
+    texts = ["some cleaned text"] * 40_000  # ~0.7 MB per entry
+    inputs = []
+    for name in ("a.csv", "b.csv"):
+        path = tmp_path / name
+        path.write_text(f"text\n{name}\n")
+        inputs.append(str(path))
+
+    first = FeatureCache(root, max_mb=1.0, enabled=True)
+    digest_a = first.digest(inputs[0])
+    first.put_texts(make_key(digest_a, "clean"), texts)
+
+    second = FeatureCache(root, max_mb=1.0, enabled=True)  # another run, another input
+    digest_b = second.digest(inputs[1])
+    assert sorted(_index(root).values()) == sorted([digest_a, digest_b])
+    second.put_texts(make_key(digest_b, "clean"), texts)  # over the limit: a's entry goes
+
+    assert second.get_texts(make_key(digest_a, "clean")) is None
+    assert second.get_texts(make_key(digest_b, "clean")) == texts
+    assert list(_index(root).values()) == [digest_b]
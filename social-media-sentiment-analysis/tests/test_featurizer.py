@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from cleaning import clean_batch
+from featurizer import FusedTfidfVectorizer
+
+RAW = ["RT " + s for s in [  # "rt" is in every doc
+    "Loving the new phone!! http://t.co/x #happy @shop",
+    "worst service ever, never again @support",
+    "the phone is ok I guess",
+    "LOVE love love it",
+    "Service was fine, phone arrived late",
+    "never buying again... worst",
+    "ok ok it's fine #meh",
+    "I love the phone and the service",
+    "late delivery, service ok",
+    "the worst phone I've had",
+]]
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"ngram_range": (1, 2), "min_df": 2},
+    {"max_df": 0.95},  # 10 docs: keeps df <= 9.5, so "rt" is dropped
+    {"min_df": 0.15, "max_df": 0.35, "sublinear_tf": True},
+    {"norm": "l1", "smooth_idf": False},
+])
+def test_matches_tfidf_vectorizer_on_cleaned_text(params):
+    ref = TfidfVectorizer(**params)
+    expected = ref.fit_transform(clean_batch(RAW))
+    fused = FusedTfidfVectorizer(**params, batch_size=3)
+    got = fused.fit_transform(RAW)
+
+    assert fused.vocabulary_ == ref.vocabulary_
+    np.testing.assert_allclose(fused.idf_, ref.idf_)
+    np.testing.assert_allclose(got.toarray(), expected.toarray(), rtol=1e-6, atol=1e-7)
+
+    new = ["the phone is the worst", "nothing known here", "love LOVE the service @x"]
+    np.testing.assert_allclose(fused.transform(new).toarray(), ref.transform(clean_batch(new)).toarray(),
+                               rtol=1e-6, atol=1e-7)
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+
+from dataset_io import read_dataset
+from incremental import PartitionedDataset, PENDING
+from preprocess import preprocess_incremental
+
+BASE_ID = 1_600_000_000_000_000_000  # tweet-sized: consecutive ids round together as float64
+
+
+def _raw_csv(path, n=300, gap_at=123):
+    ids = [str(BASE_ID + i) for i in range(n)]
+    ids[gap_at] = ""
+    df = pd.DataFrame({
+        "date": [f"2025-01-0{1 + i % 3}T10:00:00+00:00" for i in range(n)],
+        "id": ids,
+        "user": [f"user_{i % 7}" for i in range(n)],
+        "text": [f"post number {i}" for i in range(n)],
+        "likeCount": [i % 5 for i in range(n)],
+    })
+    df.to_csv(path, index=False)
+    return [i for i in ids if i]
+
+
+def test_ids_with_a_gap_keep_full_precision(tmp_path, capsys):
+    src, out = str(tmp_path / "raw.csv"), str(tmp_path / "processed")
+    ids = _raw_csv(src)
+
+    preprocess_incremental(src, out, chunksize=50)
+    stored = read_dataset(out, columns=["id"])["id"].astype(str)
+    assert sorted(stored) == sorted(ids)
+
+    # another chunking of the same file: nothing new, nothing changed
+    capsys.readouterr()
+    stats = preprocess_incremental(src, out, chunksize=70)
+    assert stats.rows == 0
+    assert "0 new, 0 changed" in capsys.readouterr().out
+    assert len(read_dataset(out)) == len(ids)
+
+
+def test_uncommitted_parts_are_hidden_and_removed(tmp_path):
+    src, out = str(tmp_path / "raw.csv"), str(tmp_path / "processed")
+    _raw_csv(src)
+    preprocess_incremental(src, out, chunksize=100)
+    committed = len(read_dataset(out))
+
+    dataset = PartitionedDataset(out, ".csv")
+    dataset.begin()
+    chunk = pd.DataFrame({"date": ["2025-01-05T00:00:00+00:00"], "id": ["1"], "text": ["x"]})
+    todo, _ = dataset.select(chunk)
+    todo["text_clean"] = "x"
+    dataset.append(todo)
+    dataset.close()  # interrupted before commit
+    day_dir = os.path.join(out, "day=2025-01-05")
+    open(os.path.join(day_dir, ".part-000099-00001.csv"), "w").close()  # leftover temp file
+
+    assert len(read_dataset(out)) == committed
+    assert any(f.startswith(PENDING) for f in os.listdir(day_dir))
+
+    dataset = PartitionedDataset(out, ".csv")
+    dataset.recover()
+    dataset.close()
+    assert os.listdir(day_dir) == []
+    assert len(read_dataset(out)) == committed
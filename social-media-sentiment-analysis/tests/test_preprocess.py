@@ -0,0 +1,40 @@
+import types
+
+import pandas as pd
+import pytest
+
+from dataset_io import read_dataset
+from preprocess import preprocess, preprocess_streaming
+
+
+def _raw_csv(path, n=2_500):
+    pd.DataFrame({
+        "date": [f"2025-01-{1 + i % 28:02d}T10:00:00+00:00" for i in range(n)],
+        "user": [f"user_{i % 13}" for i in range(n)],
+        "text": [f"RT @user_{i % 13}: Post #{i} is GREAT!! http://t.co/{i} don't" if i % 3 else f"meh... {i}"
+                 for i in range(n)],
+        "label": [["positive", "negative", "neutral"][i % 3] for i in range(n)],
+    }).to_csv(path, index=False)
+
+
+def _in_memory(src, out):
+    preprocess(types.SimpleNamespace(input=str(src), output=str(out), chunksize=None, workers=1,
+                                     incremental=False))
+    return read_dataset(str(out))
+
+
+@pytest.mark.parametrize("ext", [".csv", ".parquet"])
+def test_streaming_matches_in_memory(tmp_path, ext):
+    src = tmp_path / "raw.csv"
+    _raw_csv(src)
+    expected = _in_memory(src, tmp_path / f"full{ext}")
+    preprocess_streaming(str(src), str(tmp_path / f"chunked{ext}"), chunksize=300)
+    pd.testing.assert_frame_equal(read_dataset(str(tmp_path / f"chunked{ext}")), expected)
+
+
+def test_workers_keep_input_order_and_match_in_memory(tmp_path):
+    src = tmp_path / "raw.csv"
+    _raw_csv(src)
+    expected = _in_memory(src, tmp_path / "full.csv")
+    preprocess_streaming(str(src), str(tmp_path / "parallel.csv"), chunksize=200, workers=2)
+    pd.testing.assert_frame_equal(read_dataset(str(tmp_path / "parallel.csv")), expected)
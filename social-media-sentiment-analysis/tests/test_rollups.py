@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from rollups import DROPPED, RollupStore, WindowAggregator
+
+
+def _scored(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 10 * 86400, n), unit="s")
+    return pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        "user": [f"u{u}" for u in rng.zipf(1.3, n) % 30],
+        "pred_label": rng.choice(["pos", "neg"], n),
+    })
+
+
+def _violations(rollup, df):
+    true = df.groupby([pd.to_datetime(df["date"]).dt.tz_localize(None).dt.floor("D"), "user"]).size()
+    true.index.names = ["window", "key"]
+    sel = rollup.xs(("day", "user"), level=["grain", "dim"])
+    keys = sel.index.get_level_values("key")
+    marks = sel[keys == DROPPED]["error"].droplevel(["key", "label"])
+    data = sel[keys != DROPPED]
+    rows = data["rows"].groupby(level=["window", "key"]).sum().reindex(true.index).fillna(0)
+    error = data["error"].groupby(level=["window", "key"]).max().reindex(true.index)
+    error = error.fillna(pd.Series(marks.reindex(true.index.get_level_values("window")).fillna(0).to_numpy(),
+                                   index=true.index))
+    return int(((true < rows) | (true > rows + error)).sum())
+
+
+def test_trimmed_counts_stay_within_their_error(tmp_path):
+    df = _scored()
+    store = RollupStore(str(tmp_path / "store"), top=3)
+    for half in (df.iloc[:10_000], df.iloc[10_000:]):
+        agg = WindowAggregator(["day"], [], 3, "1h", "pred_label")
+        for start in range(0, len(half), 1000):
+            store.write(agg.update(half.iloc[start:start + 1000]))
+        store.write(agg.flush())
+        store.commit({})
+    assert _violations(store.load(), df) == 0
+
+    store = RollupStore(str(tmp_path / "store"))  # compact/query reuse the recorded --top
+    assert store.top == 3
+    store.compact()
+    assert _violations(RollupStore(str(tmp_path / "store")).load(), df) == 0
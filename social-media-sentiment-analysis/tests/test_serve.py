@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from cleaning import clean_batch
+from dedup import text_hashes
+from prediction_cache import MemoizedModel
+from serve import MicroBatcher, ServerStats
+
+
+def _model():
+    texts = ["good great love", "bad awful hate", "fine okay average"] * 10
+    labels = ["positive", "negative", "neutral"] * 10
+    return Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression())]).fit(texts, labels)
+
+
+def test_close_stops_the_batcher_before_the_memo_is_saved(tmp_path):
+    model = _model()
+    memo = MemoizedModel(model, "test-model", max_entries=50)
+    batcher = MicroBatcher(memo, ServerStats(), max_batch=8, max_wait_ms=1)
+
+    def client(i):
+        for j in range(40):
+            batcher.predict([f"good post {i} {j}", f"bad post {j}"])
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(4)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join(30)
+    batcher.close()
+    assert not batcher.thread.is_alive()
+
+    path = memo.save(str(tmp_path / "memo.npz"))
+    with np.load(path) as data:
+        keys, values = data["keys"], data["values"]
+    assert len(keys) == 50
+    texts = clean_batch([f"good post {i} {j}" for i in range(4) for j in range(40)]
+                        + [f"bad post {j}" for j in range(40)])
+    by_hash = dict(zip(text_hashes(texts).tolist(), texts))
+    expected = model.predict_proba([by_hash[k] for k in keys.tolist()])
+    np.testing.assert_allclose(values, expected)
@@ -0,0 +1,16 @@
+import pytest
+
+from train_model import _halving_schedule
+
+
+@pytest.mark.parametrize("n_candidates, factor, rounds", [
+    (1, 3, 1), (2, 3, 1), (3, 3, 2), (8, 2, 4), (9, 3, 3), (243, 3, 6), (999, 10, 3), (1000, 10, 4),
+])
+def test_halving_rounds_at_and_around_exact_powers(n_candidates, factor, rounds):
+    schedule = _halving_schedule(n_candidates, 10**7, factor, min_rows=1)
+    assert len(schedule) == rounds
+    assert schedule[-1] == 10**7
+
+
+def test_halving_rounds_stop_at_min_rows():
+    assert _halving_schedule(1000, 10_000, 10, min_rows=500) == [1_000, 10_000]
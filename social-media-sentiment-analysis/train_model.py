@@ -1,50 +1,470 @@
 """
 train_model.py
-- Expects CSV with columns: text_clean and label
+- Expects CSV or Parquet with columns: text_clean and label (only those two columns are read)
 - Saves model pipeline to social-media-sentiment-analysis/models/model_pipeline.joblib
+- --engine batch (default): TF-IDF + LogisticRegression on the whole file, held-out 80/20 split.
+- --engine streaming: HashingVectorizer + SGDClassifier trained with partial_fit over CSV chunks,
+  so the training set never has to fit in memory. Rows are held out by a hash of text_clean
+  (stable across runs and chunk sizes), and --resume continues training a previously saved
+  streaming model on new data instead of starting from scratch.
+- The batch engine caches the fitted TF-IDF and its train/test matrices (feature_cache.py),
+  keyed by the input file content, vectorizer params and split; --no-cache skips it.
+- --search: cross-validated grid (or successive-halving) search over TF-IDF and
+  LogisticRegression params on the training split, fanned out over all cores with joblib.
+  Each (vectorizer params, fold) is vectorized once and shared by every classifier candidate
+  (and cached on disk for the next sweep); the best candidate is refit on the whole training
+  split, reported on the held-out test split and saved to --output.
+- --featurizer fused: featurizer.FusedTfidfVectorizer instead of TfidfVectorizer for the batch
+  engine and --search (same features, float32/int32 CSR). It cleans text itself, so with
+  --text-column text the model trains straight from the raw dataset, without preprocess.py.
+- --prune-keep F: after training, keep only the share F of features with the largest weights
+  (model_artifact.prune_pipeline), save that smaller pipeline to --prune-out (default
+  <output>.pruned.joblib; the full model stays at --output) and report its held-out
+  accuracy / macro F1, size and predict time against the full model. With
+  --compact-out, --compact-weights float16/int8 also quantizes the exported coefficients
+  (the compact model is included in the report).
+- Stage timings/memory go to a JSON run log (instrumentation.py); --profile adds a cProfile dump.
 """
 import argparse
+import json
+import math
 import os
-import pandas as pd
-from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import joblib
+import time
+from typing import TYPE_CHECKING
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, help="processed csv with text_clean and label")
-    parser.add_argument("--output", default="social-media-sentiment-analysis/models/model_pipeline.joblib")
-    parser.add_argument("--test-size", type=float, default=0.2)
-    args = parser.parse_args()
+import instrumentation
+from instrumentation import stage
+from dataset_io import iter_chunks, read_dataset, dataset_columns, Throughput
+from feature_cache import FeatureCache, make_key
+from model_artifact import strip_pipeline, export_model, prune_pipeline, WEIGHTS
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+# numpy/pandas/sklearn/joblib are imported inside the functions that use them, so
+# `train_model.py --help` and the sentiment CLI start without paying for them
 
-    df = pd.read_csv(args.input, encoding="utf-8")
-    if "text_clean" not in df.columns:
-        raise SystemExit("Input must contain 'text_clean' column.")
-    if "label" not in df.columns:
+REQUIRED_COLUMNS = ["text_clean", "label"]
+FEATURIZERS = ["tfidf", "fused"]
+
+TFIDF_PARAMS = {"ngram_range": (1, 2), "max_features": 20000}
+CLF_PARAMS = {"max_iter": 1000, "class_weight": "balanced"}
+
+# default --search space; --grid FILE replaces it with {"tfidf": {...}, "clf": {...}} from JSON
+SEARCH_GRID = {
+    "tfidf": {"ngram_range": [(1, 1), (1, 2)], "max_features": [20000, 50000], "min_df": [1, 2]},
+    "clf": {"C": [0.3, 1.0, 3.0], "max_iter": [1000]},
+}
+
+def check_columns(columns, text_column: str = "text_clean") -> None:
+    if text_column not in columns:
+        raise SystemExit(f"Input must contain '{text_column}' column.")
+    if "label" not in columns:
         raise SystemExit("Input must contain 'label' column for supervised training.")
 
-    X = df["text_clean"].astype(str)
+def make_tfidf(params: dict = None, featurizer: str = "tfidf") -> "TfidfVectorizer":
+    if featurizer == "fused":
+        from featurizer import FusedTfidfVectorizer
+        return FusedTfidfVectorizer(**{**TFIDF_PARAMS, **(params or {})})
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(**{**TFIDF_PARAMS, **(params or {})})
+
+def vectorizer_key(vec) -> dict:
+    """Params that identify the vectorizer's features in feature cache keys."""
+    return vec.cache_params() if hasattr(vec, "cache_params") else vec.get_params()
+
+def text_values(frame, column: str):
+    """The text column as str, missing texts as "" (not "nan"), the same in every engine."""
+    return frame[column].fillna("").astype(str)
+
+def make_classifier(params: dict = None) -> "LogisticRegression":
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(**{**CLF_PARAMS, **(params or {})})
+
+def split_indices(y, test_size: float) -> tuple:
+    """(train, test) row positions of the held-out split, the same in every step."""
+    import numpy as np
+    from sklearn.model_selection import train_test_split
+    return train_test_split(np.arange(len(y)), test_size=test_size, random_state=42, stratify=y)
+
+def tfidf_features(args, cache: FeatureCache, split_key: list, params: dict = None) -> tuple:
+    """(fitted tfidf, X_train, X_test, y_train, y_test), reusing cached features when the
+    input file, vectorizer params and split are unchanged (then only 'label' is read)."""
+    key = make_key(cache.digest(args.input), "tfidf", "missing-as-empty",
+                   vectorizer_key(make_tfidf(params, args.featurizer)), split_key)
+    hit = cache.get_features(key)
+    columns = ["label"] if hit else [args.text_column, "label"]
+    with stage("load"):
+        df = read_dataset(args.input, columns=columns)
     y = df["label"].astype(str)
+    # same shuffle as splitting (X, y) directly: it only depends on n_samples and y
+    train_idx, test_idx = split_indices(y, args.test_size)
+    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+    if hit:
+        vec, m = hit
+        return vec, m["X_train"], m["X_test"], y_train, y_test
+    X = text_values(df, args.text_column)
+    vec = make_tfidf(params, args.featurizer)
+    with stage("vectorize", len(X)):
+        X_train = vec.fit_transform(X.iloc[train_idx])
+        X_test = vec.transform(X.iloc[test_idx])
+    cache.put_features(key, vec, {"X_train": X_train, "X_test": X_test})
+    return vec, X_train, X_test, y_train, y_test
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_size, random_state=42, stratify=y)
+def train_batch(args) -> None:
+    from sklearn.pipeline import Pipeline
+    from sklearn.metrics import classification_report
+    check_columns(dataset_columns(args.input), args.text_column)
+    cache = FeatureCache(enabled=False if args.no_cache else None)
 
-    pipeline = Pipeline([
-        ("tfidf", TfidfVectorizer(ngram_range=(1,2), max_features=20000)),
-        ("clf", LogisticRegression(max_iter=1000, class_weight="balanced"))
-    ])
+    vec, X_train, X_test, y_train, y_test = tfidf_features(args, cache, ["stratified", args.test_size, 42])
+    print(cache.stats_line())
 
-    pipeline.fit(X_train, y_train)
+    clf = make_classifier()
+    with stage("fit", len(y_train)):
+        clf.fit(X_train, y_train)
+    pipeline = Pipeline([("tfidf", vec), ("clf", clf)])
 
-    preds = pipeline.predict(X_test)
+    with stage("predict", len(y_test)):
+        preds = clf.predict(X_test)
     print("Classification report on test set:")
     print(classification_report(y_test, preds))
+    save_pipeline(pipeline, args.output)
+
+def load_grid(path: str) -> dict:
+    if path is None:
+        return SEARCH_GRID
+    with open(path, encoding="utf-8") as f:
+        grid = json.load(f)
+    unknown = set(grid) - {"tfidf", "clf"}
+    if unknown:
+        raise SystemExit(f"--grid keys must be 'tfidf' and/or 'clf', got: {sorted(unknown)}")
+    tfidf = dict(grid.get("tfidf", {}))
+    if "ngram_range" in tfidf:
+        # JSON has no tuples and TfidfVectorizer rejects lists
+        tfidf["ngram_range"] = [tuple(r) for r in tfidf["ngram_range"]]
+    return {"tfidf": tfidf, "clf": dict(grid.get("clf", {}))}
+
+def _vectorize_fold(X_fit, X_val, params: dict, featurizer: str = "tfidf") -> tuple:
+    t0 = time.perf_counter()
+    vec = make_tfidf(params, featurizer)
+    X_fit = vec.fit_transform(X_fit)
+    return vec, X_fit, vec.transform(X_val), time.perf_counter() - t0
+
+def _rung_rows(y_fit, n_rows: int):
+    """Indices of a stratified subset of n_rows fold rows (the same for every candidate), so a
+    small rung keeps every class even if the rows are sorted by label; all rows if n_rows covers them."""
+    import numpy as np
+    from sklearn.model_selection import train_test_split
+    if n_rows >= len(y_fit):
+        return np.arange(len(y_fit))
+    try:
+        idx, _ = train_test_split(np.arange(len(y_fit)), train_size=n_rows, random_state=42, stratify=y_fit)
+    except ValueError:
+        # a class too rare to stratify (or too few rows left over): a plain shuffle
+        idx = np.random.default_rng(42).permutation(len(y_fit))[:n_rows]
+    return np.sort(idx)
+
+def _fit_score(X_fit, y_fit, X_val, y_val, params: dict, scoring: str, n_rows: int) -> tuple:
+    from sklearn.metrics import get_scorer
+    t0 = time.perf_counter()
+    rows = _rung_rows(y_fit, n_rows)
+    clf = make_classifier(params).fit(X_fit[rows], y_fit[rows])
+    return get_scorer(scoring)(clf, X_val, y_val), time.perf_counter() - t0
+
+def _halving_schedule(n_candidates: int, n_rows: int, factor: int, min_rows: int) -> list:
+    """Training rows per round: each round keeps the best 1/factor candidates and gives
+    them factor times more rows, ending with the full fold on the last few."""
+    # floor(log_factor(n_candidates)) in integers: math.log(1000, 10) is 2.9999999999999996
+    rounds, n = 1, n_candidates
+    while n >= factor:
+        n //= factor
+        rounds += 1
+    while rounds > 1 and n_rows // factor ** (rounds - 1) < min_rows:
+        rounds -= 1
+    return [n_rows // factor ** (rounds - 1 - i) for i in range(rounds)]
+
+def search(args) -> None:
+    import numpy as np
+    from joblib import Parallel, delayed
+    from sklearn.pipeline import Pipeline
+    from sklearn.model_selection import StratifiedKFold, ParameterGrid
+    from sklearn.metrics import classification_report
+    check_columns(dataset_columns(args.input), args.text_column)
+    cache = FeatureCache(enabled=False if args.no_cache else None)
+    grid = load_grid(args.grid)
+    vec_grid, clf_grid = list(ParameterGrid(grid["tfidf"])), list(ParameterGrid(grid["clf"]))
+
+    with stage("load"):
+        df = read_dataset(args.input, columns=[args.text_column, "label"])
+    X = text_values(df, args.text_column).to_numpy()
+    y = df["label"].astype(str).to_numpy()
+    train_idx, _ = split_indices(y, args.test_size)
+    X_train, y_train = X[train_idx], y[train_idx]
+    folds = list(StratifiedKFold(args.cv, shuffle=True, random_state=42).split(X_train, y_train))
+    split_key = ["stratified", args.test_size, 42]
+    digest = cache.digest(args.input)
+
+    print(f"search: {len(vec_grid)} vectorizer x {len(clf_grid)} classifier settings, "
+          f"{args.cv}-fold CV on {len(y_train):,} rows, scoring={args.scoring}, method={args.search_method}")
+
+    with Parallel(n_jobs=args.n_jobs) as parallel:
+        # every (vectorizer params, fold) is transformed exactly once for the whole search
+        features, todo = {}, []
+        for v, params in enumerate(vec_grid):
+            for k in range(args.cv):
+                key = make_key(digest, "tfidf-fold", "missing-as-empty", vectorizer_key(make_tfidf(params, args.featurizer)),
+                               split_key, args.cv, k)
+                hit = cache.get_features(key)
+                if hit:
+                    features[v, k] = (hit[1]["fit"], hit[1]["val"])
+                else:
+                    todo.append((v, k, key))
+        with stage("vectorize_folds"):
+            done = parallel(delayed(_vectorize_fold)(X_train[folds[k][0]], X_train[folds[k][1]], vec_grid[v],
+                                                     args.featurizer)
+                            for v, k, _ in todo)
+        vec_time = {}
+        for (v, k, key), (vec, X_fit, X_val, seconds) in zip(todo, done):
+            features[v, k] = (X_fit, X_val)
+            vec_time[v] = vec_time.get(v, 0.0) + seconds
+            cache.put_features(key, vec, {"fit": X_fit, "val": X_val})
+        for v, params in enumerate(vec_grid):
+            print(f"  vectorized {params}: " + (f"{vec_time[v]:.2f}s" if v in vec_time else "cached"))
+
+        candidates = [(v, c) for v in range(len(vec_grid)) for c in range(len(clf_grid))]
+        n_fit = min(len(tr) for tr, _ in folds)
+        if args.search_method == "halving":
+            min_rows = 20 * len(np.unique(y_train))
+            schedule = _halving_schedule(len(candidates), n_fit, args.halving_factor, min_rows)
+        else:
+            schedule = [n_fit]
+
+        for r, n_rows in enumerate(schedule):
+            t0 = time.perf_counter()
+            with stage(f"search_round{r + 1}"):
+                out = parallel(delayed(_fit_score)(features[v, k][0], y_train[folds[k][0]], features[v, k][1],
+                                                   y_train[folds[k][1]], clf_grid[c], args.scoring, n_rows)
+                               for v, c in candidates for k in range(args.cv))
+            results = []
+            for i, (v, c) in enumerate(candidates):
+                scores, times = zip(*out[i * args.cv:(i + 1) * args.cv])
+                results.append((float(np.mean(scores)), float(np.std(scores)), sum(times), v, c))
+            results.sort(key=lambda t: -t[0])
+            print(f"round {r + 1}/{len(schedule)}: {len(candidates)} candidates on {n_rows:,} rows per fold "
+                  f"({time.perf_counter() - t0:.2f}s wall)")
+            for mean, std, seconds, v, c in results:
+                print(f"  {mean:.4f} +/- {std:.4f}  {seconds:7.2f}s  tfidf={vec_grid[v]} clf={clf_grid[c]}")
+            if r + 1 < len(schedule):
+                keep = math.ceil(len(candidates) / args.halving_factor)
+                candidates = [(v, c) for _, _, _, v, c in results[:keep]]
+
+    _, _, _, v, c = results[0]
+    print(f"best: tfidf={vec_grid[v]} clf={clf_grid[c]} ({args.scoring} {results[0][0]:.4f})")
+    vec, X_fit, X_test, y_fit, y_test = tfidf_features(args, cache, split_key, vec_grid[v])
+    with stage("fit", len(y_fit)):
+        clf = make_classifier(clf_grid[c]).fit(X_fit, y_fit)
+    print(cache.stats_line())
+    with stage("predict", len(y_test)):
+        preds = clf.predict(X_test)
+    print("Classification report on test set:")
+    print(classification_report(y_test, preds))
+    save_pipeline(Pipeline([("tfidf", vec), ("clf", clf)]), args.output)
+
+def make_streaming_pipeline(n_features: int) -> "Pipeline":
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+    return Pipeline([
+        ("hash", HashingVectorizer(ngram_range=(1,2), n_features=n_features, alternate_sign=False)),
+        ("clf", SGDClassifier(loss="log_loss", random_state=42)),
+    ])
+
+def is_test_row(text: "pd.Series", test_size: float) -> "np.ndarray":
+    """Deterministic held-out mask from a hash of the text (same rows every run)."""
+    import pandas as pd
+    h = pd.util.hash_pandas_object(text, index=False).to_numpy()
+    return (h % 10000) < int(test_size * 10000)
+
+def _chunks(args):
+    for chunk in iter_chunks(args.input, args.chunksize, columns=REQUIRED_COLUMNS):
+        yield text_values(chunk, "text_clean"), chunk["label"].astype(str)
+
+def train_streaming(args) -> None:
+    import numpy as np
+    import pandas as pd
+    import joblib
+    from sklearn.metrics import classification_report
+    check_columns(dataset_columns(args.input))
+
+    # one cheap pass over the label column: partial_fit needs every class up front,
+    # and the counts give the same weights as class_weight="balanced"
+    counts = pd.Series(dtype="int64")
+    with stage("load_labels"):
+        for chunk in iter_chunks(args.input, args.chunksize, columns=["label"]):
+            counts = counts.add(chunk["label"].astype(str).value_counts(), fill_value=0)
+    classes = np.array(sorted(counts.index))
+    class_weight = {c: counts.sum() / (len(classes) * counts[c]) for c in classes}
+
+    if args.resume and os.path.exists(args.output):
+        pipeline = joblib.load(args.output)
+        if "hash" not in pipeline.named_steps:
+            raise SystemExit(f"--resume needs a model saved by --engine streaming: {args.output}")
+        known = pipeline.named_steps["clf"].classes_
+        unknown = sorted(set(classes) - set(known))
+        if unknown:
+            raise SystemExit(f"Labels not seen by the saved model, retrain without --resume: {unknown}")
+        classes = known
+        print("Resuming training from", args.output)
+    else:
+        pipeline = make_streaming_pipeline(args.n_features)
+    vec, clf = pipeline.named_steps["hash"], pipeline.named_steps["clf"]
+    clf.set_params(class_weight=class_weight)
+
+    for epoch in range(args.epochs):
+        stats = Throughput()
+        # chunks are loaded, vectorized and fitted in turn, so one stage covers all three
+        with stage(f"fit_epoch{epoch + 1}") as record:
+            for X, y in _chunks(args):
+                train = ~is_test_row(X, args.test_size)
+                if train.any():
+                    clf.partial_fit(vec.transform(X[train]), y[train], classes=classes)
+                stats.add(int(train.sum()))
+            if record is not None:
+                record["rows"] = stats.rows
+        print(f"epoch {epoch + 1}/{args.epochs}: trained on {stats}")
+
+    y_test, preds = [], []
+    with stage("predict"):
+        for X, y in _chunks(args):
+            test = is_test_row(X, args.test_size)
+            if test.any():
+                y_test.append(y[test].to_numpy())
+                preds.append(pipeline.predict(X[test]))
+    print("Classification report on test set:")
+    if y_test:
+        print(classification_report(np.concatenate(y_test), np.concatenate(preds)))
+    else:
+        print("(no held-out rows, increase --test-size)")
+    save_pipeline(pipeline, args.output)
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+def prune_and_report(args) -> None:
+    """Save the pruned version of the pipeline at --output to --prune-out (and export it with
+    --compact-out), comparing every variant with the full model on the held-out split."""
+    import joblib
+    from sklearn.metrics import accuracy_score, f1_score
+    from cleaning import clean_batch
+    from model_artifact import CompactModel
+    df = read_dataset(args.input, columns=[args.text_column, "label"])
+    y = df["label"].astype(str).to_numpy()
+    _, test_idx = split_indices(y, args.test_size)
+    texts, y_test = text_values(df, args.text_column).to_numpy()[test_idx], y[test_idx]
+    del df
+
+    full = joblib.load(args.output)
+    models = [("full", full, len(full.named_steps["clf"].coef_[0]), os.path.getsize(args.output), texts)]
+    if args.prune_keep:
+        with stage("prune"):
+            pruned = prune_pipeline(full, args.prune_keep)
+        save_pipeline(pruned, args.prune_out)
+        models.append(("pruned", pruned, pruned.named_steps["clf"].coef_.shape[1], os.path.getsize(args.prune_out), texts))
+    if args.compact_out:
+        with stage("export_compact"):
+            export_model(models[-1][1], args.compact_out, args.compact_weights)
+        print("Exported compact model to", args.compact_out)
+        compact = CompactModel(args.compact_out)
+        # the compact model tokenizes like TfidfVectorizer and expects cleaned text
+        clean = texts if args.text_column == "text_clean" else clean_batch(texts.tolist())
+        models.append((f"compact/{args.compact_weights}", compact, compact.n_features, _dir_size(args.compact_out), clean))
+
+    print(f"Held-out comparison on {len(y_test):,} rows:")
+    print(f"  {'model':16s} {'features':>9s} {'size MB':>8s} {'accuracy':>9s} {'f1_macro':>9s} {'predict s':>10s}")
+    base = None
+    with stage("compare", len(y_test) * len(models)):
+        for name, model, n_features, size, X in models:
+            t0 = time.perf_counter()
+            preds = model.predict(X)
+            seconds = time.perf_counter() - t0
+            acc, f1 = accuracy_score(y_test, preds), f1_score(y_test, preds, average="macro")
+            base = base or (acc, f1)
+            delta = "" if name == "full" else f"  (accuracy {acc - base[0]:+.4f}, f1_macro {f1 - base[1]:+.4f})"
+            print(f"  {name:16s} {n_features:9,} {size / 1e6:8.2f} {acc:9.4f} {f1:9.4f} {seconds:10.3f}{delta}")
+
+def save_pipeline(pipeline: "Pipeline", path: str) -> None:
+    import joblib
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with stage("save"):
+        joblib.dump(strip_pipeline(pipeline), path)
+    print("Saved model pipeline to", path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="processed csv/parquet with text_clean and label")
+    parser.add_argument("--featurizer", choices=FEATURIZERS, default="tfidf",
+                        help="tfidf: sklearn TfidfVectorizer; fused: featurizer.py (cleans and vectorizes in one pass)")
+    parser.add_argument("--text-column", default="text_clean",
+                        help="text column to train on; 'text' (raw) needs --featurizer fused")
+    parser.add_argument("--output", default="social-media-sentiment-analysis/models/model_pipeline.joblib")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--engine", choices=["batch", "streaming"], default="batch",
+                        help="batch: TF-IDF + LogisticRegression in memory; streaming: hashing + SGD over chunks")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows per chunk (streaming engine)")
+    parser.add_argument("--epochs", type=int, default=1, help="passes over the input (streaming engine)")
+    parser.add_argument("--n-features", type=int, default=2**20, help="hashing space size (streaming engine)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue training the streaming model saved at --output (streaming engine)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or write the feature cache (batch engine and --search)")
+    parser.add_argument("--search", action="store_true",
+                        help="cross-validated hyperparameter search, then save the best batch pipeline")
+    parser.add_argument("--search-method", choices=["grid", "halving"], default="grid",
+                        help="grid: every candidate on full folds; halving: successive halving over training rows")
+    parser.add_argument("--grid", help='JSON file with {"tfidf": {param: [values]}, "clf": {param: [values]}}')
+    parser.add_argument("--cv", type=int, default=3, help="folds for --search")
+    parser.add_argument("--scoring", default="f1_macro", help="sklearn scorer name for --search")
+    parser.add_argument("--halving-factor", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="joblib workers for --search (-1: all cores)")
+    parser.add_argument("--compact-out", help="also export the batch pipeline as a compact model directory")
+    parser.add_argument("--compact-weights", choices=WEIGHTS, default="float64",
+                        help="coefficient storage of --compact-out (int8: one scale per class)")
+    parser.add_argument("--prune-keep", type=float,
+                        help="keep this share (0-1] of the features with the largest weights, and report the delta")
+    parser.add_argument("--prune-out", help="where to save the pruned pipeline (default: <output>.pruned.joblib)")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
 
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    joblib.dump(pipeline, args.output)
-    print("Saved model pipeline to", args.output)
+    if args.search and args.engine == "streaming":
+        raise SystemExit("--search tunes the batch engine, drop --engine streaming")
+    if args.engine == "streaming" and (args.featurizer != "tfidf" or args.text_column != "text_clean"):
+        raise SystemExit("--featurizer / --text-column apply to the batch engine and --search")
+    if args.text_column != "text_clean" and args.featurizer != "fused":
+        raise SystemExit(f"--text-column {args.text_column} is not cleaned text, use --featurizer fused")
+    if (args.compact_out or args.prune_keep) and args.engine == "streaming":
+        raise SystemExit("--compact-out / --prune-keep need the TF-IDF pipeline of the batch engine")
+    if args.halving_factor < 2:
+        raise SystemExit(f"--halving-factor must be at least 2, got {args.halving_factor}")
+    if args.prune_keep is not None and not 0 < args.prune_keep <= 1:
+        raise SystemExit(f"--prune-keep must be in (0, 1], got {args.prune_keep}")
+    if args.prune_keep:
+        args.prune_out = args.prune_out or os.path.splitext(args.output)[0] + ".pruned.joblib"
+        if os.path.abspath(args.prune_out) == os.path.abspath(args.output):
+            raise SystemExit("--prune-out must differ from --output, which keeps the full model")
+    with instrumentation.run("train_model", args):
+        if args.search:
+            search(args)
+        elif args.engine == "streaming":
+            train_streaming(args)
+        else:
+            train_batch(args)
+        if args.prune_keep or args.compact_out:
+            prune_and_report(args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
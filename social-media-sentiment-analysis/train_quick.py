@@ -1,75 +1,121 @@
 # Quick training script for local testing
-# - Reads social-media-sentiment-analysis/data/raw/tweets_scraped.csv
+# - Reads social-media-sentiment-analysis/data/raw/tweets_scraped.csv (or .parquet), columns text,label only
 # - If not present, instructs to run create_sample_data.py first
 # - Trains TF-IDF + LogisticRegression and saves pipeline to:
 #     social-media-sentiment-analysis/models/model_pipeline.joblib
+# - Cleaned text and the fitted TF-IDF features are cached between runs (feature_cache.py),
+#   keyed by the raw file content and cleaner/vectorizer params; SENTIMENT_CACHE=0 disables it
+# - --featurizer fused: featurizer.FusedTfidfVectorizer on the raw text, which cleans while it
+#   vectorizes, so the clean stage and the cleaned-text cache are skipped
+# - Stage timings/memory go to a JSON run log (instrumentation.py); --profile adds a cProfile dump
 # Usage (from repo root, with venv active):
 #   python .\social-media-sentiment-analysis\train_quick.py
 
+import argparse
 import os
 import sys
 from pathlib import Path
 
-import pandas as pd
-from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import joblib
+import instrumentation
+from instrumentation import stage
+from cleaning import clean_text, clean_batch, CLEANER_VERSION
+from dataset_io import resolve_dataset, read_dataset, dataset_columns, RAW_DATASET, PROCESSED_DATASET
+from feature_cache import FeatureCache, make_key
+from model_artifact import strip_pipeline
 
 ROOT = Path("social-media-sentiment-analysis")
-RAW = ROOT / "data" / "raw" / "tweets_scraped.csv"
-PROCESSED = ROOT / "data" / "processed" / "tweets_clean.csv"
+RAW = Path(resolve_dataset(RAW_DATASET))
+PROCESSED = Path(resolve_dataset(PROCESSED_DATASET))
 MODEL_OUT = ROOT / "models" / "model_pipeline.joblib"
 
-def simple_preprocess_text(s):
-    if not isinstance(s, str):
-        return ""
-    import re
-    s = s.lower()
-    s = re.sub(r"http\S+", "", s)
-    s = re.sub(r"@\w+", "", s)
-    s = re.sub(r"#", "", s)
-    s = re.sub(r"[^a-z0-9\s']", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+# kept for backwards compatibility, same cleaner as preprocess.py
+simple_preprocess_text = clean_text
+
+def train(featurizer="tfidf"):
+    # heavy imports here, so --help and the missing-input message don't pay for them
+    import joblib
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
 
-def main():
     if not RAW.exists():
         print(f"Input CSV not found: {RAW}")
         print("Run create_sample_data.py first or place a CSV at the path above.")
         sys.exit(1)
 
     print("Loading raw data:", RAW)
-    df = pd.read_csv(RAW, encoding="utf-8")
-    if "text" not in df.columns or "label" not in df.columns:
+    if not {"text", "label"} <= set(dataset_columns(RAW)):
         print("CSV must have columns: text,label")
         sys.exit(1)
+    with stage("load"):
+        df = read_dataset(RAW, columns=["text", "label"])
+    cache = FeatureCache()
+    digest = cache.digest(RAW)
 
-    df["text_clean"] = df["text"].astype(str).apply(simple_preprocess_text)
+    if featurizer == "fused":
+        text_key = digest
+        X = df["text"].astype(str)
+    else:
+        text_key = make_key(digest, "clean", CLEANER_VERSION)
+        texts = cache.get_texts(text_key)
+        if texts is None:
+            with stage("clean", len(df)):
+                texts = clean_batch(df["text"].astype(str).tolist())
+            cache.put_texts(text_key, texts)
+        df["text_clean"] = texts
+        X = df["text_clean"]
     os.makedirs(MODEL_OUT.parent, exist_ok=True)
 
-    X = df["text_clean"]
     y = df["label"].astype(str)
 
     # small train/test split
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
 
-    pipeline = Pipeline([
-        ("tfidf", TfidfVectorizer(ngram_range=(1,2), max_features=10000)),
-        ("clf", LogisticRegression(max_iter=1000, class_weight="balanced"))
-    ])
+    if featurizer == "fused":
+        from featurizer import FusedTfidfVectorizer
+        tfidf = FusedTfidfVectorizer(ngram_range=(1,2), max_features=10000)
+        feature_key = make_key(text_key, "fused", tfidf.cache_params(), ["stratified", 0.2, 42])
+    else:
+        tfidf = TfidfVectorizer(ngram_range=(1,2), max_features=10000)
+        feature_key = make_key(text_key, "tfidf", tfidf.get_params(), ["stratified", 0.2, 42])
+    hit = cache.get_features(feature_key)
+    if hit:
+        tfidf, m = hit
+        X_train, X_test = m["X_train"], m["X_test"]
+    else:
+        with stage("vectorize", len(X)):
+            X_train = tfidf.fit_transform(X.iloc[train_idx])
+            X_test = tfidf.transform(X.iloc[test_idx])
+        cache.put_features(feature_key, tfidf, {"X_train": X_train, "X_test": X_test})
+    print(cache.stats_line())
 
+    clf = LogisticRegression(max_iter=1000, class_weight="balanced")
     print("Training pipeline...")
-    pipeline.fit(X_train, y_train)
+    with stage("fit", len(y_train)):
+        clf.fit(X_train, y_train)
+    pipeline = Pipeline([("tfidf", tfidf), ("clf", clf)])
 
     print("Evaluating on test set...")
-    preds = pipeline.predict(X_test)
+    with stage("predict", len(y_test)):
+        preds = clf.predict(X_test)
     print(classification_report(y_test, preds))
 
-    joblib.dump(pipeline, MODEL_OUT)
+    with stage("save"):
+        joblib.dump(strip_pipeline(pipeline), MODEL_OUT)
     print("Saved model pipeline to:", MODEL_OUT)
 
+def main():
+    parser = argparse.ArgumentParser(description="Quick TF-IDF + LogisticRegression training on the raw dataset")
+    parser.add_argument("--featurizer", choices=["tfidf", "fused"], default="tfidf",
+                        help="fused: clean and vectorize the raw text in one pass (featurizer.py)")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+    with instrumentation.run("train_quick", args):
+        train(args.featurizer)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
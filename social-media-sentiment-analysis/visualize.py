@@ -1,24 +1,20 @@
 """
 visualize.py — lightweight helpers for plotting
+- Plots are drawn by reporting.py from pre-aggregated counts (Agg backend, figures reused
+  and closed); from the command line the dataset is counted chunk by chunk.
 """
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import os
+import sys
+
+from reporting import aggregate, render, plot_label_distribution as _plot_counts
 
 def plot_label_distribution(df, label_col="label", out="social-media-sentiment-analysis/figures/label_dist.png"):
-    os.makedirs(os.path.dirname(out), exist_ok=True)
-    plt.figure(figsize=(6,4))
-    sns.countplot(y=df[label_col], order=df[label_col].value_counts().index)
-    plt.title("Label distribution")
-    plt.tight_layout()
-    plt.savefig(out)
+    _plot_counts(df[label_col].dropna().astype(str).value_counts(), out)
     print("Saved label distribution to", out)
 
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) < 2:
-        print("Usage: python visualize.py social-media-sentiment-analysis/data/processed/tweets_clean.csv")
+        print("Usage: python visualize.py social-media-sentiment-analysis/data/processed/tweets_clean.parquet")
     else:
-        df = pd.read_csv(sys.argv[1], encoding="utf-8")
-        plot_label_distribution(df)
\ No newline at end of file
+        report = aggregate(sys.argv[1])
+        for path in render(report.tables(), "social-media-sentiment-analysis/figures"):
+            print("Saved", path)